@@ -1 +1 @@
-from .models import RemotePlantuml, LocalPlantuml
+from .models import RemotePlantuml, LocalPlantuml, PicowebPlantuml, AsyncRemotePlantuml, MultiRemotePlantuml
@@ -1 +1 @@
-from .base import get_plantuml_jar_url, get_plantuml_jar_file, download_plantuml_jar_file
+from .base import get_plantuml_jar_url, get_plantuml_jar_file, download_plantuml_jar_file, get_verified_sha256
@@ -7,16 +7,19 @@ of downloaded files through SHA256 hash checking.
 
 The module supports both known versions (with pre-defined information) and arbitrary
 versions by constructing the appropriate download URLs.
+
+Once a JAR file is verified, a stamp file with its size, modification time and hash is saved
+beside it, so the later calls can trust the file without hashing it again until it is changed.
 """
 
 import hashlib
 import os
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Dict, Any
 
 import requests
 
 from .exist_versions import KNOWN_VERSIONS
-from ..utils import download_file, get_requests_session
+from ..utils import download_file, get_requests_session, file_stat, load_json_file, save_json_file
 
 
 def _get_plantuml_jar_info(version: str) -> Tuple[str, Optional[int], Optional[str]]:
@@ -87,6 +90,73 @@ def _get_file_sha256(filename: str) -> str:
     return sha256_hash.hexdigest()
 
 
+_VERIFIED_STAMP_SUFFIX = '.verified.json'
+
+
+def _get_verified_stamp_file(filename: str) -> str:
+    return filename + _VERIFIED_STAMP_SUFFIX
+
+
+def _save_verified_stamp(filename: str, sha256: str):
+    """
+    Save the verified stamp of a file, which can be trusted without hashing until the file is changed.
+
+    :param filename: Path to the verified file
+    :type filename: str
+    :param sha256: The SHA256 hash of the file
+    :type sha256: str
+    """
+    _size, _mtime_ns = file_stat(filename)
+    save_json_file(_get_verified_stamp_file(filename), {'size': _size, 'mtime_ns': _mtime_ns, 'sha256': sha256})
+
+
+def _load_verified_stamp(filename: str) -> Optional[Dict[str, Any]]:
+    _stamp = load_json_file(_get_verified_stamp_file(filename))
+    try:
+        _size, _mtime_ns = file_stat(filename)
+    except OSError:
+        return None
+
+    if isinstance(_stamp, dict) and _stamp.get('size') == _size and _stamp.get('mtime_ns') == _mtime_ns:
+        return _stamp
+    else:
+        return None
+
+
+def get_verified_sha256(filename: str) -> Optional[str]:
+    """
+    Get the SHA256 hash of a file from its verified stamp, without hashing the file.
+
+    :param filename: Path to the file
+    :type filename: str
+
+    :return: The SHA256 hash, None when the file is not verified or changed after verified
+    :rtype: Optional[str]
+    """
+    _stamp = _load_verified_stamp(filename)
+    return _stamp.get('sha256') if _stamp is not None else None
+
+
+def _is_verified(filename: str, size: Optional[int], sha256: Optional[str]) -> bool:
+    """
+    Check if a file is verified by its stamp, without hashing the file.
+
+    :param filename: Path to the file
+    :type filename: str
+    :param size: The expected size, None means any size
+    :type size: Optional[int]
+    :param sha256: The expected SHA256 hash, None means any hash
+    :type sha256: Optional[str]
+
+    :return: True when the stamp matches the current size and modification time of the file,
+        and the expected size and hash, otherwise False
+    :rtype: bool
+    """
+    _stamp = _load_verified_stamp(filename)
+    return _stamp is not None and (size is None or _stamp['size'] == size) and \
+        (sha256 is None or _stamp.get('sha256') == sha256)
+
+
 def download_plantuml_jar_file(version: str, filename: str):
     """
     Download a PlantUML JAR file for a specific version.
@@ -99,27 +169,35 @@ def download_plantuml_jar_file(version: str, filename: str):
     :raises requests.exceptions.HTTPError: If the downloaded file's SHA256 hash doesn't match the expected value
 
     This function skips the download if the file already exists with the correct size and hash.
+    The file verified before (by its stamp, see :func:`_is_verified`) is not hashed again.
     If the download fails or the hash verification fails, the partially downloaded file is removed.
     """
     url, size, sha256 = _get_plantuml_jar_info(version)
-    if os.path.exists(filename) and (size is None or os.path.getsize(filename) == size) and \
-            (sha256 is None or _get_file_sha256(filename) == sha256):
-        # file already ready
+    if _is_verified(filename, size, sha256):
+        # file already ready and verified, no hashing
         return
+    if os.path.exists(filename) and (size is None or os.path.getsize(filename) == size):
+        actual_sha256 = _get_file_sha256(filename)
+        if sha256 is None or actual_sha256 == sha256:
+            # file already ready
+            _save_verified_stamp(filename, actual_sha256)
+            return
 
     try:
         download_file(
             url=url, filename=filename, expected_size=size,
             session=get_requests_session(use_random_ua=False),
         )
-        if os.path.exists(filename) and sha256 is not None:
+        if os.path.exists(filename):
             actual_sha256 = _get_file_sha256(filename)
-            if actual_sha256 != sha256:
+            if sha256 is not None and actual_sha256 != sha256:
                 raise requests.exceptions.HTTPError(f"Downloaded file is not of expected sha256 hash, "
                                                     f"{sha256!r} expected but {actual_sha256!r} found.")
+            _save_verified_stamp(filename, actual_sha256)
 
     except:
-        os.remove(filename)
+        if os.path.exists(filename):
+            os.remove(filename)
         raise
 
 
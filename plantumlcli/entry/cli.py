@@ -1,15 +1,23 @@
+import re
 from typing import Union, Optional, Tuple
 
 import click
 from click.core import Context, Option
 
 from .base import _DEFAULT_CONCURRENCY
-from .general import print_check_info, print_text_graph, process_plantuml, PlantumlCheckType
+from .general import print_check_info, print_text_graph, print_syntax_check, process_plantuml, PlantumlCheckType
+from .local import build_local_cds, tune_local_threads, tune_local_jvm, warm_up_local
 from .remote import print_url, print_homepage_url
 from ..config.meta import __TITLE__, __VERSION__, __AUTHOR__, __AUTHOR_EMAIL__
 from ..models.base import try_plantuml, PlantumlResourceType, Plantuml
+from ..models.launcher import PLANTUML_LAUNCHER_ENV
+from ..models.hedge import DEFAULT_HEDGE_BUDGET
+from ..models.layout import PlantumlLayout
 from ..models.local import LocalPlantuml, find_java_from_env, PLANTUML_JAR_ENV
-from ..models.remote import RemotePlantuml, PLANTUML_HOST_ENV, OFFICIAL_PLANTUML_HOST
+from ..models.multiremote import MultiRemotePlantuml
+from ..models.picoweb import PicowebPlantuml
+from ..models.remote import RemotePlantuml, PLANTUML_HOST_ENV, OFFICIAL_PLANTUML_HOST, DEFAULT_POST_THRESHOLD
+from ..utils import jvm_memory_size
 
 
 def _select_plantuml(
@@ -34,6 +42,45 @@ def _select_plantuml(
         raise plantuml
 
 
+def _run_local_tool(java: str, plantuml: Optional[str], plantuml_version: Optional[str], no_cds: bool,
+                    max_heap: Optional[str], build_cds: bool, tune_threads: bool, sources: Tuple[str]):
+    if build_cds:  # build cds archive of local plantuml
+        _local_ok, _local = try_plantuml(LocalPlantuml, java=java, plantuml=plantuml, version=plantuml_version)
+        build_local_cds(_local_ok, _local)
+        return
+
+    _local_ok, _local = try_plantuml(LocalPlantuml, java=java, plantuml=plantuml, version=plantuml_version,
+                                     use_cds=not no_cds, max_heap=max_heap)
+    if tune_threads:  # tune internal threads of local plantuml
+        tune_local_threads(_local_ok, _local)
+    else:  # tune jvm options of local plantuml
+        tune_local_jvm(_local_ok, _local, sources)
+
+
+def _start_local_plantuml(local: Plantuml, standby: bool, type_: PlantumlResourceType, sources: Tuple[str],
+                          concurrency: int, text: bool):
+    click.get_current_context().call_on_close(local.close)
+    if standby and isinstance(local, LocalPlantuml):
+        # local plantuml is likely to be used, start its jvm while the sources are loading
+        warm_up_local(local, type_, sources, concurrency, text)
+
+
+def _try_remote_plantuml(hosts: Tuple[str, ...], **kwargs) -> Tuple[bool, Union[RemotePlantuml, Exception]]:
+    if len(hosts) > 1:
+        return try_plantuml(MultiRemotePlantuml, hosts=hosts, **kwargs)
+    else:
+        return try_plantuml(RemotePlantuml, host=hosts[0], **kwargs)
+
+
+def _check_type(use_local: bool, use_remote: bool) -> PlantumlCheckType:
+    if use_local:
+        return PlantumlCheckType.LOCAL
+    elif use_remote:
+        return PlantumlCheckType.REMOTE
+    else:
+        return PlantumlCheckType.BOTH
+
+
 # noinspection PyUnusedLocal
 def print_version(ctx: Context, param: Option, value: bool) -> None:
     """
@@ -57,6 +104,65 @@ def validate_concurrency(ctx: Context, param: Option, value: int):
         raise ValueError("Concurrency should be no less than 1.")
 
 
+# noinspection PyUnusedLocal
+def validate_picoweb(ctx: Context, param: Option, value: int):
+    if value >= 0:
+        return value
+    else:
+        raise ValueError("Amount of picoweb servers should be no less than 0.")
+
+
+# noinspection PyUnusedLocal
+def validate_max_heap(ctx: Context, param: Option, value: Optional[str]):
+    return jvm_memory_size(value) if value is not None else None
+
+
+# noinspection PyUnusedLocal
+def validate_threads(ctx: Context, param: Option, value: Optional[int]):
+    if value is None or value >= 1:
+        return value
+    else:
+        raise ValueError("Threads should be no less than 1.")
+
+
+# noinspection PyUnusedLocal
+def validate_timeout(ctx: Context, param: Option, value: Optional[float]):
+    if value is None or value > 0:
+        return value
+    else:
+        raise ValueError("Timeout should be greater than 0.")
+
+
+# noinspection PyUnusedLocal
+def validate_hedge(ctx: Context, param: Option, value: Optional[float]):
+    if value is None or 0 < value < 100:
+        return value
+    else:
+        raise ValueError("Hedge percentile should be between 0 and 100.")
+
+
+# noinspection PyUnusedLocal
+def validate_hedge_budget(ctx: Context, param: Option, value: float):
+    if 0 <= value <= 1:
+        return value
+    else:
+        raise ValueError("Hedge budget should be between 0 and 1.")
+
+
+# noinspection PyUnusedLocal
+def validate_retries(ctx: Context, param: Option, value: Optional[int]):
+    if value is None or value >= 0:
+        return value
+    else:
+        raise ValueError("Retries should be no less than 0.")
+
+
+# noinspection PyUnusedLocal
+def validate_remote_hosts(ctx: Context, param: Option, value: Tuple[str, ...]):
+    _hosts = tuple(host for item in value for host in re.split(r'[\s,]+', item) if host)
+    return _hosts or (OFFICIAL_PLANTUML_HOST,)
+
+
 CONTEXT_SETTINGS = dict(
     help_option_names=['-h', '--help']
 )
@@ -71,10 +177,64 @@ CONTEXT_SETTINGS = dict(
               show_default='java from ${PATH}')
 @click.option('-p', '--plantuml', envvar=PLANTUML_JAR_ENV, type=str, default=None,
               help=f'Path of plantuml jar file (will load from ${{{PLANTUML_JAR_ENV}}} when not given).')
-@click.option('-r', '--remote-host', envvar=PLANTUML_HOST_ENV, type=str, default=OFFICIAL_PLANTUML_HOST,
-              help=f'Remote host of the online plantuml editor '
-                   f'(will load from ${{{PLANTUML_HOST_ENV}}} when not given).',
+@click.option('--plantuml-version', type=str, default=None,
+              help='Version of plantuml jar, it will be downloaded to cache when not cached (ignore -p).')
+@click.option('--launcher', envvar=PLANTUML_LAUNCHER_ENV, type=str, default=None,
+              help=f'Command template to start local plantuml instead of java -jar, such as a native build '
+                   f'or a wrapper script, {{java}} and {{plantuml}} in it are replaced '
+                   f'(will load from ${{{PLANTUML_LAUNCHER_ENV}}} when not given).')
+@click.option('--no-pipe', is_flag=True,
+              help='Do not use pipe mode of local plantuml, exchange data with temporary files instead.')
+@click.option('--no-cds', is_flag=True, help='Do not use cds archive when starting local plantuml.')
+@click.option('--no-standby', is_flag=True,
+              help='Do not start local plantuml jvm in advance while the source files are loading.')
+@click.option('-W', '--picoweb', type=int, default=0, callback=validate_picoweb,
+              help='Amount of picoweb server processes for local plantuml, 0 means not used.', show_default=True)
+@click.option('--max-heap', type=str, default=None, callback=validate_max_heap,
+              help='Max heap size of each local plantuml jvm (such as 512m), '
+                   'the concurrency of local jvm processes is limited by it and the available memory.')
+@click.option('--layout', default=PlantumlLayout.DOT.name,
+              type=click.Choice(list(PlantumlLayout.__members__.keys()), case_sensitive=False),
+              help='Layout engine of local plantuml for graph diagrams. Smetana is built in the jar and no dot '
+                   'process is forked, auto means smetana is used for the diagrams with equivalent layout.',
               show_default=True)
+@click.option('--threads', type=int, default=None, callback=validate_threads,
+              help='Internal threads of each local plantuml jvm when rendering multiple files (-nbthread), '
+                   'the concurrency is split into fewer jvm processes with more threads.',
+              show_default='tuned value on this host, 1 when not tuned')
+@click.option('--tune-threads', is_flag=True,
+              help='Measure the best internal threads of local plantuml jvm on this host (ignore other options).')
+@click.option('--jvm-option', 'jvm_options', type=str, multiple=True,
+              help='Option of each local plantuml jvm, such as --jvm-option=-XX:+UseSerialGC (multiple allowed).',
+              show_default='tuned options on this host, none when not tuned')
+@click.option('--tune-jvm', is_flag=True,
+              help='Measure the fastest jvm options of local plantuml on this host, '
+                   'with the given source files as sample (ignore other options).')
+@click.option('--timeout', type=float, default=None, callback=validate_timeout,
+              help='Deadline of rendering each diagram in seconds (including the retries of remote), '
+                   'the slow ones will be killed and reported.')
+@click.option('--retries', type=int, default=None, callback=validate_retries,
+              help='Retry times when rendering is failed by timeout.', show_default='0 for local, 5 for remote')
+@click.option('--build-cds', is_flag=True,
+              help='Build cds archive of local plantuml to speed up its startup (ignore other options).')
+@click.option('--config', type=click.Path(exists=True, dir_okay=False, readable=True), default=None,
+              help='Preamble file (such as theme, !include and skinparam) shared by all the diagrams, '
+                   'it is passed to each local plantuml jvm once (-config), and merged into the source for remote.')
+@click.option('-r', '--remote-host', envvar=PLANTUML_HOST_ENV, type=str, multiple=True,
+              callback=validate_remote_hosts,
+              help=f'Remote host of the online plantuml editor, multiple replicas can be given by repeating it or '
+                   f'separated by commas, and the requests are routed to the least busy one '
+                   f'(will load from ${{{PLANTUML_HOST_ENV}}} when not given).',
+              show_default=OFFICIAL_PLANTUML_HOST)
+@click.option('--post/--get', 'post', default=None,
+              help='Send source code to remote plantuml by POST or GET (GET is used when POST not supported).',
+              show_default=f'POST only when the encoded source is longer than {DEFAULT_POST_THRESHOLD}')
+@click.option('--hedge', type=float, default=None, callback=validate_hedge,
+              help='Send a remote render once again (to another replica when several) when it is slower than this '
+                   'percentile (such as 95) of the recent latencies, and use the first response.',
+              show_default='no hedging')
+@click.option('--hedge-budget', type=float, default=DEFAULT_HEDGE_BUDGET, callback=validate_hedge_budget,
+              help='Max ratio of the hedged remote renders to all the renders.', show_default=True)
 @click.option('-L', '--use-local', is_flag=True, help='Use local plantuml only.')
 @click.option('-R', '--use-remote', is_flag=True, help='Use remote plantuml only.')
 @click.option('-c', '--check', is_flag=True, help='Check usable plantuml.')
@@ -88,6 +248,14 @@ CONTEXT_SETTINGS = dict(
                    'and Cairo environment to make sure the export to PDF can be processed.)',
               show_default=True)
 @click.option('-T', '--text', is_flag=True, help='Display text uml graph by stdout (ignore -t).')
+@click.option('--check-syntax', is_flag=True,
+              help='Check syntax of source codes without rendering them, line of error will be printed (ignore -t).')
+@click.option('--metrics', is_flag=True,
+              help='Print timing metrics (jvm startup, parsing and generation) of local plantuml for each file, '
+                   'each file is rendered by a standalone jvm process.')
+@click.option('--all-pages', is_flag=True,
+              help='Write all the pages (newpage and multiple diagrams) of each source file, rendered with one '
+                   'plantuml process, the pages after the first one are named like name_001.png.')
 @click.option('-o', '--output', type=str, multiple=True,
               help='Paths of output files (relative path supported, based on output dir in -O).')
 @click.option('-O', '--output-dir', type=click.Path(exists=True, file_okay=False, writable=True), default='.',
@@ -95,22 +263,40 @@ CONTEXT_SETTINGS = dict(
 @click.option('-n', '--concurrency', type=int, default=_DEFAULT_CONCURRENCY, callback=validate_concurrency,
               help='Concurrency when running plantuml.', show_default=True)
 @click.argument('sources', nargs=-1, type=click.Path(exists=True, dir_okay=False, readable=True))
-def cli(java: str, plantuml: Optional[str], remote_host: str,
-        use_local: bool, use_remote: bool, check: bool,
-        url: bool, homepage_url: bool,
-        resource_type: str, text: bool, output: Tuple[str], output_dir: str,
-        concurrency: Optional[int], sources: Tuple[str]):
-    _local_ok, _local = try_plantuml(LocalPlantuml, java=java, plantuml=plantuml)
-    _remote_ok, _remote = try_plantuml(RemotePlantuml, host=remote_host)
+def cli(java: str, plantuml: Optional[str], plantuml_version: Optional[str], launcher: Optional[str], no_pipe: bool,
+        no_cds: bool, no_standby: bool, picoweb: int, max_heap: Optional[str], layout: str, threads: Optional[int],
+        tune_threads: bool, jvm_options: Tuple[str], tune_jvm: bool, timeout: Optional[float], retries: Optional[int],
+        build_cds: bool, config: Optional[str], remote_host: Tuple[str, ...], post: Optional[bool],
+        hedge: Optional[float], hedge_budget: float, use_local: bool, use_remote: bool, check: bool, url: bool,
+        homepage_url: bool,
+        resource_type: str, text: bool, check_syntax: bool, metrics: bool, all_pages: bool,
+        output: Tuple[str], output_dir: str, concurrency: Optional[int], sources: Tuple[str]):
+    if plantuml_version:  # jar of the given version is used instead of -p and ${PLANTUML_JAR}
+        plantuml = None
+    if build_cds or tune_threads or tune_jvm:  # maintain local plantuml, nothing is rendered
+        _run_local_tool(java, plantuml, plantuml_version, no_cds, max_heap, build_cds, tune_threads, sources)
+        return
+
+    _request_params = {} if timeout is None else {'deadline': timeout}  # including the retries of remote
+    if picoweb:
+        _local_ok, _local = try_plantuml(PicowebPlantuml, java=java, plantuml=plantuml, version=plantuml_version,
+                                         processes=picoweb, use_cds=not no_cds, max_heap=max_heap,
+                                         layout=layout, config=config, retries=retries, **_request_params)
+    else:
+        _local_ok, _local = try_plantuml(LocalPlantuml, java=java, plantuml=plantuml, version=plantuml_version,
+                                         use_pipe=not no_pipe, use_cds=not no_cds, max_heap=max_heap,
+                                         layout=layout, threads=threads, timeout=timeout, retries=retries or 0,
+                                         config=config, launcher=launcher, jvm_options=jvm_options or None)
+    if _local_ok:
+        _standby = not (no_standby or use_remote or check or url or homepage_url or check_syntax or metrics
+                        or all_pages)
+        _start_local_plantuml(_local, _standby, PlantumlResourceType.load(resource_type), sources, concurrency, text)
+
+    _remote_ok, _remote = _try_remote_plantuml(remote_host, retries=retries, config=config, post=post,
+                                               hedge=hedge, hedge_budget=hedge_budget, **_request_params)
 
     if check:  # check plantuml environment
-        if use_local:
-            _check_type = PlantumlCheckType.LOCAL
-        elif use_remote:
-            _check_type = PlantumlCheckType.REMOTE
-        else:
-            _check_type = PlantumlCheckType.BOTH
-        print_check_info(_check_type, _local_ok, _local, _remote_ok, _remote)
+        print_check_info(_check_type(use_local, use_remote), _local_ok, _local, _remote_ok, _remote)
     elif url or homepage_url:  # print url of remote plantuml
         if homepage_url:
             print_homepage_url(_remote_ok, _remote, sources, concurrency)
@@ -119,8 +305,10 @@ def cli(java: str, plantuml: Optional[str], remote_host: str,
     else:  # run plantuml process
         plantuml = _select_plantuml(_local_ok, _local, _remote_ok, _remote, use_local, use_remote)
 
-        if text:  # print text graph
+        if check_syntax:  # check syntax only
+            print_syntax_check(plantuml, sources, concurrency)
+        elif text:  # print text graph
             print_text_graph(plantuml, sources, concurrency)
         else:  # dump plantuml resource (core feature)
             process_plantuml(plantuml, sources, output, output_dir,
-                             PlantumlResourceType.load(resource_type), concurrency)
+                             PlantumlResourceType.load(resource_type), concurrency, metrics, all_pages)
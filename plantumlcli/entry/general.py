@@ -1,17 +1,22 @@
 import os
 from enum import IntEnum
-from typing import Optional, Tuple, Union
+from typing import Optional, Tuple, Union, List, Callable, TypeVar
 
 import click
-from requests.exceptions import BaseHTTPError, HTTPError
+from requests.exceptions import BaseHTTPError, HTTPError, Timeout
 
 from .base import _click_exception_with_exit_code
 from .local import _check_local_plantuml, print_local_check_info
 from .remote import _check_remote_plantuml, print_remote_check_info
-from ..models.base import PlantumlType, Plantuml, PlantumlResourceType
+from ..models.base import PlantumlType, Plantuml, PlantumlResourceType, PlantumlSyntaxResult, page_path
+from ..models.breaker import CircuitOpenError
 from ..models.local import LocalPlantuml, LocalPlantumlExecuteError
+from ..models.metrics import PlantumlMetrics
 from ..models.remote import RemotePlantuml
-from ..utils import load_text_file, linear_process, save_binary_file, auto_decode
+from ..models.threads import jvm_processes
+from ..utils import load_text_file, linear_process, save_binary_file, auto_decode, admit_jvm_processes
+
+_T = TypeVar('_T')
 
 
 def print_double_check_info(local_ok: bool, local: LocalPlantuml,
@@ -57,6 +62,14 @@ def print_check_info(check_type: PlantumlCheckType,
         pass
 
 
+def _admitted_concurrency(plantuml: Plantuml, concurrency: int) -> int:
+    if isinstance(plantuml, LocalPlantuml) and plantuml.pool is None:
+        # each local render starts jvm processes, so memory should not be oversubscribed
+        return admit_jvm_processes(concurrency, plantuml.memory_budget)
+    else:
+        return concurrency
+
+
 def print_text_graph(plantuml: Plantuml, sources: Tuple[str], concurrency: int):  # noqa
     """
     Print text graph of source codes
@@ -80,7 +93,10 @@ def print_text_graph(plantuml: Plantuml, sources: Tuple[str], concurrency: int):
             click.echo(_data)
         else:
             nonlocal _error_count
-            if isinstance(_data, LocalPlantumlExecuteError):
+            if isinstance(_data, (TimeoutError, Timeout)):
+                click.secho(f'{src}: [timeout]', fg='red')
+                click.secho(str(_data), fg='red')
+            elif isinstance(_data, LocalPlantumlExecuteError):
                 click.secho(f'{src}: [error with exitcode {_data.exitcode}]', fg='red')
                 click.secho(_data.stderr, fg='red')
             else:
@@ -109,7 +125,7 @@ def print_text_graph(plantuml: Plantuml, sources: Tuple[str], concurrency: int):
         items=sources,
         process=lambda i, src: _process_text(src),
         post_process=lambda i, src, ret: _print_text(src, ret),
-        concurrency=concurrency,
+        concurrency=_admitted_concurrency(plantuml, concurrency),
     )
 
     if _error_count > 0:
@@ -120,9 +136,72 @@ def print_text_graph(plantuml: Plantuml, sources: Tuple[str], concurrency: int):
         )
 
 
-def process_plantuml(plantuml: Plantuml, sources: Tuple[str],
-                     outputs: Tuple[str], output_dir: Optional[str],
-                     type_: PlantumlResourceType, concurrency: int):
+def _split_chunks(count: int, concurrency: int) -> List[List[int]]:
+    size = max(1, -(-count // concurrency))
+    return [list(range(start, min(start + size, count))) for start in range(0, count, size)]
+
+
+def print_syntax_check(plantuml: Plantuml, sources: Tuple[str], concurrency: int):
+    """
+    Check syntax of source codes without rendering them, and print the result of each file
+    :param plantuml: plantuml object
+    :param sources: source code files
+    :param concurrency: concurrency when running this
+    """
+    _error_count = 0
+
+    if isinstance(plantuml, LocalPlantuml):
+        # local sources are checked in chunks, each chunk is checked by one plantuml process
+        concurrency = _admitted_concurrency(plantuml, concurrency)
+        _chunks = _split_chunks(len(sources), concurrency)
+    else:
+        _chunks = [[index] for index in range(len(sources))]
+
+    def _check_chunk(chunk: List[int]) -> List[PlantumlSyntaxResult]:
+        return list(plantuml.check_syntax_batch(load_text_file(sources[index]) for index in chunk))
+
+    def _print_chunk(chunk: List[int], results: List[PlantumlSyntaxResult]):
+        nonlocal _error_count
+        for index, result in zip(chunk, results):
+            if result:
+                click.secho(f'{sources[index]}: ok', fg='green')
+            else:
+                _location = f'{sources[index]}:{result.line}' if result.line is not None else sources[index]
+                click.secho(f'{_location}: {result.message}', fg='red')
+                _error_count += 1
+
+    linear_process(
+        items=_chunks,
+        process=lambda i, chunk: _check_chunk(chunk),
+        post_process=lambda i, chunk, ret: _print_chunk(chunk, ret),
+        concurrency=concurrency,
+    )
+
+    if _error_count > 0:
+        raise _click_exception_with_exit_code(
+            name='SyntaxCheckError',
+            message=f'{_error_count} file(s) with syntax error.',
+            exitcode=-4,
+        )
+
+
+def _metrics_text(metrics: PlantumlMetrics) -> str:
+    _items = [('wall', metrics.wall_time), ('startup', metrics.startup_time), ('init', metrics.init_time),
+              ('parse', metrics.parse_time), ('generation', metrics.generation_time)]
+    return ', '.join(f'{name} {value:.3f}s' for name, value in _items if value is not None)
+
+
+def _remote_host_down(err: CircuitOpenError):
+    # the rest of the batch is not sent to the host known down
+    return _click_exception_with_exit_code(
+        name='RemoteHostDown',
+        message=f'{err} The rest of the files are not rendered.',
+        exitcode=-6,
+    )
+
+
+def _output_filenames(sources: Tuple[str], outputs: Tuple[str], output_dir: Optional[str],
+                      type_: PlantumlResourceType) -> List[str]:
     if outputs and len(outputs) != len(sources):
         raise ValueError(f'Amount of output file(s) should be {len(sources)}, but {len(outputs)} found.')
 
@@ -135,15 +214,154 @@ def process_plantuml(plantuml: Plantuml, sources: Tuple[str],
             name = f'{_name}.{type_.name.lower()}'
         return os.path.join(output_dir or os.curdir, name)
 
-    def _process_code(index: int):
-        return plantuml.dump_binary(type_, load_text_file(sources[index]))
+    return [_output_filename(index) for index in range(len(sources))]
+
+
+def _report_timeout(src: str, err: Exception):
+    # timeout is reported for each file, and the others are still processed
+    click.secho(f'{src}: [timeout] {err}', fg='red')
+
 
-    def _post_process_data(index: int, ret: bytes):
-        save_binary_file(_output_filename(index), ret)
+def _render_each(plantuml: Plantuml, sources: Tuple[str], concurrency: int,
+                 render: Callable[[int], _T], save: Callable[[int, _T], None]) -> List[int]:
+    _timeouts = []
+
+    def _process(index: int):
+        try:
+            return True, render(index)
+        except (TimeoutError, Timeout) as err:
+            return False, err
+
+    def _post_process(index: int, ret: Tuple[bool, Union[_T, Exception]]):
+        _success, _data = ret
+        if _success:
+            save(index, _data)
+        else:
+            _report_timeout(sources[index], _data)
+            _timeouts.append(index)
 
     linear_process(
         items=sources,
-        process=lambda i, src: _process_code(i),
-        post_process=lambda i, src, ret: _post_process_data(i, ret),
+        process=lambda i, src: _process(i),
+        post_process=lambda i, src, ret: _post_process(i, ret),
+        concurrency=_admitted_concurrency(plantuml, concurrency),
+    )
+    return _timeouts
+
+
+def _render_with_metrics(plantuml: LocalPlantuml, sources: Tuple[str], filenames: List[str],
+                         type_: PlantumlResourceType, concurrency: int) -> List[int]:
+    # each source is rendered by a standalone jvm process, so the metrics are its own
+    def _save(index: int, ret: Tuple[bytes, PlantumlMetrics]):
+        _binary, _metrics = ret
+        save_binary_file(filenames[index], _binary)
+        click.echo(f'{sources[index]}: {_metrics_text(_metrics)}')
+
+    return _render_each(
+        plantuml, sources, concurrency,
+        render=lambda i: plantuml.dump_binary_with_metrics(type_, load_text_file(sources[i])),
+        save=_save,
+    )
+
+
+def _render_all_pages(plantuml: Plantuml, sources: Tuple[str], filenames: List[str],
+                      type_: PlantumlResourceType, concurrency: int) -> List[int]:
+    # all the pages of each source are rendered with one plantuml process
+    def _save(index: int, pages: List[bytes]):
+        for page, data in enumerate(pages):
+            save_binary_file(page_path(filenames[index], page), data)
+
+    return _render_each(
+        plantuml, sources, concurrency,
+        render=lambda i: plantuml.dump_binary_pages(type_, load_text_file(sources[i])),
+        save=_save,
+    )
+
+
+def _render_single_file(plantuml: LocalPlantuml, sources: Tuple[str], filenames: List[str],
+                        type_: PlantumlResourceType) -> List[int]:
+    # a single source is streamed from plantuml to the output file, without holding it in memory
+    try:
+        plantuml.dump(filenames[0], type_, load_text_file(sources[0]))
+    except (TimeoutError, Timeout) as err:
+        _report_timeout(sources[0], err)
+        return [0]
+    else:
+        return []
+
+
+def _render_local_batch(plantuml: LocalPlantuml, sources: Tuple[str], filenames: List[str],
+                        type_: PlantumlResourceType, concurrency: int) -> List[int]:
+    # local sources are processed in chunks, each chunk is streamed through one plantuml process
+    _timeouts, _errors = [], []
+
+    def _process_chunk(chunk: List[int]):
+        return list(plantuml.dump_binary_batch(type_, (load_text_file(sources[index]) for index in chunk)))
+
+    def _post_process_chunk(chunk: List[int], results):
+        for index, (success, data) in zip(chunk, results):
+            if _errors:
+                break
+            elif success:
+                save_binary_file(filenames[index], data)
+            elif isinstance(data, (TimeoutError, Timeout)):
+                _report_timeout(sources[index], data)
+                _timeouts.append(index)
+            else:
+                _errors.append(data)
+
+    if plantuml.pool is None:
+        # each chunk is rendered with internal threads of jvm, so the cpu budget is split between them
+        concurrency = jvm_processes(concurrency, plantuml.threads)
+    concurrency = _admitted_concurrency(plantuml, concurrency)
+    linear_process(
+        items=_split_chunks(len(sources), concurrency),
+        process=lambda i, chunk: _process_chunk(chunk),
+        post_process=lambda i, chunk, ret: _post_process_chunk(chunk, ret),
         concurrency=concurrency,
     )
+    if _errors:
+        raise _errors[0]
+    return _timeouts
+
+
+def _render_files(plantuml: Plantuml, sources: Tuple[str], filenames: List[str],
+                  type_: PlantumlResourceType, concurrency: int, metrics: bool, all_pages: bool) -> List[int]:
+    if metrics:
+        return _render_with_metrics(plantuml, sources, filenames, type_, concurrency)
+    elif all_pages:
+        return _render_all_pages(plantuml, sources, filenames, type_, concurrency)
+    elif isinstance(plantuml, LocalPlantuml) and len(sources) == 1:
+        return _render_single_file(plantuml, sources, filenames, type_)
+    elif isinstance(plantuml, LocalPlantuml):
+        return _render_local_batch(plantuml, sources, filenames, type_, concurrency)
+    else:
+        return _render_each(
+            plantuml, sources, concurrency,
+            render=lambda i: plantuml.dump_binary(type_, load_text_file(sources[i])),
+            save=lambda i, data: save_binary_file(filenames[i], data),
+        )
+
+
+def process_plantuml(plantuml: Plantuml, sources: Tuple[str],
+                     outputs: Tuple[str], output_dir: Optional[str],
+                     type_: PlantumlResourceType, concurrency: int, metrics: bool = False, all_pages: bool = False):
+    if metrics and (not isinstance(plantuml, LocalPlantuml) or plantuml.launcher is not None):
+        raise _click_exception_with_exit_code(
+            name='MetricsNotSupported',
+            message='Metrics are only supported by local plantuml with the stock jvm, without picoweb or launcher.',
+            exitcode=-5,
+        )
+
+    _filenames = _output_filenames(sources, outputs, output_dir, type_)
+    try:
+        _timeouts = _render_files(plantuml, sources, _filenames, type_, concurrency, metrics, all_pages)
+    except CircuitOpenError as err:
+        raise _remote_host_down(err) from err
+
+    if _timeouts:
+        raise _click_exception_with_exit_code(
+            name='RenderTimeout',
+            message=f'{len(_timeouts)} file(s) not rendered in time.',
+            exitcode=-3,
+        )
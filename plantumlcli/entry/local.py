@@ -1,16 +1,28 @@
 import os
-from typing import Union
+import shlex
+from typing import Union, Tuple
 
 import click
 
 from plantumlcli import LocalPlantuml
 from .base import _check_plantuml, _click_exception_with_exit_code
+from ..models.base import PlantumlResourceType
+from ..models.launcher import launcher_uses_java, launcher_uses_plantuml
+from ..utils import admit_jvm_processes, load_text_file
 
 
 def _additional_info_for_local(plantuml: LocalPlantuml, duration: float):
     _ = duration
-    click.echo(f'Java executable : {os.path.abspath(plantuml.java)}')
-    click.echo(f'Plantuml jar : {os.path.abspath(plantuml.plantuml)}')
+    _launcher = plantuml.launcher if isinstance(plantuml, LocalPlantuml) else None
+    if _launcher is None or launcher_uses_java(_launcher):
+        click.echo(f'Java executable : {os.path.abspath(plantuml.java)}')
+    if _launcher is None or launcher_uses_plantuml(_launcher):
+        click.echo(f'Plantuml jar : {os.path.abspath(plantuml.plantuml)}')
+    if isinstance(plantuml, LocalPlantuml):
+        _launch_command = ' '.join(shlex.quote(arg) for arg in plantuml.launch_command)
+        click.echo(f'Launcher : {_launch_command}' + ('' if _launcher else ' (stock jvm)'))
+    if plantuml.cds_archive:
+        click.echo(f'Cds archive : {plantuml.cds_archive}')
 
 
 def _check_local_plantuml(success, plantuml: Union[LocalPlantuml, Exception]) -> bool:
@@ -26,3 +38,78 @@ def print_local_check_info(success, plantuml: Union[LocalPlantuml, Exception]) -
     _ok = _check_local_plantuml(success, plantuml)
     if not _ok:
         raise _click_exception_with_exit_code('PlantumlNotFound', 'Local plantuml not found.', -1)
+
+
+def _local_not_found(err: Exception) -> click.ClickException:
+    return _click_exception_with_exit_code('PlantumlNotFound', f'Local plantuml not found - {err}', -1)
+
+
+def build_local_cds(success, plantuml: Union[LocalPlantuml, Exception]) -> None:
+    """
+    Build cds archive for local plantuml, to speed up the startup of it
+    :param success: plantuml object initialize success or not
+    :param plantuml: plantuml object or raised exception when initialize
+    """
+    if not success:
+        raise _local_not_found(plantuml)
+
+    _archive = plantuml.build_cds()
+    if _archive:
+        click.secho('Cds archive of local plantuml built.', fg='green')
+        click.echo(f'Cds archive : {_archive}')
+    else:
+        raise _click_exception_with_exit_code(
+            'CdsNotSupported', f'Cds archive is not supported by java {plantuml.java!r}.', -1)
+
+
+def tune_local_threads(success, plantuml: Union[LocalPlantuml, Exception]) -> None:
+    """
+    Measure the best internal threads of each local plantuml jvm on this host
+    :param success: plantuml object initialize success or not
+    :param plantuml: plantuml object or raised exception when initialize
+    """
+    if not success:
+        raise _local_not_found(plantuml)
+
+    _threads = plantuml.tune_threads()
+    click.secho('Threads of local plantuml tuned.', fg='green')
+    click.echo(f'Jvm threads : {_threads}')
+
+
+def tune_local_jvm(success, plantuml: Union[LocalPlantuml, Exception], sources: Tuple[str, ...] = ()) -> None:
+    """
+    Measure the fastest jvm options of local plantuml on this host
+    :param success: plantuml object initialize success or not
+    :param plantuml: plantuml object or raised exception when initialize
+    :param sources: sample of source code files, the built-in ones are used when not given
+    """
+    if not success:
+        raise _local_not_found(plantuml)
+
+    try:
+        _options = plantuml.tune_jvm_options([load_text_file(src) for src in sources] or None)
+    except ValueError as err:
+        raise _click_exception_with_exit_code('JvmTuningFailed', f'Jvm options not tuned - {err}', -1)
+    click.secho('Jvm options of local plantuml tuned.', fg='green')
+    click.echo(f'Jvm options : {" ".join(_options) or "(none)"}')
+
+
+def warm_up_local(plantuml: LocalPlantuml, type_: PlantumlResourceType, sources: Tuple[str, ...],
+                  concurrency: int, text: bool = False) -> int:
+    """
+    Start local plantuml jvm processes in advance, so they are started while the source files are loading
+    :param plantuml: local plantuml object
+    :param type_: resource type to be rendered
+    :param sources: source code files
+    :param concurrency: concurrency when running this
+    :param text: text graphs are printed or not
+    :return: amount of jvm processes started
+    """
+    if not sources:
+        return 0
+    if not text and plantuml.pool is None and plantuml.threads > 1 and len(sources) > 1:
+        # the batch is rendered with internal threads of jvm, not in pipe mode (a single file always is)
+        return 0
+
+    _count = admit_jvm_processes(min(len(sources), concurrency), plantuml.memory_budget)
+    return plantuml.warm_up(PlantumlResourceType.TXT if text else type_, _count)
@@ -4,12 +4,19 @@ import click
 
 from .base import _check_plantuml, _click_exception_with_exit_code
 from ..models.base import PlantumlResourceType
+from ..models.multiremote import MultiRemotePlantuml
 from ..models.remote import RemotePlantuml
 from ..utils import load_text_file, linear_process
 
 
 def _additional_info_for_remote(plantuml: RemotePlantuml, duration: float):
-    click.echo(f'Remote host : {plantuml.host}')
+    if isinstance(plantuml, MultiRemotePlantuml):
+        for stats in plantuml.probe_hosts():
+            _latency = "-" if stats.latency is None else "%.3fs" % (stats.latency,)
+            click.echo(f'Remote host : {stats.host} ({"ejected" if stats.ejected else "okay"}, '
+                       f'latency {_latency}, requests {stats.requests}, failures {stats.failures})')
+    else:
+        click.echo(f'Remote host : {plantuml.host}')
     click.echo(f'Connection time : {"%.3f" % (duration,)}s')
 
 
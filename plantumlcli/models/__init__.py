@@ -1,3 +1,6 @@
+from .aioremote import AsyncRemotePlantuml
 from .base import Plantuml
 from .local import LocalPlantuml
+from .multiremote import MultiRemotePlantuml
+from .picoweb import PicowebPlantuml
 from .remote import RemotePlantuml
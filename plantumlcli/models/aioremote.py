@@ -0,0 +1,298 @@
+"""
+Asyncio-native remote plantuml.
+
+:class:`RemotePlantuml` is built on a blocking session, so the concurrency of it is bounded by the threads which
+call it, and each request in flight costs a thread. :class:`AsyncRemotePlantuml` speaks the same protocol with
+``aiohttp`` (``pip install plantumlcli[async]``), so thousands of requests can be in flight from one thread.
+The requests in flight are bounded by a semaphore, and the encoding, version checking and pdf handling are the
+same as :class:`RemotePlantuml`.
+"""
+import asyncio
+import functools
+from collections import deque
+from typing import Optional, Mapping, Any, Union, Tuple, Iterable, AsyncIterator
+
+from urlobject import URLObject
+
+from .base import PlantumlResourceType, _has_cairosvg
+from .preamble import load_preamble, apply_preamble
+from .remote import find_plantuml_host, _check_remote, _host_process, _compress_code, _is_official_host, \
+    _check_server_version, _version_from_homepage, _parse_server_version
+from ..utils import DEFAULT_TIMEOUT, DEFAULT_RETRIES, RETRY_STATUSES, auto_decode, save_binary_file, backoff_time
+
+try:
+    import aiohttp
+    import yarl
+except (ImportError, ModuleNotFoundError):  # pragma: no cover
+    aiohttp, yarl = None, None
+
+DEFAULT_ASYNC_CONCURRENCY = 100
+
+
+def _has_aiohttp():
+    return aiohttp is not None
+
+
+class AsyncRemotePlantuml:
+    def __init__(self, host: str, concurrency: int = DEFAULT_ASYNC_CONCURRENCY, retries: Optional[int] = None,
+                 config: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        :param host: the given host
+        :param concurrency: max number of requests in flight
+        :param retries: retry times of failed (including timeout) requests, None means default
+        :param config: preamble file shared by all the diagrams, merged into each source code, None means no preamble
+        :param timeout: timeout of each request in seconds, None means default
+        """
+        if not _has_aiohttp():
+            raise ImportError('Aiohttp required for async remote plantuml, '
+                              'please install it with "pip install plantumlcli[async]".')  # pragma: no cover
+        if concurrency < 1:
+            raise ValueError(f'Concurrency should be no less than 1, but {concurrency!r} found.')
+
+        self.__host = host
+        _check_remote(self.__host)
+        self.__host = _host_process(self.__host)
+
+        self.__concurrency = concurrency
+        self.__retries = DEFAULT_RETRIES if retries is None else retries
+        self.__timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.__config = config
+        self.__preamble = load_preamble(config)
+
+        # created in the running event loop, see __get_session
+        self.__session: Optional['aiohttp.ClientSession'] = None
+        self.__semaphore: Optional[asyncio.Semaphore] = None
+        self.__version_lock: Optional[asyncio.Lock] = None
+        self.__version: Optional[str] = None
+
+    @classmethod
+    def autoload(cls, host: Optional[str] = None, concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+                 retries: Optional[int] = None, config: Optional[str] = None,
+                 timeout: Optional[float] = None) -> 'AsyncRemotePlantuml':
+        """
+        Autoload AsyncRemotePlantuml object from given host, system environments and official site
+        :param host: the given host
+        :param concurrency: max number of requests in flight
+        :param retries: retry times of failed (including timeout) requests, None means default
+        :param config: preamble file shared by all the diagrams, merged into each source code, None means no preamble
+        :param timeout: timeout of each request in seconds, None means default
+        :return: async remote plantuml object
+        """
+        return AsyncRemotePlantuml(find_plantuml_host(host), concurrency, retries, config, timeout)
+
+    @property
+    def host(self) -> str:
+        """
+        Host of remote plantuml
+        :return: host of remote plantuml
+        """
+        return str(self.__host)
+
+    @property
+    def concurrency(self) -> int:
+        """
+        Max number of requests in flight
+        :return: concurrency
+        """
+        return self.__concurrency
+
+    @property
+    def config(self) -> Optional[str]:
+        """
+        Preamble file shared by all the diagrams
+        :return: path of preamble file, None means no preamble
+        """
+        return self.__config
+
+    def _properties(self) -> Mapping[str, Any]:
+        return {
+            'host': str(self.__host),
+        }
+
+    def __repr__(self):
+        prop_str = ', '.join([f'{key}: {value!r}' for key, value in sorted(self._properties().items())])
+        return f'<{self.__class__.__name__} {prop_str}>'
+
+    def __get_session(self) -> 'aiohttp.ClientSession':
+        if self.__session is None or self.__session.closed:
+            self.__session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.__concurrency))
+            self.__semaphore = asyncio.Semaphore(self.__concurrency)
+            self.__version_lock = asyncio.Lock()
+        return self.__session
+
+    async def close(self):
+        """
+        Close the http session, it will be created again when used
+        """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _request_host(self) -> URLObject:
+        return self.__host
+
+    async def __request(self, path: str) -> bytes:
+        _session = self.__get_session()
+        _url = yarl.URL(str(self._request_host().add_path(path)), encoded=True)  # sent as quoted by urlobject
+        _timeout = aiohttp.ClientTimeout(total=self.__timeout)
+        retry = 0
+        while True:
+            try:
+                async with self.__semaphore:
+                    async with _session.get(_url, timeout=_timeout) as r:
+                        if r.status not in RETRY_STATUSES or retry >= self.__retries:
+                            r.raise_for_status()
+                            return await r.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if retry >= self.__retries:
+                    raise
+
+            # the slot is not held while waiting for next retry
+            retry += 1
+            await asyncio.sleep(backoff_time(retry))
+
+    def _is_official(self):
+        return _is_official_host(self.__host)
+
+    def _check_version(self, version: str):
+        if not self._is_official():
+            _check_server_version(version)
+
+    async def _get_version(self, cached: bool = False) -> str:
+        if self._is_official():
+            return 'Official Site'
+
+        self.__get_session()
+        async with self.__version_lock:  # homepage is requested only once by concurrent renders
+            if not cached or self.__version is None:
+                self.__version = _version_from_homepage(await self.__request(''))
+            return self.__version
+
+    async def version(self) -> str:
+        """
+        Get version information from this plantuml
+        :return: version information
+        """
+        _version = await self._get_version()
+        self._check_version(_version)
+        return _version
+
+    async def check(self) -> None:
+        """
+        Check this plantuml is okay or not, raise exception when not ok
+        """
+        await self.version()
+
+    async def test(self) -> bool:
+        """
+        Test this plantuml is okay or not
+        :return: True if is okay, otherwise False
+        """
+        try:
+            await self.check()
+        except Exception:
+            return False
+        else:
+            return True
+
+    async def _get_server_version(self) -> Tuple[int, int, int]:
+        return _parse_server_version(await self._get_version(cached=True))
+
+    async def _check_type_supported(self, type_: PlantumlResourceType):
+        if type_ == PlantumlResourceType.PDF:
+            if not _has_cairosvg():
+                if self._is_official():
+                    raise ValueError(f'Resource type {type_!r} not supported for plantuml official '
+                                     f'site - {self.__host!r}.')
+                else:
+                    _server_version = await self._get_server_version()
+                    if _server_version < (1, 2023):
+                        raise ValueError(f'Resource type {type_!r} not supported for '
+                                         f'plantuml server site lower than 1.2023 - {_server_version!r}.')
+
+    def __get_uml_path(self, type_: str, code: str) -> str:
+        return f"{type_}/{_compress_code(apply_preamble(code, self.__preamble))}"
+
+    async def _generate_uml_data(self, type_: PlantumlResourceType, code: str) -> bytes:
+        if type_ == PlantumlResourceType.PDF and _has_cairosvg():
+            import cairosvg
+
+            binary = await self.__request(self.__get_uml_path(PlantumlResourceType.SVG.name.lower(), code))
+            _convert = functools.partial(cairosvg.svg2pdf, bytestring=binary)
+            return await asyncio.get_running_loop().run_in_executor(None, _convert)
+        else:
+            return await self.__request(self.__get_uml_path(type_.name.lower(), code))
+
+    async def _get_uml_data(self, type_: PlantumlResourceType, code: str) -> bytes:
+        await self._check_type_supported(type_)
+        return await self._generate_uml_data(type_, code)
+
+    async def get_url(self, type_: Union[int, str, PlantumlResourceType], code: str) -> str:
+        """
+        Get resource url for the source code
+        :param type_: type of resource
+        :param code: source code
+        :return:  url of resource
+        """
+        return str(self.__host.add_path(self.__get_uml_path(PlantumlResourceType.load(type_).name.lower(), code)))
+
+    async def dump_binary(self, type_: Union[int, str, PlantumlResourceType], code: str) -> bytes:
+        """
+        Dump uml data to bytes
+        :param type_: resource type
+        :param code: source code
+        """
+        return await self._get_uml_data(PlantumlResourceType.load(type_), code)
+
+    async def dump(self, path: str, type_: Union[int, str, PlantumlResourceType], code: str):
+        """
+        Dump uml data to file
+        :param path: file path
+        :param type_: resource type
+        :param code: source code
+        """
+        save_binary_file(path, await self.dump_binary(type_, code))
+
+    async def dump_txt(self, code: str) -> str:
+        """
+        Dump txt uml data to str
+        :param code: source code
+        :return: txt uml data
+        """
+        return auto_decode(await self._get_uml_data(PlantumlResourceType.TXT, code))
+
+    async def dump_binary_batch(self, type_: Union[int, str, PlantumlResourceType], codes: Iterable[str]) \
+            -> AsyncIterator[Tuple[bool, Union[bytes, Exception]]]:
+        """
+        Dump uml data of a batch of source codes to bytes concurrently, in order
+        :param type_: resource type
+        :param codes: source codes
+        :return: async iterator of (True, bytes) when success and (False, Exception) when failed, one for each code
+        """
+        type_ = PlantumlResourceType.load(type_)
+        await self._check_type_supported(type_)
+
+        async def _render(code: str) -> Tuple[bool, Union[bytes, Exception]]:
+            try:
+                return True, await self._generate_uml_data(type_, code)
+            except Exception as err:
+                return False, err
+
+        # a window of tasks keeps the semaphore busy, without creating tasks for the whole batch at once
+        _pending = deque()
+        try:
+            for code in codes:
+                _pending.append(asyncio.ensure_future(_render(code)))
+                if len(_pending) >= self.__concurrency * 2:
+                    yield await _pending.popleft()
+            while _pending:
+                yield await _pending.popleft()
+        finally:
+            for task in _pending:
+                task.cancel()
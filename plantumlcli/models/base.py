@@ -1,6 +1,7 @@
+import os
 from abc import ABCMeta
 from enum import IntEnum, unique
-from typing import TypeVar, Type, Optional, Tuple, Union, Any, Mapping
+from typing import TypeVar, Type, Optional, Tuple, Union, Any, Mapping, Iterable, Iterator, List
 
 from ..utils import check_func, save_binary_file, auto_decode
 
@@ -14,6 +15,26 @@ def _has_cairosvg():
         return True
 
 
+def page_path(path: str, page: int) -> str:
+    """
+    Get the path of the given page, named in the same way as plantuml
+    :param path: path of the first page
+    :param page: index of page, starts from 0
+    :return: path of page, such as ``name.png``, ``name_001.png`` and ``name_002.png``
+
+    Example::
+        >>> page_path('output/name.png', 0)
+        'output/name.png'
+        >>> page_path('output/name.png', 2)
+        'output/name_002.png'
+    """
+    if page == 0:
+        return path
+    else:
+        _name, _ext = os.path.splitext(path)
+        return f'{_name}_{page:03d}{_ext}'
+
+
 @unique
 class PlantumlType(IntEnum):
     LOCAL = 1
@@ -49,6 +70,62 @@ class PlantumlResourceType(IntEnum):
             raise TypeError(f'Data should be an int, str or {cls.__name__}, but {type(data).__name__} found.')
 
 
+class PlantumlSyntaxResult:
+    def __init__(self, success: bool, types: Tuple[str, ...] = (),
+                 line: Optional[int] = None, message: Optional[str] = None):
+        """
+        :param success: syntax of source code is okay or not
+        :param types: types of the diagrams in source code
+        :param line: line number of the (first) error in source code, None when success or unknown
+        :param message: error message, None when success
+        """
+        self.__success = success
+        self.__types = tuple(types)
+        self.__line = line
+        self.__message = message
+
+    @property
+    def success(self) -> bool:
+        """
+        Syntax of source code is okay or not
+        :return: True if okay, otherwise False
+        """
+        return self.__success
+
+    @property
+    def types(self) -> Tuple[str, ...]:
+        """
+        Types of the diagrams in source code, such as ``SEQUENCE`` and ``CLASS``
+        :return: tuple of types
+        """
+        return self.__types
+
+    @property
+    def line(self) -> Optional[int]:
+        """
+        Line number of the (first) error in source code, starts from 1
+        :return: line number, None when success or unknown
+        """
+        return self.__line
+
+    @property
+    def message(self) -> Optional[str]:
+        """
+        Error message
+        :return: error message, None when success
+        """
+        return self.__message
+
+    def __bool__(self):
+        return self.__success
+
+    def __repr__(self):
+        if self.__success:
+            return f'<{self.__class__.__name__} success: True, types: {self.__types!r}>'
+        else:
+            return f'<{self.__class__.__name__} success: False, line: {self.__line!r}, message: {self.__message!r}>'
+
+
 class Plantuml(metaclass=ABCMeta):
     def __init__(self):
         """
@@ -108,6 +185,29 @@ class Plantuml(metaclass=ABCMeta):
         self._check_type_supported(type_)
         return self._generate_uml_data(type_, code)
 
+    def _generate_uml_data_batch(self, type_: PlantumlResourceType, codes: Iterable[str]) \
+            -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        for code in codes:
+            try:
+                yield True, self._generate_uml_data(type_, code)
+            except Exception as err:
+                yield False, err
+
+    def _get_uml_data_batch(self, type_: PlantumlResourceType, codes: Iterable[str]) \
+            -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        self._check_type_supported(type_)
+        return self._generate_uml_data_batch(type_, codes)
+
+    def _generate_uml_pages(self, type_: PlantumlResourceType, code: str) -> List[bytes]:
+        return [self._generate_uml_data(type_, code)]
+
+    def _get_uml_pages(self, type_: PlantumlResourceType, code: str) -> List[bytes]:
+        self._check_type_supported(type_)
+        return self._generate_uml_pages(type_, code)
+
+    def _dump_uml_data(self, path: str, type_: PlantumlResourceType, code: str):
+        save_binary_file(path, self._get_uml_data(type_, code))
+
     def dump(self, path: str, type_: Union[int, str, PlantumlResourceType], code: str):
         """
         Dump uml data to file
@@ -115,7 +215,7 @@ class Plantuml(metaclass=ABCMeta):
         :param type_: resource type
         :param code: source code
         """
-        save_binary_file(path, self._get_uml_data(PlantumlResourceType.load(type_), code))
+        self._dump_uml_data(path, PlantumlResourceType.load(type_), code)
 
     def dump_binary(self, type_: Union[int, str, PlantumlResourceType], code: str) -> bytes:
         """
@@ -125,6 +225,64 @@ class Plantuml(metaclass=ABCMeta):
         """
         return self._get_uml_data(PlantumlResourceType.load(type_), code)
 
+    def dump_binary_pages(self, type_: Union[int, str, PlantumlResourceType], code: str) -> List[bytes]:
+        """
+        Dump uml data of all the pages (``newpage`` and multiple diagrams) in source code to bytes, in order
+        :param type_: resource type
+        :param code: source code
+        :return: list of page data
+        """
+        return self._get_uml_pages(PlantumlResourceType.load(type_), code)
+
+    def dump_pages(self, path: str, type_: Union[int, str, PlantumlResourceType], code: str) -> List[str]:
+        """
+        Dump uml data of all the pages in source code to files, the first page is saved to ``path``,
+        and the others are named like ``name_001.png``
+        :param path: file path of the first page
+        :param type_: resource type
+        :param code: source code
+        :return: paths of the saved files, in order
+        """
+        _paths = []
+        for page, data in enumerate(self.dump_binary_pages(type_, code)):
+            _path = page_path(path, page)
+            save_binary_file(_path, data)
+            _paths.append(_path)
+        return _paths
+
+    def dump_binary_batch(self, type_: Union[int, str, PlantumlResourceType], codes: Iterable[str]) \
+            -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        """
+        Dump uml data of a batch of source codes to bytes, in order
+        :param type_: resource type
+        :param codes: source codes
+        :return: iterator of (True, bytes) when success and (False, Exception) when failed, one for each code
+        """
+        return self._get_uml_data_batch(PlantumlResourceType.load(type_), codes)
+
+    def _check_syntax(self, code: str) -> PlantumlSyntaxResult:
+        raise NotImplementedError  # pragma: no cover
+
+    def _check_syntax_batch(self, codes: Iterable[str]) -> Iterator[PlantumlSyntaxResult]:
+        for code in codes:
+            yield self._check_syntax(code)
+
+    def check_syntax(self, code: str) -> PlantumlSyntaxResult:
+        """
+        Check syntax of source code without rendering it
+        :param code: source code
+        :return: result of syntax checking
+        """
+        return self._check_syntax(code)
+
+    def check_syntax_batch(self, codes: Iterable[str]) -> Iterator[PlantumlSyntaxResult]:
+        """
+        Check syntax of a batch of source codes without rendering them, in order
+        :param codes: source codes
+        :return: iterator of syntax checking results, one for each code
+        """
+        return self._check_syntax_batch(codes)
+
     def dump_txt(self, code: str) -> str:
         """
         Dump txt uml data to str
@@ -133,6 +291,18 @@ class Plantuml(metaclass=ABCMeta):
         """
         return auto_decode(self._get_uml_data(PlantumlResourceType.TXT, code))
 
+    def close(self):
+        """
+        Release the resources held by this plantuml object
+        """
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def _properties(self) -> Mapping[str, Any]:
         return {}  # pragma: no cover
 
@@ -0,0 +1,128 @@
+"""
+Circuit breakers of remote plantuml hosts.
+
+A dead host costs the timeout and all the retries of each diagram, multiplied across the batch. The breaker of a host
+is shared by all the renders, it is opened after the host failed (connection errors and 5xx responses) several
+times in a row, and then the requests to this host fail fast with :class:`CircuitOpenError`. Read timeouts are not
+counted, because one slow diagram on a healthy host is enough to cause them, and neither are throttling (429)
+responses, which are retried after backoff. After the reset time, one trial request is let through (half-open),
+the breaker is closed when it succeeds, or opened again when not.
+"""
+import time
+from enum import IntEnum, unique
+from threading import Lock
+
+import requests
+
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_TIME = 30.0
+
+
+@unique
+class CircuitState(IntEnum):
+    """
+    State of circuit breaker
+    """
+    CLOSED = 1
+    OPEN = 2
+    HALF_OPEN = 3
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised when the host is known down, the request is not sent
+    """
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int = DEFAULT_BREAKER_FAILURES, reset_time: float = DEFAULT_BREAKER_TIME):
+        """
+        :param failures: the breaker is opened after failed for this times in a row
+        :param reset_time: time in seconds before a trial request is let through when opened
+        """
+        if failures < 1:
+            raise ValueError(f'Breaker failures should be no less than 1, but {failures!r} found.')
+
+        self.__failures = failures
+        self.__reset_time = reset_time
+        self.__consecutive_failures = 0
+        self.__opened_at = None
+        self.__trial_at = None
+        self.__lock = Lock()
+
+    @property
+    def state(self) -> CircuitState:
+        """
+        State of this breaker
+        :return: closed, open (requests fail fast), or half-open (a trial request is let through)
+        """
+        with self.__lock:
+            return self.__state(time.time())
+
+    def __state(self, now: float) -> CircuitState:
+        if self.__opened_at is None:
+            return CircuitState.CLOSED
+        elif now - self.__opened_at < self.__reset_time:
+            return CircuitState.OPEN
+        else:
+            return CircuitState.HALF_OPEN
+
+    @property
+    def available(self) -> bool:
+        """
+        A request can be let through or not, the trial request is not taken
+        :return: True if available, otherwise False
+        """
+        _now = time.time()
+        with self.__lock:
+            _state = self.__state(_now)
+            return _state == CircuitState.CLOSED or \
+                (_state == CircuitState.HALF_OPEN and not self.__trial_running(_now))
+
+    def __trial_running(self, now: float) -> bool:
+        # the trial request which has not reported in reset time is considered lost
+        return self.__trial_at is not None and now - self.__trial_at < self.__reset_time
+
+    def acquire(self) -> bool:
+        """
+        Acquire a request, only one trial request is let through when half-open
+        :return: True if the request can be sent, otherwise False
+        """
+        _now = time.time()
+        with self.__lock:
+            _state = self.__state(_now)
+            if _state == CircuitState.CLOSED:
+                return True
+            elif _state == CircuitState.HALF_OPEN and not self.__trial_running(_now):
+                self.__trial_at = _now
+                return True
+            else:
+                return False
+
+    def success(self):
+        """
+        Report a succeeded request, the breaker is closed
+        """
+        with self.__lock:
+            self.__consecutive_failures = 0
+            self.__opened_at = None
+            self.__trial_at = None
+
+    def release(self):
+        """
+        Report a request which tells nothing about the host (such as a slow diagram), the trial request is released
+        """
+        with self.__lock:
+            self.__trial_at = None
+
+    def failure(self):
+        """
+        Report a failed request, the breaker is opened when failed too many times in a row or the trial failed
+        """
+        _now = time.time()
+        with self.__lock:
+            self.__consecutive_failures += 1
+            if self.__opened_at is not None or self.__consecutive_failures >= self.__failures:
+                self.__opened_at = _now
+                self.__trial_at = None
@@ -0,0 +1,146 @@
+"""
+Class data sharing (CDS) archives for local plantuml, cached for each pair of java and jar file.
+"""
+import os
+import tempfile
+from typing import Optional, Tuple, Dict, Any
+
+from .pipe import new_pipe_delimiter, pipe_args, pipe_input
+from ..download.base import PLANTUML_CACHE_DIR, _get_file_sha256, get_verified_sha256
+from ..utils import CommandLineExecuteError, execute, short_hash, file_stat, load_json_file, save_json_file
+
+PLANTUML_CDS_DIR = os.path.join(PLANTUML_CACHE_DIR, 'cds')
+
+_ARCHIVE_FILE = 'plantuml.jsa'
+_CLASS_LIST_FILE = 'classes.lst'
+_STAMP_FILE = 'stamp.json'
+
+_TRAINING_TYPE = 'png'
+_TRAINING_CODES = [
+    '@startuml\nAlice -> Bob : hello\nBob --> Alice : ok\n@enduml',
+    '@startuml\nstart\n:step;\nif (ok?) then (yes)\n:a;\nelse (no)\n:b;\nendif\nstop\n@enduml',
+    '@startuml\n!pragma layout smetana\nclass A\nclass B\nA --> B\n@enduml',
+]
+
+
+_JAR_SHA256_CACHE: Dict[Tuple[str, int, int], str] = {}
+
+
+def get_jar_sha256(plantuml: str) -> str:
+    """
+    Get sha256 hash of jar file, the verified stamp of downloaded jar is used without hashing,
+    other jars are hashed once in each process until changed
+    :param plantuml: path of plantuml jar file
+    :return: sha256 hash
+    """
+    _plantuml = os.path.realpath(plantuml)
+    _sha256 = get_verified_sha256(_plantuml)
+    if _sha256 is None:
+        _key = (_plantuml, *file_stat(_plantuml))
+        if _key not in _JAR_SHA256_CACHE:
+            _JAR_SHA256_CACHE[_key] = _get_file_sha256(_plantuml)
+        _sha256 = _JAR_SHA256_CACHE[_key]
+    return _sha256
+
+
+def get_cds_dir(java: str, plantuml: str) -> str:
+    """
+    Get directory of cds archive for the given java and plantuml
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :return: directory of cds archive
+    """
+    return os.path.join(PLANTUML_CDS_DIR, short_hash(os.path.realpath(java), os.path.realpath(plantuml)))
+
+
+def get_runtime_stamp(java: str, plantuml: str) -> Dict[str, Any]:
+    """
+    Get stamp of the given java and plantuml, the data cached for them is stale when the stamp is changed.
+    The jar is not hashed here, so checking the stamp of cached data costs no more than two stat calls
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :return: stamp data
+    """
+    _java, _plantuml = os.path.realpath(java), os.path.realpath(plantuml)
+    _java_size, _java_mtime_ns = file_stat(_java)
+    _plantuml_size, _plantuml_mtime_ns = file_stat(_plantuml)
+    return {
+        'java': _java, 'java_size': _java_size, 'java_mtime_ns': _java_mtime_ns,
+        'plantuml': _plantuml, 'plantuml_size': _plantuml_size, 'plantuml_mtime_ns': _plantuml_mtime_ns,
+    }
+
+
+def cds_options(archive: str) -> Tuple[str, ...]:
+    """
+    Get jvm options for using cds archive, jvm logs are redirected to stderr to keep pipe mode output clean
+    :param archive: path of cds archive
+    :return: jvm options
+    """
+    return f'-XX:SharedArchiveFile={archive}', '-Xshare:auto', '-Xlog:disable', '-Xlog:all=warning:stderr'
+
+
+def build_cds_archive(java: str, plantuml: str) -> Optional[str]:
+    """
+    Build cds archive for the given java and plantuml, by running some diagrams and dumping the loaded classes
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :return: path of cds archive, None when not supported by this java
+    """
+    _dir = get_cds_dir(java, plantuml)
+    os.makedirs(_dir, exist_ok=True)
+    _stamp = {**get_runtime_stamp(java, plantuml), 'plantuml_sha256': get_jar_sha256(plantuml)}
+
+    _archive_file = os.path.join(_dir, _ARCHIVE_FILE)
+    with tempfile.TemporaryDirectory(prefix='.build', dir=_dir) as _build_dir:
+        _class_list_file = os.path.join(_build_dir, _CLASS_LIST_FILE)
+        _tmp_archive_file = os.path.join(_build_dir, _ARCHIVE_FILE)
+        _delimiter = new_pipe_delimiter()
+        try:
+            execute(java, f'-XX:DumpLoadedClassList={_class_list_file}', '-jar', _stamp['plantuml'],
+                    f'-t{_TRAINING_TYPE}', *pipe_args(_delimiter),
+                    stdin=b''.join(map(pipe_input, _TRAINING_CODES)), decode=False)
+            execute(java, '-Xshare:dump', f'-XX:SharedClassListFile={_class_list_file}',
+                    f'-XX:SharedArchiveFile={_tmp_archive_file}', '-cp', _stamp['plantuml'])
+        except CommandLineExecuteError:
+            _supported = False
+        else:
+            _supported = os.path.exists(_tmp_archive_file)
+
+        if _supported:
+            os.replace(_tmp_archive_file, _archive_file)
+        elif os.path.exists(_archive_file):
+            os.remove(_archive_file)
+
+    save_json_file(os.path.join(_dir, _STAMP_FILE), {**_stamp, 'supported': _supported})
+    return _archive_file if _supported else None
+
+
+def get_cds_archive(java: str, plantuml: str) -> Optional[str]:
+    """
+    Get cds archive for the given java and plantuml, stale archive will be rebuilt.
+    When only the size or modification time of jar is changed, it is hashed to check if its content is the same
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :return: path of cds archive, None when not built or not supported
+    """
+    _dir = get_cds_dir(java, plantuml)
+    _saved_stamp = load_json_file(os.path.join(_dir, _STAMP_FILE))
+    if _saved_stamp is None:
+        return None
+
+    _supported = _saved_stamp.pop('supported', False)
+    _saved_sha256 = _saved_stamp.pop('plantuml_sha256', None)
+    _archive_file = os.path.join(_dir, _ARCHIVE_FILE)
+    if _supported and not os.path.exists(_archive_file):
+        return build_cds_archive(java, plantuml)
+
+    _stamp = get_runtime_stamp(java, plantuml)
+    if _saved_stamp != _stamp:
+        _unchanged = {**_saved_stamp, 'plantuml_size': None, 'plantuml_mtime_ns': None} == \
+            {**_stamp, 'plantuml_size': None, 'plantuml_mtime_ns': None}
+        if not _unchanged or _saved_sha256 != get_jar_sha256(plantuml):
+            return build_cds_archive(java, plantuml)
+        save_json_file(os.path.join(_dir, _STAMP_FILE),  # same jar content, such as copied again
+                       {**_stamp, 'plantuml_sha256': _saved_sha256, 'supported': _supported})
+
+    return _archive_file if _supported else None
@@ -0,0 +1,166 @@
+"""
+Hedged requests of remote plantuml.
+
+A few slow responses (such as a replica in garbage collection) set the wall-clock time of a whole batch.
+When hedging is enabled, a request which has not returned within a percentile of the recent latencies is sent
+once again (to another host when there are several), and the first response is used. The delay is only
+known after some requests are finished, and the duplicated requests are limited by a budget, which is the
+ratio of them to all the requests, so the extra load on the servers is bounded. Each request of a hedged call runs
+on its own thread, so the requests in flight are not capped by a pool, and the delay is not spent in its queue.
+"""
+import math
+import time
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from threading import Lock, Thread
+from typing import Optional, Callable, TypeVar
+
+DEFAULT_HEDGE_BUDGET = 0.05
+_HEDGE_WINDOW = 200  # amount of the recent latencies
+_HEDGE_MIN_SAMPLES = 20
+
+_T = TypeVar('_T')
+
+
+def _start_thread(func: Callable[[], _T]) -> 'Future[_T]':
+    future = Future()
+
+    def _run():
+        if future.set_running_or_notify_cancel():
+            try:
+                future.set_result(func())
+            except BaseException as err:
+                future.set_exception(err)
+
+    # daemon thread, the slower request left running does not block the exit
+    Thread(target=_run, name='plantuml-hedge', daemon=True).start()
+    return future
+
+
+def _discard_result(future: Future):
+    # the response of the slower request is not used, release its connection
+    if future.exception() is None:
+        _close = getattr(future.result(), 'close', None)
+        if _close is not None:
+            _close()
+
+
+class RequestHedging:
+    def __init__(self, percentile: float, budget: float = DEFAULT_HEDGE_BUDGET,
+                 window: int = _HEDGE_WINDOW, min_samples: int = _HEDGE_MIN_SAMPLES):
+        """
+        :param percentile: percentile of the recent latencies, a request is hedged when slower than it
+        :param budget: max ratio of the hedged requests to all the requests
+        :param window: amount of the recent latencies
+        :param min_samples: requests are not hedged until so many latencies are recorded
+        """
+        if not 0 < percentile < 100:
+            raise ValueError(f'Hedge percentile should be in (0, 100), but {percentile!r} found.')
+        if not 0 <= budget <= 1:
+            raise ValueError(f'Hedge budget should be in [0, 1], but {budget!r} found.')
+
+        self.__percentile = percentile
+        self.__budget = budget
+        self.__latencies = deque(maxlen=window)
+        self.__min_samples = min_samples
+        self.__requests = 0
+        self.__hedged = 0
+        self.__lock = Lock()
+
+    @property
+    def percentile(self) -> float:
+        """
+        Percentile of the recent latencies, a request is hedged when slower than it
+        :return: percentile
+        """
+        return self.__percentile
+
+    @property
+    def budget(self) -> float:
+        """
+        Max ratio of the hedged requests to all the requests
+        :return: ratio of budget
+        """
+        return self.__budget
+
+    @property
+    def requests(self) -> int:
+        """
+        Amount of the requests
+        :return: amount of requests
+        """
+        return self.__requests
+
+    @property
+    def hedged(self) -> int:
+        """
+        Amount of the hedged requests
+        :return: amount of requests
+        """
+        return self.__hedged
+
+    def delay(self) -> Optional[float]:
+        """
+        Time to wait before hedging a request
+        :return: delay in seconds, None when not enough latencies are recorded
+        """
+        with self.__lock:
+            if len(self.__latencies) < self.__min_samples:
+                return None
+            _latencies = sorted(self.__latencies)
+        return _latencies[min(len(_latencies) - 1, math.ceil(len(_latencies) * self.__percentile / 100) - 1)]
+
+    def record(self, latency: float):
+        """
+        Record the latency of a finished request
+        :param latency: latency in seconds
+        """
+        with self.__lock:
+            self.__latencies.append(latency)
+
+    def __affordable(self) -> bool:
+        return self.__hedged + 1 <= self.__budget * self.__requests
+
+    def __acquire(self) -> bool:
+        with self.__lock:
+            if not self.__affordable():
+                return False
+            self.__hedged += 1
+            return True
+
+    def __timed(self, func: Callable[[], _T]) -> _T:
+        _start = time.time()
+        result = func()
+        self.record(time.time() - _start)
+        return result
+
+    def call(self, func: Callable[[], _T]) -> _T:
+        """
+        Call the request function, it is called once again when slow, and the first result is returned
+        :param func: request function, it may be called twice concurrently
+        :return: result of the faster request
+        """
+        _delay = self.delay()
+        with self.__lock:
+            self.__requests += 1
+            _affordable = self.__affordable()
+        if _delay is None or not _affordable:  # not hedged, run on the caller thread
+            return self.__timed(func)
+
+        _primary = _start_thread(lambda: self.__timed(func))
+        _done, _ = wait([_primary], timeout=_delay)
+        if _done or not self.__acquire():
+            return _primary.result()
+
+        _pending = [_primary, _start_thread(lambda: self.__timed(func))]
+        _error = None
+        while _pending:
+            _done, _ = wait(_pending, return_when=FIRST_COMPLETED)
+            for future in [future for future in _pending if future in _done]:
+                _pending.remove(future)
+                if future.exception() is None:
+                    for other in _pending:
+                        other.add_done_callback(_discard_result)
+                    return future.result()
+                _error = _error or future.exception()
+        raise _error
@@ -0,0 +1,115 @@
+"""
+Launch options of the short-lived jvm processes of local plantuml, the fastest profile is measured on the host.
+"""
+import os
+import time
+from typing import Optional, List, Dict, Callable, Tuple, Mapping
+
+from .cds import get_runtime_stamp
+from .pipe import PLANTUML_ERROR_EXITCODE, pipe_args, pipe_input
+from .threads import tuning_codes
+from ..download.base import PLANTUML_CACHE_DIR
+from ..utils import CommandLineExecuteError, execute, short_hash, load_json_file, save_json_file
+
+PLANTUML_JVM_DIR = os.path.join(PLANTUML_CACHE_DIR, 'jvm')
+
+_TUNING_TYPE = 'png'
+_TUNING_ROUNDS = 2
+
+# heap and stack are not sized here, so the memory budget based on max_heap holds
+JVM_OPTION_PROFILES: Mapping[str, Tuple[str, ...]] = {
+    'default': (),
+    'headless': ('-Djava.awt.headless=true',),
+    'client': ('-XX:TieredStopAtLevel=1', '-XX:+UseSerialGC', '-Xshare:auto', '-Djava.awt.headless=true'),
+    'client-lean': ('-XX:TieredStopAtLevel=1', '-XX:+UseSerialGC', '-Xshare:auto', '-Djava.awt.headless=true',
+                    '-XX:-UsePerfData'),
+}
+
+
+def measure_jvm_options(command_line: Callable[..., Tuple[str, ...]], codes: List[str],
+                        options: Tuple[str, ...]) -> Optional[float]:
+    """
+    Measure time cost of rendering the codes with the given jvm options, one jvm process for each code
+    :param command_line: function to get command line of plantuml from its arguments and ``jvm_options``
+    :param codes: source codes to be rendered
+    :param options: jvm options to be measured
+    :return: time cost in seconds, None when the options are not valid for this java (the diagram errors are
+        still measured, they are rendered as error images)
+    """
+    _command_line = command_line(f'-t{_TUNING_TYPE}', *pipe_args(), jvm_options=options)
+    _start = time.time()
+    for code in codes:
+        try:
+            _stdout, _ = execute(*_command_line, stdin=pipe_input(code), decode=False)
+        except CommandLineExecuteError as err:
+            if err.exitcode != PLANTUML_ERROR_EXITCODE or not err.stdout:
+                return None  # jvm rejected the options
+            _stdout = err.stdout
+        if not _stdout:
+            return None
+    return time.time() - _start
+
+
+def _jvm_file(java: str, plantuml: str) -> str:
+    return os.path.join(PLANTUML_JVM_DIR, f'{short_hash(os.path.realpath(java), os.path.realpath(plantuml))}.json')
+
+
+def tune_jvm_options(java: str, plantuml: str, command_line: Callable[..., Tuple[str, ...]],
+                     codes: Optional[List[str]] = None,
+                     profiles: Optional[Mapping[str, Tuple[str, ...]]] = None) -> Tuple[str, ...]:
+    """
+    Measure the candidate profiles of jvm options on the host, and save the fastest valid one to cache
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :param command_line: function to get command line of plantuml from its arguments and ``jvm_options``
+    :param codes: sample of source codes, None means the built-in tuning corpus
+    :param profiles: candidate profiles (name to jvm options), None means :data:`JVM_OPTION_PROFILES`
+    :return: jvm options of the fastest profile
+    """
+    profiles = dict(profiles or JVM_OPTION_PROFILES)
+    _codes = list(codes or tuning_codes(3))
+    measure_jvm_options(command_line, _codes[:1], ())  # warm up, so the file cache is not measured
+
+    # the profiles are measured in turns, so the noise of host is shared by all of them
+    _costs: Dict[str, Optional[float]] = {name: None for name in profiles}
+    _valid = set(profiles)
+    for _ in range(_TUNING_ROUNDS):
+        for name, options in profiles.items():
+            if name not in _valid:
+                continue
+            _cost = measure_jvm_options(command_line, _codes, options)
+            if _cost is None:
+                _valid.discard(name)
+                _costs[name] = None
+            elif _costs[name] is None or _cost < _costs[name]:
+                _costs[name] = _cost
+
+    if not _valid:
+        raise ValueError(f'No valid jvm options found in profiles {sorted(profiles)!r}.')
+    _profile = min(_valid, key=lambda x: (_costs[x], x))
+    save_json_file(_jvm_file(java, plantuml), {
+        **get_runtime_stamp(java, plantuml),
+        'profile': _profile, 'options': list(profiles[_profile]), 'costs': _costs,
+    })
+    return tuple(profiles[_profile])
+
+
+def get_tuned_jvm_options(java: str, plantuml: str) -> Optional[Tuple[str, ...]]:
+    """
+    Get the tuned jvm options for the given java and plantuml
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :return: jvm options, None when not tuned or the tuning is stale
+    """
+    _saved = load_json_file(_jvm_file(java, plantuml))
+    if _saved is None:
+        return None
+
+    _options = _saved.pop('options', None)
+    _saved.pop('profile', None)
+    _saved.pop('costs', None)
+    if _saved == get_runtime_stamp(java, plantuml) and isinstance(_options, list) and \
+            all(isinstance(option, str) for option in _options):
+        return tuple(_options)
+    else:
+        return None
@@ -0,0 +1,83 @@
+"""
+Custom launcher command of local plantuml.
+
+In default, local plantuml is started by ``java -jar plantuml.jar``. A launcher command template can be used
+instead, such as a natively compiled plantuml, or a wrapper script starting a pre-warmed jvm. The template is
+split like a shell command line, ``{java}`` and ``{plantuml}`` in it are replaced with the java executable and
+plantuml jar file, and the arguments of plantuml are appended after it.
+"""
+import os
+import shlex
+import shutil
+from typing import Optional, Tuple
+
+PLANTUML_LAUNCHER_ENV = 'PLANTUML_LAUNCHER'
+
+_JAVA_PLACEHOLDER = '{java}'
+_PLANTUML_PLACEHOLDER = '{plantuml}'
+
+
+def find_launcher_from_env() -> Optional[str]:
+    return os.environ.get(PLANTUML_LAUNCHER_ENV, None) or None
+
+
+def find_launcher(launcher: Optional[str] = None) -> Optional[str]:
+    return launcher or find_launcher_from_env()
+
+
+def launcher_uses_java(launcher: str) -> bool:
+    """
+    Check if the java executable is used in launcher command template
+    :param launcher: launcher command template
+    :return: True if ``{java}`` is used, otherwise False
+    """
+    return _JAVA_PLACEHOLDER in launcher
+
+
+def launcher_uses_plantuml(launcher: str) -> bool:
+    """
+    Check if the plantuml jar file is used in launcher command template
+    :param launcher: launcher command template
+    :return: True if ``{plantuml}`` is used, otherwise False
+    """
+    return _PLANTUML_PLACEHOLDER in launcher
+
+
+def launcher_command(launcher: str, java: Optional[str] = None, plantuml: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Get the command line prefix from launcher command template
+    :param launcher: launcher command template
+    :param java: java executable file path
+    :param plantuml: plantuml jar file path
+    :return: command line, arguments of plantuml should be appended after it
+
+    Example::
+        >>> launcher_command('{java} -Xshare:off -jar {plantuml}', '/usr/bin/java', '/opt/plantuml.jar')
+        ('/usr/bin/java', '-Xshare:off', '-jar', '/opt/plantuml.jar')
+        >>> launcher_command('/opt/plantuml-native/plantuml --headless')
+        ('/opt/plantuml-native/plantuml', '--headless')
+    """
+    _args = []
+    for arg in shlex.split(launcher):
+        if java is not None:
+            arg = arg.replace(_JAVA_PLACEHOLDER, java)
+        if plantuml is not None:
+            arg = arg.replace(_PLANTUML_PLACEHOLDER, plantuml)
+        _args.append(arg)
+    return tuple(_args)
+
+
+def check_launcher(command: Tuple[str, ...]):
+    """
+    Check the executable of launcher command, raise exception when not usable
+    :param command: command line of launcher
+    """
+    if not command:
+        raise ValueError('Launcher command is empty.')
+
+    _executable = shutil.which(command[0])
+    if not _executable:
+        if not os.path.exists(command[0]):
+            raise FileNotFoundError(f'Launcher executable {command[0]!r} not found.')
+        else:
+            raise PermissionError(f'Launcher executable {command[0]!r} not executable.')
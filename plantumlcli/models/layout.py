@@ -0,0 +1,179 @@
+"""
+Layout engines of plantuml.
+
+Most graph diagrams (class, component, state, etc.) are laid out by graphviz ``dot`` in default, which
+means one more process is forked for each rendering. Smetana is the java port of dot shipped within the
+plantuml jar, it can be enabled by ``-Playout=smetana`` or ``!pragma layout smetana``.
+"""
+import re
+from enum import IntEnum, unique
+from typing import Union, Tuple, List
+
+from .pipe import _split_blocks
+
+
+@unique
+class PlantumlLayout(IntEnum):
+    """
+    Layout engine of plantuml
+    """
+    DOT = 1
+    SMETANA = 2
+    AUTO = 3
+
+    @classmethod
+    def load(cls, data: Union[int, str, 'PlantumlLayout']) -> 'PlantumlLayout':
+        if isinstance(data, PlantumlLayout):
+            return data
+        elif isinstance(data, int):
+            if data in cls.__members__.values():
+                return cls(data)
+            else:
+                raise ValueError(f'Value {data!r} not found for enum {cls.__name__}.')
+        elif isinstance(data, str):
+            if data.upper() in cls.__members__.keys():
+                return cls.__members__[data.upper()]
+            else:
+                raise KeyError(f'Key {data!r} not found for enum {cls.__name__}.')
+        else:
+            raise TypeError(f'Data should be an int, str or {cls.__name__}, but {type(data).__name__} found.')
+
+
+SMETANA_PRAGMA = '!pragma layout smetana'
+
+_START_TYPE_PATTERN = re.compile(r'^\s*@start(?P<type>\w+)', re.IGNORECASE)
+_LAYOUT_PRAGMA_PATTERN = re.compile(r'^\s*!pragma\s+(?:layout|graphviz_dot)\b', re.IGNORECASE | re.MULTILINE)
+
+# features which are not supported (or rendered differently) by smetana
+_SMETANA_UNSUPPORTED_PATTERN = re.compile(
+    r'^\s*skinparam\s+linetype\s+(?:ortho|polyline)\b'
+    r'|^\s*(?:together|allow_mixing|allowmixing)\b',
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# detected in order, the first matched one is the type of diagram
+_UML_TYPE_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ('sequence', re.compile(
+        r'^\s*(?:participant|boundary|control|collections|activate|deactivate|destroy|autonumber|'
+        r'ref\s+over|note\s+over|return)\b|^\s*(?:\.\.\.|\|\|\||==+\s*[^=\s].*==)',
+        re.IGNORECASE | re.MULTILINE,
+    )),
+    ('activity_legacy', re.compile(r'\(\*(?:top)?\)', re.MULTILINE)),
+    ('state', re.compile(r'\[\*]|^\s*state\b', re.IGNORECASE | re.MULTILINE)),
+    ('class', re.compile(
+        r'^\s*(?:abstract(?:\s+class)?|class|interface|enum|annotation|entity|protocol|struct|exception)\b'
+        r'|<\|[-.]|[-.]\|>|\*--|--\*|\bo--|--o\b',
+        re.IGNORECASE | re.MULTILINE,
+    )),
+    ('object', re.compile(r'^\s*(?:object|map)\b', re.IGNORECASE | re.MULTILINE)),
+    ('usecase', re.compile(r'^\s*(?:usecase\b|\((?!\*))', re.IGNORECASE | re.MULTILINE)),
+    ('component', re.compile(r'^\s*(?:component\b|\[(?!\*))', re.IGNORECASE | re.MULTILINE)),
+    ('deployment', re.compile(
+        r'^\s*(?:node|artifact|cloud|database|folder|frame|storage|queue|stack|card|file|agent|rectangle|package|'
+        r'namespace)\b',
+        re.IGNORECASE | re.MULTILINE,
+    )),
+    ('activity', re.compile(r'^\s*(?:start|stop|:.*;|:.*[|<>\]}/]|if\s*\(.*\)\s*then\b.*)\s*$',
+                            re.IGNORECASE | re.MULTILINE)),
+]
+_DEFAULT_UML_TYPE = 'sequence'
+
+# diagram types laid out by dot, smetana gives the equivalent output
+_SMETANA_TYPES = {'class', 'object', 'usecase', 'component', 'deployment', 'state'}
+
+
+def _remove_comments(lines: List[str]) -> str:
+    _result, _in_block = [], False
+    for line in lines:
+        _stripped = line.strip()
+        if _in_block:
+            _in_block = "'/" not in _stripped
+        elif _stripped.startswith("/'"):
+            _in_block = "'/" not in _stripped[2:]
+        elif not _stripped.startswith("'"):
+            _result.append(line)
+    return '\n'.join(_result)
+
+
+def _block_type(lines: List[str]) -> str:
+    _matching = _START_TYPE_PATTERN.match(lines[0]) if lines else None
+    _start_type = _matching.group('type').lower() if _matching else 'uml'
+    if _start_type != 'uml':
+        return _start_type
+
+    _body = _remove_comments(lines[1:-1])
+    for type_, pattern in _UML_TYPE_PATTERNS:
+        if pattern.search(_body):
+            return type_
+    return _DEFAULT_UML_TYPE
+
+
+def diagram_type(code: str) -> str:
+    """
+    Detect type of the (first) diagram in source code, by its start tag and keywords
+    :param code: source code
+    :return: type of diagram, such as ``sequence``, ``class`` and ``mindmap``
+
+    Example::
+        >>> diagram_type('@startuml\\nclass A\\n@enduml')
+        'class'
+        >>> diagram_type('@startuml\\nBob -> Alice : hello\\n@enduml')
+        'sequence'
+    """
+    _lines = code.splitlines()
+    _blocks = _split_blocks(code)
+    if _blocks:
+        _start, _end = _blocks[0]
+        return _block_type(_lines[_start:_end + 1])
+    else:
+        return _block_type(['@startuml', *_lines, '@enduml'])
+
+
+def is_smetana_equivalent(code: str) -> bool:
+    """
+    Check if the layout of diagram by smetana is equivalent to the one by dot
+    :param code: source code of one diagram
+    :return: True when smetana can be used instead of dot
+    """
+    return diagram_type(code) in _SMETANA_TYPES and not _SMETANA_UNSUPPORTED_PATTERN.search(code)
+
+
+def layout_args(layout: PlantumlLayout) -> Tuple[str, ...]:
+    """
+    Get command line arguments of plantuml for the layout engine
+    :param layout: layout engine
+    :return: arguments tuple, the auto layout is applied to the source code instead of the command line
+    """
+    if layout == PlantumlLayout.SMETANA:
+        return '-Playout=smetana',
+    else:
+        return ()
+
+
+def apply_layout(code: str, layout: PlantumlLayout) -> str:
+    """
+    Apply layout engine to the source code, by adding ``!pragma layout smetana`` to the diagrams.
+    The pragma is put before the end tag, so the line numbers in error messages are not changed.
+    Diagrams which have specified their own layout are not changed.
+    :param code: source code
+    :param layout: layout engine, smetana is applied to all the diagrams, and auto is applied to
+        the ones which have equivalent layout by smetana
+    :return: source code with layout applied
+    """
+    if layout == PlantumlLayout.DOT:
+        return code
+
+    _lines = code.splitlines()
+    _changed = False
+    for _start, _end in reversed(_split_blocks(code)):
+        _block = '\n'.join(_lines[_start:_end + 1])
+        if _LAYOUT_PRAGMA_PATTERN.search(_block):
+            continue
+        if layout == PlantumlLayout.SMETANA or is_smetana_equivalent(_block):
+            _lines.insert(_end, SMETANA_PRAGMA)
+            _changed = True
+
+    if _changed:
+        return '\n'.join(_lines) + ('\n' if code.endswith('\n') else '')
+    else:
+        return code
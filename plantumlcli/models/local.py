@@ -1,11 +1,27 @@
 import os
 import re
 import shutil
-from tempfile import TemporaryDirectory, NamedTemporaryFile
-from typing import Tuple, Optional, Mapping, Any
+import time
+import zipfile
+from tempfile import TemporaryDirectory, NamedTemporaryFile, mkstemp
+from threading import Lock
+from typing import Tuple, Optional, Mapping, Any, Iterable, Iterator, Union, List, Dict
 
-from .base import Plantuml, PlantumlResourceType, _has_cairosvg
-from ..utils import load_binary_file, save_text_file, CommandLineExecuteError, execute
+from .base import Plantuml, PlantumlResourceType, PlantumlSyntaxResult, _has_cairosvg
+from .cds import get_cds_archive, build_cds_archive, cds_options
+from .jvm import get_tuned_jvm_options, tune_jvm_options
+from .launcher import find_launcher, launcher_command, launcher_uses_java, launcher_uses_plantuml, check_launcher
+from .layout import PlantumlLayout, layout_args, apply_layout
+from .metrics import PlantumlMetrics, metrics_args, metrics_jvm_options, parse_duration, parse_stats_html, \
+    STATS_HTML_FILE
+from .pipe import is_pipe_safe, pipe_args, pipe_input, unpack_pipe_output, new_pipe_delimiter, \
+    PLANTUML_ERROR_EXITCODE, _START_PATTERN, _split_blocks
+from .pool import LocalPlantumlPool, LocalPlantumlWorker
+from .preamble import preamble_args, _check_preamble
+from .threads import get_tuned_threads, tune_threads
+from ..download import get_plantuml_jar_file
+from ..utils import load_binary_file, save_binary_file, save_text_file, CommandLineExecuteError, \
+    CommandLineTimeoutError, execute, execute_stream, jvm_memory_size, jvm_memory_budget
 
 PLANTUML_JAR_ENV = 'PLANTUML_JAR'
 
@@ -22,11 +38,17 @@ def find_plantuml_from_env() -> Optional[str]:
     return os.environ.get(PLANTUML_JAR_ENV, None)
 
 
-def find_plantuml(plantuml: Optional[str] = None) -> Optional[str]:
-    return plantuml or find_plantuml_from_env()
+def find_plantuml(plantuml: Optional[str] = None, version: Optional[str] = None) -> Optional[str]:
+    if plantuml:
+        return plantuml
+    elif version:
+        # cached jar is verified by its stamp, downloaded when not cached
+        return get_plantuml_jar_file(version)
+    else:
+        return find_plantuml_from_env()
 
 
-def _check_local(java: str, plantuml: str):
+def _check_java(java: str):
     if not java:
         raise ValueError('Java executable not given.')
     if not os.path.exists(java):
@@ -36,6 +58,8 @@ def _check_local(java: str, plantuml: str):
     if not os.access(java, os.X_OK):
         raise PermissionError(f'Java executable {java!r} not executable.')  # pragma: no cover
 
+
+def _check_plantuml(plantuml: str):
     if not plantuml:
         raise ValueError('Plantuml jar file not given.')
     if not os.path.exists(plantuml):
@@ -46,32 +70,301 @@ def _check_local(java: str, plantuml: str):
         raise PermissionError(f'Plantuml jar file {plantuml!r} not readable.')  # pragma: no cover
 
 
+def _check_local(java: str, plantuml: str, launcher: Optional[str] = None):
+    if launcher is None:
+        _check_java(java)
+        _check_plantuml(plantuml)
+    else:
+        # java and plantuml jar are checked only when used by the launcher
+        if launcher_uses_java(launcher):
+            _check_java(java)
+        if launcher_uses_plantuml(launcher):
+            _check_plantuml(plantuml)
+        check_launcher(launcher_command(launcher, java, plantuml))
+
+
 class LocalPlantumlExecuteError(CommandLineExecuteError):
     pass
 
 
+class LocalPlantumlTimeoutError(LocalPlantumlExecuteError, CommandLineTimeoutError):
+    pass
+
+
+_MANIFEST_FILE = 'META-INF/MANIFEST.MF'
+_PLANTUML_MAIN_CLASS_PATTERN = re.compile(r'^net\.sourceforge\.plantuml\.\w+$')
+_JAR_VERSION_PATTERN = re.compile(r'^\d+(?:\.\d+)+[\w.\-]*$')
+
+
+def _parse_manifest(content: str) -> Dict[str, str]:
+    _items, _last = {}, None
+    for line in content.splitlines():
+        if line.startswith(' ') and _last is not None:
+            _items[_last] += line[1:]
+        elif ':' in line:
+            _last, _value = line.split(':', 1)
+            _items[_last] = _value.strip()
+        else:
+            _last = None
+    return _items
+
+
+def _read_jar_version(plantuml: str) -> Optional[str]:
+    """
+    Read version of plantuml from the manifest of jar file, without launching jvm
+    :param plantuml: path of plantuml jar file
+    :return: version information, None when not found
+    """
+    try:
+        with zipfile.ZipFile(plantuml) as jar:
+            _content = jar.read(_MANIFEST_FILE).decode('utf-8', errors='replace')
+    except (zipfile.BadZipFile, KeyError, OSError):
+        return None
+
+    _manifest = _parse_manifest(_content)
+    _main_class = _manifest.get('Main-Class', '').strip()
+    _version = _manifest.get('Implementation-Version', '').strip()
+    if _PLANTUML_MAIN_CLASS_PATTERN.fullmatch(_main_class) and _JAR_VERSION_PATTERN.fullmatch(_version):
+        return f'PlantUML version {_version}'
+    else:
+        return None
+
+
+_FILE_MESSAGE_PATTERN = re.compile(r'(?:in file:|no image in)\s*(?P<path>.+?)\s*$', re.IGNORECASE)
+_NAMED_START_PATTERN = re.compile(r'^\s*@start\w+[ \t(]+\S', re.MULTILINE)
+_OUTPUT_FILE_PATTERN = re.compile(r'^(?P<index>\d+)(?:_(?P<page>\d+))?\.[^.]+$')
+
+
+def _parse_files_messages(stderr: str) -> Dict[int, List[str]]:
+    _messages = {}
+    for line in stderr.splitlines():
+        _matching = _FILE_MESSAGE_PATTERN.search(line)
+        if _matching:
+            _name, _ = os.path.splitext(os.path.basename(_matching.group('path')))
+            if _name.isdigit():
+                _messages.setdefault(int(_name), []).append(line.strip())
+
+    return _messages
+
+
+def _save_input_files(input_dir: str, codes: List[str]) -> List[str]:
+    _input_files = []
+    for index, code in enumerate(codes):
+        if _NAMED_START_PATTERN.search(code):
+            # named diagrams are not saved as <index>.xxx, they will be rendered standalone
+            continue
+        _input_file = os.path.join(input_dir, f'{index}.puml')
+        save_text_file(_input_file, code)
+        _input_files.append(_input_file)
+
+    return _input_files
+
+
+def _map_output_files(filenames: List[str]) -> Dict[int, List[Tuple[str, int]]]:
+    _outputs = {}
+    for filename in filenames:
+        _matching = _OUTPUT_FILE_PATTERN.fullmatch(filename)
+        if _matching:
+            _page = int(_matching.group('page') or '0')
+            _outputs.setdefault(int(_matching.group('index')), []).append((filename, _page))
+
+    return {index: sorted(files, key=lambda x: x[1]) for index, files in _outputs.items()}
+
+
+_PIPE_HEAD_SIZE = 1 << 16  # head of pipe output kept for parsing error
+_BATCH_TIMEOUT_FACTOR = 4  # a stuck batch is given up after this many timeouts, however large it is
+
+
+def _batch_timeout(timeout: Optional[float], count: int) -> Optional[float]:
+    return timeout * min(count, _BATCH_TIMEOUT_FACTOR) if timeout is not None else None
+
+
+def _get_umask() -> int:
+    # umask can only be read by setting it, which is not thread-safe, so it is read once when imported
+    _umask = os.umask(0)
+    os.umask(_umask)
+    return _umask
+
+
+_UMASK = _get_umask()
+
+_SYNTAX_ERROR_HEADER = 'ERROR'
+_SYNTAX_HEADER_PATTERN = re.compile(r'^[A-Z][A-Z0-9_]*$')
+
+
+def _syntax_marker_code(marker: str) -> str:
+    # always failed with the marker in message, used for splitting the output of -syntax
+    return f'@startuml\n!assert 1 == 0 : {marker}\n@enduml'
+
+
+def _parse_syntax_records(stdout: str) -> List[Tuple[str, List[str]]]:
+    """
+    Parse the output of ``-syntax`` into records, ``(TYPE, [description])`` for the okay diagrams and
+    ``(ERROR, [position, *messages])`` for the failed ones.
+    """
+    _lines = [line.rstrip() for line in stdout.splitlines()]
+    _records, _index = [], 0
+    while _index < len(_lines):
+        _header, _body = _lines[_index].strip(), []
+        _index += 1
+        if _header == _SYNTAX_ERROR_HEADER:
+            while _index < len(_lines) and (not _body or not _SYNTAX_HEADER_PATTERN.fullmatch(_lines[_index].strip())):
+                _body.append(_lines[_index])
+                _index += 1
+        elif _header and _index < len(_lines):
+            _body.append(_lines[_index])
+            _index += 1
+        if _header:
+            _records.append((_header, _body))
+
+    return _records
+
+
+def _syntax_result(code: str, records: List[Tuple[str, List[str]]]) -> PlantumlSyntaxResult:
+    if not records:
+        return PlantumlSyntaxResult(False, message='No diagram found.')
+
+    _starts = [start for start, _ in _split_blocks(code)]
+    _types, _errors = [], []
+    for index, (header, body) in enumerate(records):
+        if header == _SYNTAX_ERROR_HEADER:
+            _position = body[0].strip() if body else ''
+            _start = _starts[index] if index < len(_starts) else 0
+            _line = _start + int(_position) + 1 if _position.isdigit() else None
+            _errors.append((_line, os.linesep.join(line.strip() for line in body[1:] if line.strip())))
+        else:
+            _types.append(header)
+
+    if _errors:
+        _line, _message = _errors[0]
+        return PlantumlSyntaxResult(False, tuple(_types), _line, _message)
+    else:
+        return PlantumlSyntaxResult(True, tuple(_types))
+
+
+def _is_unterminated(code: str) -> bool:
+    _blocks = _split_blocks(code)
+    _last_end = _blocks[-1][1] if _blocks else -1
+    return any(_START_PATTERN.match(line) for line in code.splitlines()[_last_end + 1:])
+
+
+_NEWPAGE_PATTERN = re.compile(r'^\s*newpage\b', re.MULTILINE | re.IGNORECASE)
+_START_NAME_PATTERN = re.compile(r'^(\s*@start\w+)[ \t(].*$', re.MULTILINE)
+
+
+def _is_multi_page(code: str) -> bool:
+    return len(_split_blocks(code)) > 1 or bool(_NEWPAGE_PATTERN.search(code))
+
+
+def _anonymize_starts(code: str) -> str:
+    # named diagrams are saved as <name>.xxx, without names all the pages are saved as <index>[_<page>].xxx
+    return _START_NAME_PATTERN.sub(r'\1', code)
+
+
 class LocalPlantuml(Plantuml):
-    def __init__(self, java: str, plantuml: str):
+    def __init__(self, java: str, plantuml: str, pool_size: int = 0, pool_max_jobs: Optional[int] = None,
+                 use_pipe: bool = True, use_cds: bool = True, max_heap: Optional[str] = None,
+                 timeout: Optional[float] = None, retries: int = 0,
+                 layout: Union[int, str, PlantumlLayout] = PlantumlLayout.DOT, threads: Optional[int] = None,
+                 config: Optional[str] = None, launcher: Optional[str] = None,
+                 jvm_options: Optional[Iterable[str]] = None):
         """
         :param java: java executable file path
         :param plantuml: plantuml jar file path
+        :param pool_size: amount of resident plantuml processes, 0 means no resident process
+        :param pool_max_jobs: max jobs before recycling a resident process, None means never
+        :param use_pipe: use pipe mode (stdin and stdout) of plantuml when possible, otherwise temporary files
+        :param use_cds: use the prebuilt cds archive of java and plantuml when present
+        :param max_heap: max heap size of each jvm process (such as ``512m``), None means default
+        :param timeout: deadline of rendering each diagram in seconds, None means no limit
+        :param retries: retry times when rendering is timeout
+        :param layout: layout engine of graph diagrams, ``dot``, ``smetana`` or ``auto`` (smetana is used for
+            the diagrams which have the equivalent layout)
+        :param threads: internal threads of each jvm process when rendering batches (``-nbthread``),
+            None means the tuned value on this host (1 when not tuned)
+        :param config: preamble file shared by all the diagrams, passed to each jvm process once (``-config``),
+            None means no preamble
+        :param launcher: launcher command template used instead of ``java -jar plantuml.jar``, such as a native
+            build of plantuml, ``{java}`` and ``{plantuml}`` in it are replaced, None means the stock jvm
+        :param jvm_options: options of each jvm process (such as ``-XX:TieredStopAtLevel=1``),
+            None means the tuned options on this host (no option when not tuned)
         """
         Plantuml.__init__(self)
 
         self.__java = java
         self.__plantuml = plantuml
-        _check_local(self.__java, self.__plantuml)
+        self.__launcher = launcher
+        _check_local(self.__java, self.__plantuml, self.__launcher)
+        self.__use_pipe = use_pipe
+        self.__use_cds = use_cds
+        self.__cds_archive_loaded = False
+        self.__cds_archive = None
+        self.__cds_lock = Lock()
+        # normalized, so sizes like 512MB are accepted by -Xmx
+        self.__max_heap = jvm_memory_size(max_heap) if max_heap is not None else None
+        self.__timeout = timeout
+        self.__retries = retries
+        self.__layout = PlantumlLayout.load(layout)
+        if threads is not None and threads < 1:
+            raise ValueError(f'Threads should be no less than 1, but {threads!r} found.')
+        self.__threads = threads
+        self.__jvm_options_value = tuple(jvm_options) if jvm_options is not None else None
+        self.__config = config
+        if self.__config is not None:
+            _check_preamble(self.__config)
+        self.__standby: Dict[str, List[LocalPlantumlWorker]] = {}
+        self.__standby_lock = Lock()
+
+        if pool_size > 0:
+            self.__pool = LocalPlantumlPool(
+                command_line=lambda type_name: self._command_line(f'-t{type_name}'),
+                size=pool_size, max_jobs=pool_max_jobs,
+                exc=LocalPlantumlExecuteError, timeout_exc=LocalPlantumlTimeoutError,
+            )
+        else:
+            self.__pool = None
 
     @classmethod
-    def autoload(cls, java: Optional[str] = None, plantuml: Optional[str] = None, **kwargs) -> 'LocalPlantuml':
+    def autoload(cls, java: Optional[str] = None, plantuml: Optional[str] = None,
+                 pool_size: int = 0, pool_max_jobs: Optional[int] = None, use_pipe: bool = True,
+                 use_cds: bool = True, max_heap: Optional[str] = None,
+                 timeout: Optional[float] = None, retries: int = 0,
+                 layout: Union[int, str, PlantumlLayout] = PlantumlLayout.DOT, threads: Optional[int] = None,
+                 config: Optional[str] = None, launcher: Optional[str] = None,
+                 jvm_options: Optional[Iterable[str]] = None, version: Optional[str] = None,
+                 **kwargs) -> 'LocalPlantuml':
         """
         Autoload LocalPlantuml object from given parameters and the environment
         :param java: java executable file path
         :param plantuml: plantuml jar file path
+        :param pool_size: amount of resident plantuml processes, 0 means no resident process
+        :param pool_max_jobs: max jobs before recycling a resident process, None means never
+        :param use_pipe: use pipe mode (stdin and stdout) of plantuml when possible, otherwise temporary files
+        :param use_cds: use the prebuilt cds archive of java and plantuml when present
+        :param max_heap: max heap size of each jvm process (such as ``512m``), None means default
+        :param timeout: deadline of rendering each diagram in seconds, None means no limit
+        :param retries: retry times when rendering is timeout
+        :param layout: layout engine of graph diagrams, ``dot``, ``smetana`` or ``auto`` (smetana is used for
+            the diagrams which have the equivalent layout)
+        :param threads: internal threads of each jvm process when rendering batches (``-nbthread``),
+            None means the tuned value on this host (1 when not tuned)
+        :param config: preamble file shared by all the diagrams, passed to each jvm process once (``-config``),
+            None means no preamble
+        :param launcher: launcher command template used instead of ``java -jar plantuml.jar``, such as a native
+            build of plantuml, ``{java}`` and ``{plantuml}`` in it are replaced, None means the stock jvm
+        :param jvm_options: options of each jvm process (such as ``-XX:TieredStopAtLevel=1``),
+            None means the tuned options on this host (no option when not tuned)
+        :param version: version of plantuml jar used when ``plantuml`` is not given, the jar is downloaded
+            to cache when not cached, None means the jar from environment
         :param kwargs: other arguments
         :return: local plantuml object
         """
-        return LocalPlantuml(find_java(java), find_plantuml(plantuml))
+        return LocalPlantuml(
+            find_java(java), find_plantuml(plantuml, version),
+            pool_size=pool_size, pool_max_jobs=pool_max_jobs, use_pipe=use_pipe, use_cds=use_cds,
+            max_heap=max_heap, timeout=timeout, retries=retries, layout=layout, threads=threads, config=config,
+            launcher=find_launcher(launcher), jvm_options=jvm_options,
+        )
 
     @property
     def java(self) -> str:
@@ -89,20 +382,295 @@ class LocalPlantuml(Plantuml):
         """
         return self.__plantuml
 
+    @property
+    def launcher(self) -> Optional[str]:
+        """
+        Launcher command template used instead of ``java -jar plantuml.jar``
+        :return: launcher command template, None means the stock jvm
+        """
+        return self.__launcher
+
+    @property
+    def launch_command(self) -> Tuple[str, ...]:
+        """
+        Command line used to start plantuml, the arguments of plantuml are appended after it
+        :return: command line
+        """
+        if self.__launcher is not None:
+            return launcher_command(self.__launcher, self.__java, self.__plantuml)
+        else:
+            return (self.__java, *self.__jvm_options(), '-jar', self.__plantuml)
+
+    @property
+    def use_pipe(self) -> bool:
+        """
+        Pipe mode of plantuml is used or not
+        :return: True if used, otherwise False
+        """
+        return self.__use_pipe
+
+    @property
+    def max_heap(self) -> Optional[str]:
+        """
+        Max heap size of each jvm process
+        :return: max heap size, None means default
+        """
+        return self.__max_heap
+
+    @property
+    def timeout(self) -> Optional[float]:
+        """
+        Deadline of rendering each diagram
+        :return: timeout in seconds, None means no limit
+        """
+        return self.__timeout
+
+    @property
+    def retries(self) -> int:
+        """
+        Retry times when rendering is timeout
+        :return: retry times
+        """
+        return self.__retries
+
+    @property
+    def layout(self) -> PlantumlLayout:
+        """
+        Layout engine of graph diagrams
+        :return: layout engine
+        """
+        return self.__layout
+
+    @property
+    def config(self) -> Optional[str]:
+        """
+        Preamble file shared by all the diagrams
+        :return: path of preamble file, None means no preamble
+        """
+        return self.__config
+
+    @property
+    def threads(self) -> int:
+        """
+        Internal threads of each jvm process when rendering batches
+        :return: amount of threads
+        """
+        if self.__threads is None and self.__launcher is not None:
+            self.__threads = 1  # tuned values are measured with the stock jvm
+        elif self.__threads is None:
+            try:
+                self.__threads = get_tuned_threads(self.__java, self.__plantuml) or 1
+            except OSError:
+                self.__threads = 1
+        return self.__threads
+
+    def tune_threads(self, splits: Optional[List[int]] = None, count: Optional[int] = None) -> int:
+        """
+        Measure the best internal threads of each jvm process on this host, it will be used by the later batches
+        :param splits: candidates of internal threads, None means from 1 to cpu count
+        :param count: amount of diagrams in tuning corpus, None means 4 for each cpu
+        :return: best internal threads
+        """
+        if self.__launcher is not None:
+            raise ValueError(f'Threads can only be tuned for the stock jvm, but launcher {self.__launcher!r} used.')
+        self.__threads = tune_threads(self.__java, self.__plantuml, self._command_line, splits=splits, count=count)
+        return self.__threads
+
+    @property
+    def jvm_options(self) -> Tuple[str, ...]:
+        """
+        Options of each jvm process, not used by custom launcher
+        :return: tuple of jvm options
+        """
+        if self.__jvm_options_value is None and self.__launcher is not None:
+            self.__jvm_options_value = ()  # tuned options are measured with the stock jvm
+        elif self.__jvm_options_value is None:
+            try:
+                self.__jvm_options_value = get_tuned_jvm_options(self.__java, self.__plantuml) or ()
+            except OSError:
+                self.__jvm_options_value = ()
+        return self.__jvm_options_value
+
+    def tune_jvm_options(self, codes: Optional[List[str]] = None,
+                         profiles: Optional[Mapping[str, Tuple[str, ...]]] = None) -> Tuple[str, ...]:
+        """
+        Measure the candidate profiles of jvm options on this host, the fastest one will be used by the later
+        processes (including the ones of other plantuml objects with the same java and plantuml jar)
+        :param codes: sample of source codes, None means the built-in tuning corpus
+        :param profiles: candidate profiles (name to jvm options), None means the built-in profiles
+        :return: jvm options of the fastest profile
+        """
+        if self.__launcher is not None:
+            raise ValueError(f'Jvm options can only be tuned for the stock jvm, '
+                             f'but launcher {self.__launcher!r} used.')
+        self.__jvm_options_value = tune_jvm_options(
+            self.__java, self.__plantuml,
+            lambda *args, jvm_options=(): self._command_line(*args, jvm_options=jvm_options, use_profile=False),
+            codes=codes, profiles=profiles,
+        )
+        return self.__jvm_options_value
+
+    @property
+    def memory_budget(self) -> int:
+        """
+        Memory budget of each jvm process, used for admission of concurrent processes
+        :return: memory budget in bytes
+        """
+        return jvm_memory_budget(self.__max_heap)
+
+    @property
+    def cds_archive(self) -> Optional[str]:
+        """
+        Cds archive used by this plantuml, stale archive will be rebuilt
+        :return: path of cds archive, None when not used
+        """
+        if self.__use_cds and self.__launcher is None and not self.__cds_archive_loaded:
+            with self.__cds_lock:  # stale archive is rebuilt by only one of the concurrent renders
+                if not self.__cds_archive_loaded:
+                    try:
+                        self.__cds_archive = get_cds_archive(self.__java, self.__plantuml)
+                    except OSError:
+                        self.__cds_archive = None
+                    self.__cds_archive_loaded = True
+        return self.__cds_archive
+
+    def build_cds(self) -> Optional[str]:
+        """
+        Build cds archive for this plantuml, it will be used by the later processes
+        :return: path of cds archive, None when not supported by java or launcher is used
+        """
+        if self.__launcher is not None:
+            return None
+        with self.__cds_lock:
+            self.__cds_archive = build_cds_archive(self.__java, self.__plantuml)
+            self.__cds_archive_loaded = True
+            return self.__cds_archive
+
+    @property
+    def pool(self) -> Optional[LocalPlantumlPool]:
+        """
+        Pool of resident plantuml processes
+        :return: pool object, None when not enabled
+        """
+        return self.__pool
+
+    def __new_worker(self, type_name: str) -> LocalPlantumlWorker:
+        return LocalPlantumlWorker(self._command_line(f'-t{type_name}'),
+                                   exc=LocalPlantumlExecuteError, timeout_exc=LocalPlantumlTimeoutError)
+
+    def warm_up(self, type_: Union[int, str, PlantumlResourceType], count: int = 1) -> int:
+        """
+        Start plantuml processes speculatively before the source codes are ready, they will be handed the first
+        jobs of the resource type, so the jvm startup is overlapped with the preparation of caller.
+        Failure is ignored, the jobs will be rendered as usual.
+        :param type_: resource type of the coming jobs
+        :param count: amount of processes
+        :return: amount of processes started
+        """
+        type_ = PlantumlResourceType.load(type_)
+        self._check_type_supported(type_)
+        if not self.__use_pipe or count < 1:
+            return 0
+        if type_ == PlantumlResourceType.PDF and _has_cairosvg():
+            type_ = PlantumlResourceType.SVG
+
+        _type_name = type_.name.lower()
+        if self.__pool is not None:
+            try:
+                return self.__pool.prespawn(_type_name, count)
+            except OSError:
+                return 0
+
+        _workers = []
+        try:
+            for _ in range(count):
+                _workers.append(self.__new_worker(_type_name))
+        except OSError:
+            pass
+        with self.__standby_lock:
+            self.__standby.setdefault(_type_name, []).extend(_workers)
+        return len(_workers)
+
+    @property
+    def standby(self) -> int:
+        """
+        Amount of the plantuml processes started by :meth:`warm_up` and not used yet
+        :return: amount of processes
+        """
+        with self.__standby_lock:
+            return sum(len(workers) for workers in self.__standby.values())
+
+    def __take_standby(self, type_name: str) -> Optional[LocalPlantumlWorker]:
+        worker, _retired = None, []
+        with self.__standby_lock:
+            _workers = self.__standby.get(type_name, [])
+            while _workers and worker is None:
+                _worker = _workers.pop(0)
+                if _worker.alive:
+                    worker = _worker
+                else:
+                    _retired.append(_worker)
+
+        for _worker in _retired:
+            _worker.close()
+        return worker
+
+    def close(self):
+        with self.__standby_lock:
+            _workers = [worker for workers in self.__standby.values() for worker in workers]
+            self.__standby.clear()
+        for worker in _workers:
+            worker.close()
+        if self.__pool is not None:
+            self.__pool.close()
+
     def _properties(self) -> Mapping[str, Any]:
         return {
             'java': self.__java,
             'plantuml': self.__plantuml,
+            **({'launcher': self.__launcher} if self.__launcher is not None else {}),
         }
 
-    def __execute(self, *args) -> Tuple[str, str]:
-        return execute(self.__java, '-jar', self.__plantuml, *args, exc=LocalPlantumlExecuteError)
+    def __jvm_options(self, use_profile: bool = True) -> Tuple[str, ...]:
+        _options = list(self.jvm_options) if use_profile else []
+        if self.__max_heap:  # put after the profile, so it takes effect
+            _options.append(f'-Xmx{self.__max_heap}')
+        _cds_archive = self.cds_archive
+        if _cds_archive:
+            _options.extend(cds_options(_cds_archive))
+        return tuple(_options)
+
+    def _command_line(self, *args, jvm_options: Tuple[str, ...] = (), use_profile: bool = True) -> Tuple[str, ...]:
+        if self.__launcher is not None:
+            # jvm options are up to the launcher
+            _launch_command = launcher_command(self.__launcher, self.__java, self.__plantuml)
+        else:
+            _launch_command = (self.__java, *self.__jvm_options(use_profile), *jvm_options, '-jar', self.__plantuml)
+        return (*_launch_command, *layout_args(self.__layout), *preamble_args(self.__config), *args)
+
+    def __execute(self, *args, timeout: Optional[float] = None) -> Tuple[str, str]:
+        return execute(*self._command_line(*args), exc=LocalPlantumlExecuteError,
+                       timeout=timeout, timeout_exc=LocalPlantumlTimeoutError)
+
+    def __retry(self, func, *args):
+        _tries = 0
+        while True:
+            try:
+                return func(*args)
+            except LocalPlantumlTimeoutError:
+                _tries += 1
+                if _tries > self.__retries:
+                    raise
 
     def _check_version(self, version: str):
         if (not version) or ("plantuml" not in version.lower()):
             raise ValueError(f"Invalid version of plantuml - {version!r}.")
 
     def _get_version(self) -> str:
+        _version = _read_jar_version(self.__plantuml) if self.__launcher is None else None
+        if _version is not None:
+            return _version
+
         _stdout, _ = self.__execute('-version')
         _lines = _stdout.strip().splitlines()
         _first_line = _lines[0].strip() if _lines else ''
@@ -110,20 +678,392 @@ class LocalPlantuml(Plantuml):
         _line, _ = re.subn(r'\\s+', '', _line)
         return _line.strip()
 
+    def __check_syntax_by_pipe(self, codes: List[str]) -> List[PlantumlSyntaxResult]:
+        """
+        Check syntax of all the codes with one plantuml process, by ``-syntax`` with stdin.
+        A marker diagram is put after each code, so the output can be split back to the codes.
+        """
+        _marker = new_pipe_delimiter()
+        _command_line = self._command_line('-syntax', '-charset', 'UTF-8')
+        try:
+            _stdout, _ = execute(
+                *_command_line, exc=LocalPlantumlExecuteError,
+                stdin=b''.join(pipe_input(code) + pipe_input(_syntax_marker_code(_marker)) for code in codes),
+                timeout=_batch_timeout(self.__timeout, len(codes)),
+                timeout_exc=LocalPlantumlTimeoutError,
+            )
+        except LocalPlantumlExecuteError as err:
+            if err.exitcode != PLANTUML_ERROR_EXITCODE or err.stdout is None:
+                raise
+            _stdout = err.stdout
+
+        _groups, _current = [], []
+        for header, body in _parse_syntax_records(_stdout):
+            if header == _SYNTAX_ERROR_HEADER and any(_marker in line for line in body):
+                _groups.append(_current)
+                _current = []
+            else:
+                _current.append((header, body))
+        if len(_groups) != len(codes):
+            # When you see this error, it means bug, please open an issue for help us fix this
+            raise LocalPlantumlExecuteError(_command_line, PLANTUML_ERROR_EXITCODE, _stdout,
+                                            'Unable to parse the output of syntax checking.')  # pragma: no cover
+
+        return [_syntax_result(code, records) for code, records in zip(codes, _groups)]
+
+    def _check_syntax(self, code: str) -> PlantumlSyntaxResult:
+        _result, = self._check_syntax_batch([code])
+        return _result
+
+    def _check_syntax_batch(self, codes: Iterable[str]) -> Iterator[PlantumlSyntaxResult]:
+        codes = list(codes)
+        _indices = [index for index, code in enumerate(codes) if not _is_unterminated(code)]
+        _results = dict(zip(_indices, self.__retry(self.__check_syntax_by_pipe, [codes[index] for index in _indices])
+                            if _indices else []))
+        for index, code in enumerate(codes):
+            if index in _results:
+                yield _results[index]
+            else:
+                # the end tag is missing, it will swallow the marker diagram, so it is not sent to plantuml
+                yield PlantumlSyntaxResult(False, message='Diagram is not ended.')
+
+    def __generate_by_file(self, type_: PlantumlResourceType, code: str, path: Optional[str] = None) \
+            -> Optional[bytes]:
+        """
+        Render the code with temporary files, when ``path`` is given, the output file is moved to it
+        instead of being loaded, and None is returned.
+        """
+        with TemporaryDirectory(prefix='puml') as output_path_name:
+            with NamedTemporaryFile(prefix='puml', suffix='.puml') as input_file:
+                save_text_file(input_file.name, code)
+                self.__execute(f'-t{type_.name.lower()}', '-o', output_path_name, input_file.name,
+                               timeout=self.__timeout)
+                _file_list = sorted(os.listdir(output_path_name))
+                if _file_list:
+                    output_filename = os.path.join(output_path_name, _file_list[0])
+                    if path is not None:
+                        shutil.move(output_filename, path)
+                        return None
+                    return load_binary_file(output_filename)
+                else:
+                    # When you see this error, it means bug, please open an issue for help us fix this
+                    raise FileNotFoundError(f'No expected file found in {output_path_name!r}.')  # pragma: no cover
+
+    def __generate_pages_by_file(self, type_: PlantumlResourceType, code: str) -> List[bytes]:
+        """
+        Render all the pages of the code with one plantuml process. The names of diagrams are removed,
+        so the pages are saved as ``0.xxx``, ``0_001.xxx``, ... and can be loaded in order.
+        """
+        with TemporaryDirectory(prefix='puml') as workdir:
+            input_filename = os.path.join(workdir, '0.puml')
+            output_path_name = os.path.join(workdir, 'output')
+            save_text_file(input_filename, _anonymize_starts(code))
+            self.__execute(f'-t{type_.name.lower()}', '-o', output_path_name, input_filename, timeout=self.__timeout)
+
+            _files = _map_output_files(os.listdir(output_path_name) if os.path.exists(output_path_name) else [])
+            if 0 not in _files:
+                # When you see this error, it means bug, please open an issue for help us fix this
+                raise FileNotFoundError(f'No expected file found in {output_path_name!r}.')  # pragma: no cover
+            return [load_binary_file(os.path.join(output_path_name, filename)) for filename, _ in _files[0]]
+
+    def __generate_by_pipe(self, type_: PlantumlResourceType, code: str) -> Optional[bytes]:
+        _command_line = self._command_line(f'-t{type_.name.lower()}', *pipe_args())
+        try:
+            _stdout, _ = execute(*_command_line, exc=LocalPlantumlExecuteError, stdin=pipe_input(code), decode=False,
+                                 timeout=self.__timeout, timeout_exc=LocalPlantumlTimeoutError)
+        except LocalPlantumlExecuteError as err:
+            if err.exitcode == PLANTUML_ERROR_EXITCODE and err.stdout:
+                unpack_pipe_output(_command_line, code, err.stdout, LocalPlantumlExecuteError)
+            raise
+
+        return _stdout or None
+
+    def __generate_with_metrics(self, type_: PlantumlResourceType, code: str) -> Tuple[bytes, PlantumlMetrics]:
+        """
+        Render the code with a standalone plantuml process, and collect the statistics of it.
+        The statistics of plantuml are aggregated by session, so only one diagram is rendered in the process.
+        """
+        with TemporaryDirectory(prefix='puml') as workdir:
+            _use_pipe = self.__use_pipe and is_pipe_safe(code)
+            output_path_name = os.path.join(workdir, 'output')
+            if _use_pipe:
+                _args, _stdin = pipe_args(), pipe_input(code)
+            else:
+                input_filename = os.path.join(workdir, 'input.puml')
+                save_text_file(input_filename, code)
+                _args, _stdin = ('-o', output_path_name, input_filename), None
+
+            _command_line = self._command_line(f'-t{type_.name.lower()}', *metrics_args(), *_args,
+                                               jvm_options=metrics_jvm_options(workdir))
+            _start = time.time()
+            try:
+                _stdout, _stderr = execute(*_command_line, exc=LocalPlantumlExecuteError, stdin=_stdin, decode=False,
+                                           timeout=self.__timeout, timeout_exc=LocalPlantumlTimeoutError, cwd=workdir)
+            except LocalPlantumlExecuteError as err:
+                if _use_pipe and err.exitcode == PLANTUML_ERROR_EXITCODE and err.stdout:
+                    unpack_pipe_output(_command_line, code, err.stdout, LocalPlantumlExecuteError)
+                raise
+            _wall_time = time.time() - _start
+
+            if _use_pipe:
+                _data = _stdout
+            else:
+                _file_list = os.listdir(output_path_name) if os.path.exists(output_path_name) else []
+                _data = load_binary_file(os.path.join(output_path_name, sorted(_file_list)[0])) if _file_list else None
+            if not _data:
+                # When you see this error, it means bug, please open an issue for help us fix this
+                raise FileNotFoundError(f'No expected output found in {workdir!r}.')  # pragma: no cover
+
+            _stats_file = os.path.join(workdir, STATS_HTML_FILE)
+            if os.path.exists(_stats_file):
+                with open(_stats_file, 'r', encoding='utf-8', errors='replace') as f:
+                    _types, _parse_time, _generation_time = parse_stats_html(f.read())
+            else:
+                _types, _parse_time, _generation_time = (), None, None
+
+            return _data, PlantumlMetrics(_wall_time, parse_duration(_stderr), _types, _parse_time, _generation_time)
+
+    def dump_binary_with_metrics(self, type_: Union[int, str, PlantumlResourceType], code: str) \
+            -> Tuple[bytes, PlantumlMetrics]:
+        """
+        Dump uml data to bytes, with the timing metrics of plantuml.
+        It is always rendered by a standalone jvm process (the resident processes are not used),
+        so the startup of jvm can be told apart from the parsing and generation of diagram.
+        :param type_: resource type
+        :param code: source code
+        :return: tuple of uml data and metrics
+        """
+        if self.__launcher is not None:
+            # the java preferences where plantuml keeps statistics can only be redirected by jvm options
+            raise ValueError(f'Metrics can only be collected with the stock jvm, '
+                             f'but launcher {self.__launcher!r} used.')
+        type_ = PlantumlResourceType.load(type_)
+        self._check_type_supported(type_)
+        code = apply_layout(code, self.__layout) if self.__layout == PlantumlLayout.AUTO else code
+        if type_ == PlantumlResourceType.PDF and _has_cairosvg():
+            import cairosvg
+
+            _data, _metrics = self.__retry(self.__generate_with_metrics, PlantumlResourceType.SVG, code)
+            return cairosvg.svg2pdf(bytestring=_data), _metrics
+        else:
+            return self.__retry(self.__generate_with_metrics, type_, code)
+
+    def __dump_by_pipe(self, path: str, type_: PlantumlResourceType, code: str) -> bool:
+        """
+        Stream the output of plantuml to a temporary file beside ``path``, and move it to ``path`` when completed,
+        so the output is never held in memory. Only the head of output is kept for parsing the error message.
+        :return: False when nothing is written to stdout
+        """
+        _command_line = self._command_line(f'-t{type_.name.lower()}', *pipe_args())
+        _fd, _temp_file = mkstemp(prefix='.puml', suffix='.part', dir=os.path.dirname(os.path.abspath(path)))
+        os.chmod(_temp_file, 0o666 & ~_UMASK)  # mkstemp creates 0600, keep the permissions of a plain new file
+        try:
+            _head, _size = b'', 0
+            with os.fdopen(_fd, 'wb') as f:
+                try:
+                    for chunk in execute_stream(*_command_line, exc=LocalPlantumlExecuteError, stdin=pipe_input(code),
+                                                timeout=self.__timeout, timeout_exc=LocalPlantumlTimeoutError):
+                        if len(_head) < _PIPE_HEAD_SIZE:
+                            _head += chunk[:_PIPE_HEAD_SIZE - len(_head)]
+                        f.write(chunk)
+                        _size += len(chunk)
+                except LocalPlantumlExecuteError as err:
+                    if err.exitcode == PLANTUML_ERROR_EXITCODE and _head:
+                        unpack_pipe_output(_command_line, code, _head, LocalPlantumlExecuteError)
+                    raise
+
+            if _size > 0:
+                os.replace(_temp_file, path)
+                return True
+            else:
+                return False
+        finally:
+            if os.path.exists(_temp_file):
+                os.remove(_temp_file)
+
+    def __dump_single(self, path: str, type_: PlantumlResourceType, code: str):
+        if self.__use_pipe and is_pipe_safe(code):
+            if self.__dump_by_pipe(path, type_, code):
+                return
+            # nothing written to stdout, this jar misbehaves in pipe mode, so stop using it
+            self.__use_pipe = False
+        self.__generate_by_file(type_, code, path)
+
+    def _dump_uml_data(self, path: str, type_: PlantumlResourceType, code: str):
+        self._check_type_supported(type_)
+        if (type_ == PlantumlResourceType.PDF and _has_cairosvg()) or self.__pool is not None or self.standby:
+            # rendered in memory, by resident processes or converted by cairosvg
+            save_binary_file(path, self._generate_uml_data(type_, code))
+        else:
+            code = apply_layout(code, self.__layout) if self.__layout == PlantumlLayout.AUTO else code
+            self.__retry(self.__dump_single, path, type_, code)
+
+    def __generate_by_files(self, type_: PlantumlResourceType, codes: List[str], threads: int = 1) \
+            -> List[Tuple[bool, Union[bytes, Exception]]]:
+        """
+        Render all the codes with one plantuml process, by passing them as multiple input files.
+        Each code is saved as ``<index>.puml``, so the generated files can be mapped back to the codes
+        even when the original sources share the same name. With ``threads``, they are rendered in parallel.
+        """
+        with TemporaryDirectory(prefix='puml') as workdir:
+            input_path_name = os.path.join(workdir, 'input')
+            output_path_name = os.path.join(workdir, 'output')
+            os.makedirs(input_path_name)
+
+            _input_files = _save_input_files(input_path_name, codes)
+            _stderr, _error = '', None
+            if _input_files:
+                try:
+                    _, _stderr = self.__execute(
+                        f'-t{type_.name.lower()}', *(('-nbthread', str(threads)) if threads > 1 else ()),
+                        '-o', output_path_name, *_input_files,
+                        timeout=_batch_timeout(self.__timeout, len(_input_files)),
+                    )
+                except LocalPlantumlTimeoutError:
+                    # some diagram is too slow, render them standalone to find it out
+                    return list(self.__generate_standalone(type_, codes))
+                except LocalPlantumlExecuteError as err:
+                    if err.exitcode != PLANTUML_ERROR_EXITCODE:
+                        return [(False, err) for _ in codes]
+                    _stderr, _error = err.stderr, err
+
+            return self.__collect_files_results(type_, codes, output_path_name, _stderr, _error)
+
+    def __collect_files_results(self, type_: PlantumlResourceType, codes: List[str], output_path_name: str,
+                                stderr: str, error: Optional[LocalPlantumlExecuteError]) \
+            -> List[Tuple[bool, Union[bytes, Exception]]]:
+        _messages = _parse_files_messages(stderr or '')
+        _outputs = _map_output_files(os.listdir(output_path_name) if os.path.exists(output_path_name) else [])
+        _results = []
+        for index, code in enumerate(codes):
+            _item_messages = _messages.get(index)
+            if _item_messages and error is not None:
+                _results.append((False, LocalPlantumlExecuteError(
+                    error.command_line, error.exitcode, error.stdout, os.linesep.join(_item_messages)
+                )))
+            elif index in _outputs:
+                _filename, _ = _outputs[index][0]
+                _results.append((True, load_binary_file(os.path.join(output_path_name, _filename))))
+            elif _item_messages:
+                _results.append((False, FileNotFoundError(f'No expected file found - {"; ".join(_item_messages)}')))
+            else:
+                # no file mapped, render it standalone
+                _results.extend(self.__generate_standalone(type_, [code]))
+
+        return _results
+
+    def __generate_standalone(self, type_: PlantumlResourceType, codes: List[str]) \
+            -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        for code in codes:
+            try:
+                yield True, self.__retry(self.__generate_by_file, type_, code)
+            except Exception as err:
+                yield False, err
+
+    def __generate_single(self, type_: PlantumlResourceType, code: str) -> bytes:
+        if self.__use_pipe and is_pipe_safe(code):
+            if self.__pool is not None:
+                return self.__pool.render(type_.name.lower(), code, self.__timeout)
+
+            worker = self.__take_standby(type_.name.lower())
+            if worker is not None:
+                try:
+                    _data = worker.render(code, self.__timeout) or None
+                finally:
+                    worker.close()
+            else:
+                _data = self.__generate_by_pipe(type_, code)
+            if _data is None:
+                # nothing written to stdout, this jar misbehaves in pipe mode, so stop using it
+                self.__use_pipe = False
+                _data = self.__generate_by_file(type_, code)
+            return _data
+        else:
+            return self.__generate_by_file(type_, code)
+
     def _generate_uml_data(self, type_: PlantumlResourceType, code: str) -> bytes:
+        code = apply_layout(code, self.__layout) if self.__layout == PlantumlLayout.AUTO else code
         if type_ == PlantumlResourceType.PDF and _has_cairosvg():
             import cairosvg
 
-            return cairosvg.svg2pdf(bytestring=self._generate_uml_data(PlantumlResourceType.SVG, code))
+            return cairosvg.svg2pdf(bytestring=self.__retry(self.__generate_single, PlantumlResourceType.SVG, code))
         else:
-            with TemporaryDirectory(prefix='puml') as output_path_name:
-                with NamedTemporaryFile(prefix='puml', suffix='.puml') as input_file:
-                    save_text_file(input_file.name, code)
-                    self.__execute(f'-t{type_.name.lower()}', '-o', output_path_name, input_file.name)
-                    _file_list = os.listdir(output_path_name)
-                    if _file_list:
-                        output_filename = os.path.join(output_path_name, _file_list[0])
-                        return load_binary_file(output_filename)
-                    else:
-                        # When you see this error, it means bug, please open an issue for help us fix this
-                        raise FileNotFoundError(f'No expected file found in {output_path_name!r}.')  # pragma: no cover
+            return self.__retry(self.__generate_single, type_, code)
+
+    def _generate_uml_pages(self, type_: PlantumlResourceType, code: str) -> List[bytes]:
+        if not _is_multi_page(code):
+            return [self._generate_uml_data(type_, code)]
+
+        code = apply_layout(code, self.__layout) if self.__layout == PlantumlLayout.AUTO else code
+        if type_ == PlantumlResourceType.PDF and _has_cairosvg():
+            import cairosvg
+
+            return [cairosvg.svg2pdf(bytestring=data)
+                    for data in self.__retry(self.__generate_pages_by_file, PlantumlResourceType.SVG, code)]
+        else:
+            return self.__retry(self.__generate_pages_by_file, type_, code)
+
+    def _generate_uml_data_batch(self, type_: PlantumlResourceType, codes: Iterable[str]) \
+            -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        if self.__layout == PlantumlLayout.AUTO:
+            codes = (apply_layout(code, self.__layout) for code in codes)
+
+        if type_ == PlantumlResourceType.PDF and _has_cairosvg():
+            yield from self.__generate_pdf_batch(codes)
+        elif self.__pool is not None and self.__use_pipe:
+            yield from Plantuml._generate_uml_data_batch(self, type_, codes)
+        elif self.threads > 1:
+            # pipe mode renders one by one, so all the codes are rendered in parallel as multiple input files
+            yield from self.__generate_by_files(type_, list(codes), self.threads)
+        else:
+            yield from self.__generate_by_worker(type_, list(codes))
+
+    def __generate_pdf_batch(self, codes: Iterable[str]) -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        import cairosvg
+
+        for success, data in self._generate_uml_data_batch(PlantumlResourceType.SVG, codes):
+            if success:
+                try:
+                    data = cairosvg.svg2pdf(bytestring=data)
+                except Exception as err:
+                    success, data = False, err
+            yield success, data
+
+    def __generate_by_worker(self, type_: PlantumlResourceType, codes: List[str]) \
+            -> Iterator[Tuple[bool, Union[bytes, Exception]]]:
+        """
+        The pipe safe codes are streamed through one plantuml process,
+        and all the others are rendered together with another plantuml process.
+        """
+        _file_indices = [index for index, code in enumerate(codes) if not (self.__use_pipe and is_pipe_safe(code))]
+        if _file_indices:
+            _file_results = dict(zip(
+                _file_indices,
+                self.__generate_by_files(type_, [codes[index] for index in _file_indices])
+            ))
+        else:
+            _file_results = {}
+
+        worker = None
+
+        def _render_by_worker(code_: str) -> bytes:
+            nonlocal worker
+            if worker is None or not worker.alive:  # worker is killed when timeout
+                if worker is not None:
+                    worker.close()
+                worker = self.__take_standby(type_.name.lower()) or self.__new_worker(type_.name.lower())
+            return worker.render(code_, self.__timeout)
+
+        try:
+            for index, code in enumerate(codes):
+                if index in _file_results:
+                    yield _file_results.pop(index)
+                    continue
+
+                try:
+                    yield True, self.__retry(_render_by_worker, code)
+                except Exception as err:
+                    yield False, err
+        finally:
+            if worker is not None:
+                worker.close()
@@ -0,0 +1,196 @@
+"""
+Timing metrics of local plantuml.
+
+Plantuml measures itself when asked, ``-duration`` prints the time cost of the whole run to stderr, and
+``-enablestats -htmlstats`` writes the parsing and generation (layout and drawing) time of the current session
+to ``plantuml-stats.html`` in the working directory. These statistics are aggregated by session, so one
+diagram is rendered in each session (jvm process) to get its own metrics. Statistics are also kept in the java
+preferences, which is redirected to the working directory, so the preferences of user are not touched.
+"""
+import os
+import re
+from typing import Optional, Tuple, List
+
+STATS_HTML_FILE = 'plantuml-stats.html'
+
+_DURATION_PATTERN = re.compile(r'^\s*Duration\s*=\s*(?P<seconds>\d+(?:\.\d+)?)\s*seconds?\s*$',
+                               re.IGNORECASE | re.MULTILINE)
+_SESSION_TITLE = 'Current session statistics'
+_TABLE_PATTERN = re.compile(r'<table\b.*?</table>', re.IGNORECASE | re.DOTALL)
+_ROW_PATTERN = re.compile(r'<tr\b[^>]*>(?P<content>.*?)</tr>', re.IGNORECASE | re.DOTALL)
+_CELL_PATTERN = re.compile(r'<t[dh]\b[^>]*>(?P<content>.*?)</t[dh]>', re.IGNORECASE | re.DOTALL)
+_TAG_PATTERN = re.compile(r'<[^>]*>')
+
+
+class PlantumlMetrics:
+    def __init__(self, wall_time: float, duration: Optional[float] = None, types: Tuple[str, ...] = (),
+                 parse_time: Optional[float] = None, generation_time: Optional[float] = None):
+        """
+        :param wall_time: time cost of the whole jvm process in seconds, measured outside
+        :param duration: time cost reported by plantuml itself (``-duration``) in seconds, None when unknown
+        :param types: types of the rendered diagrams, such as ``SequenceDiagram``
+        :param parse_time: time cost of parsing the source code in seconds, None when unknown
+        :param generation_time: time cost of generating image (layout and drawing) in seconds, None when unknown
+        """
+        self.__wall_time = wall_time
+        self.__duration = duration
+        self.__types = tuple(types)
+        self.__parse_time = parse_time
+        self.__generation_time = generation_time
+
+    @property
+    def wall_time(self) -> float:
+        """
+        Time cost of the whole jvm process, including the startup of jvm
+        :return: time cost in seconds
+        """
+        return self.__wall_time
+
+    @property
+    def duration(self) -> Optional[float]:
+        """
+        Time cost reported by plantuml itself
+        :return: time cost in seconds, None when unknown
+        """
+        return self.__duration
+
+    @property
+    def types(self) -> Tuple[str, ...]:
+        """
+        Types of the rendered diagrams, such as ``SequenceDiagram`` and ``ClassDiagram``
+        :return: tuple of types
+        """
+        return self.__types
+
+    @property
+    def parse_time(self) -> Optional[float]:
+        """
+        Time cost of parsing the source code
+        :return: time cost in seconds, None when unknown
+        """
+        return self.__parse_time
+
+    @property
+    def generation_time(self) -> Optional[float]:
+        """
+        Time cost of generating image, including layout (such as graphviz) and drawing
+        :return: time cost in seconds, None when unknown
+        """
+        return self.__generation_time
+
+    @property
+    def startup_time(self) -> Optional[float]:
+        """
+        Time cost before plantuml starts, mostly the startup of jvm
+        :return: time cost in seconds, None when unknown
+        """
+        if self.__duration is not None:
+            return max(0.0, self.__wall_time - self.__duration)
+        else:
+            return None
+
+    @property
+    def init_time(self) -> Optional[float]:
+        """
+        Time cost inside plantuml but out of parsing and generation, mostly the class loading and initialization
+        :return: time cost in seconds, None when unknown
+        """
+        if self.__duration is not None and self.__parse_time is not None and self.__generation_time is not None:
+            return max(0.0, self.__duration - self.__parse_time - self.__generation_time)
+        else:
+            return None
+
+    def __repr__(self):
+        _items = [('wall_time', self.__wall_time), ('startup_time', self.startup_time), ('init_time', self.init_time),
+                  ('parse_time', self.__parse_time), ('generation_time', self.__generation_time)]
+        _prop_str = ', '.join(f'{key}: {value:.3f}s' for key, value in _items if value is not None)
+        return f'<{self.__class__.__name__} types: {self.__types!r}, {_prop_str}>'
+
+
+def metrics_args() -> Tuple[str, ...]:
+    """
+    Get command line arguments of plantuml for the metrics
+    :return: arguments tuple
+    """
+    return '-duration', '-enablestats', '-htmlstats'
+
+
+def metrics_jvm_options(workdir: str) -> Tuple[str, ...]:
+    """
+    Get jvm options for the metrics, the java preferences (where the statistics are kept) are redirected
+    :param workdir: working directory of plantuml process
+    :return: options tuple
+    """
+    return f'-Djava.util.prefs.userRoot={os.path.join(workdir, "prefs")}',
+
+
+def parse_duration(stderr: str) -> Optional[float]:
+    """
+    Parse the duration printed by plantuml with ``-duration``
+    :param stderr: stderr of plantuml
+    :return: duration in seconds, None when not found
+
+    Example::
+        >>> parse_duration('Duration = 1.371 seconds')
+        1.371
+    """
+    _matchings = list(_DURATION_PATTERN.finditer(stderr or ''))
+    if _matchings:
+        return float(_matchings[-1].group('seconds'))
+    else:
+        return None
+
+
+def _cell_texts(row: str) -> List[str]:
+    return [' '.join(_TAG_PATTERN.sub(' ', matching.group('content')).split())
+            for matching in _CELL_PATTERN.finditer(row)]
+
+
+def _find_column(headers: List[str], prefix: str) -> Optional[int]:
+    for index, header in enumerate(headers):
+        if header.lower().startswith(prefix):
+            return index
+    return None
+
+
+def _parse_number(text: str) -> float:
+    # numbers are formatted with grouping separators, such as 1,234
+    return float(re.sub(r'[,\s\u00a0\u202f]', '', text))
+
+
+def _total_time(cells: List[str], count_index: Optional[int], mean_index: Optional[int]) -> Optional[float]:
+    try:
+        # the time cost is in milliseconds
+        return _parse_number(cells[count_index]) * _parse_number(cells[mean_index]) / 1000.0
+    except (TypeError, IndexError, ValueError):
+        return None
+
+
+def parse_stats_html(html: str) -> Tuple[Tuple[str, ...], Optional[float], Optional[float]]:
+    """
+    Parse the statistics of current session written by plantuml with ``-htmlstats``
+    :param html: content of ``plantuml-stats.html``
+    :return: tuple of diagram types, total parsing time and total generation time (in seconds, None when unknown)
+    """
+    _position = html.find(_SESSION_TITLE)
+    _table = _TABLE_PATTERN.search(html, _position) if _position >= 0 else None
+    if not _table:
+        return (), None, None
+
+    _rows = [_cell_texts(matching.group('content')) for matching in _ROW_PATTERN.finditer(_table.group(0))]
+    if not _rows:
+        return (), None, None
+
+    _headers, _types, _total = _rows[0], [], None
+    for cells in _rows[1:]:
+        if cells and cells[0].lower() == 'total':
+            _total = cells
+        elif cells:
+            _types.append(cells[0])
+
+    if _total is None:
+        return tuple(_types), None, None
+    _parse_time = _total_time(_total, _find_column(_headers, '# parsed'), _find_column(_headers, 'mean parsing'))
+    _generation_time = _total_time(_total, _find_column(_headers, '# generated'),
+                                   _find_column(_headers, 'mean generation'))
+    return tuple(_types), _parse_time, _generation_time
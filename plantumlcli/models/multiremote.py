@@ -0,0 +1,315 @@
+"""
+Remote plantuml served by several replicas of plantuml server.
+
+Each request is routed to the replica with the fewest outstanding requests (the lower latency one when tied),
+so the throughput scales with the replicas without an external load balancer. The replicas are checked
+passively, the ones failed (connection errors and 5xx responses) several times in a row are ejected for a while,
+read timeouts and throttling (429) are not counted like the circuit breakers, so a busy replica keeps its share.
+The failed requests (all of them are idempotent renders) are retried on another replica. The replicas with open
+circuit breakers are skipped, and the requests fail fast when all of them are open.
+"""
+import os
+import re
+import time
+from threading import Lock
+from typing import Optional, Tuple, List, Iterable, Mapping, Any
+
+import requests
+from urlobject import URLObject
+
+from .breaker import CircuitOpenError, DEFAULT_BREAKER_FAILURES, DEFAULT_BREAKER_TIME
+from .hedge import DEFAULT_HEDGE_BUDGET
+from .remote import RemotePlantuml, DEFAULT_POST_THRESHOLD, PLANTUML_HOST_ENV, OFFICIAL_PLANTUML_HOST, \
+    _check_remote, _host_process, _is_host_failure
+from ..utils import DEFAULT_RETRIES
+
+DEFAULT_EJECT_FAILURES = 2
+DEFAULT_EJECT_TIME = 10.0
+_LATENCY_WEIGHT = 0.3  # weight of the latest request in the moving average of latency
+
+
+def find_plantuml_hosts_from_env() -> Tuple[str, ...]:
+    return tuple(host for host in re.split(r'[\s,]+', os.environ.get(PLANTUML_HOST_ENV, None) or '') if host)
+
+
+def find_plantuml_hosts(hosts: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    return tuple(hosts or ()) or find_plantuml_hosts_from_env() or (OFFICIAL_PLANTUML_HOST,)
+
+
+class RemoteHostStats:
+    def __init__(self, host: str, outstanding: int = 0, requests: int = 0, failures: int = 0,
+                 latency: Optional[float] = None, ejected: bool = False):
+        """
+        :param host: url of host
+        :param outstanding: amount of the requests in flight
+        :param requests: amount of the finished requests
+        :param failures: amount of the failed requests
+        :param latency: average latency of the succeeded requests in seconds, None when no succeeded request
+        :param ejected: the host is ejected for its failures or not
+        """
+        self.__host = host
+        self.__outstanding = outstanding
+        self.__requests = requests
+        self.__failures = failures
+        self.__latency = latency
+        self.__ejected = ejected
+
+    @property
+    def host(self) -> str:
+        """
+        Url of host
+        :return: url of host
+        """
+        return self.__host
+
+    @property
+    def outstanding(self) -> int:
+        """
+        Amount of the requests in flight
+        :return: amount of requests
+        """
+        return self.__outstanding
+
+    @property
+    def requests(self) -> int:
+        """
+        Amount of the finished requests, including the failed ones
+        :return: amount of requests
+        """
+        return self.__requests
+
+    @property
+    def failures(self) -> int:
+        """
+        Amount of the failed requests
+        :return: amount of requests
+        """
+        return self.__failures
+
+    @property
+    def latency(self) -> Optional[float]:
+        """
+        Average latency of the succeeded requests
+        :return: latency in seconds, None when no succeeded request
+        """
+        return self.__latency
+
+    @property
+    def ejected(self) -> bool:
+        """
+        The host is ejected for its failures or not
+        :return: True if ejected, otherwise False
+        """
+        return self.__ejected
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} host: {self.__host!r}, outstanding: {self.__outstanding!r}, ' \
+               f'requests: {self.__requests!r}, failures: {self.__failures!r}, latency: {self.__latency!r}, ' \
+               f'ejected: {self.__ejected!r}>'
+
+
+class _HostState:
+    def __init__(self, host: URLObject):
+        self.host = host
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.successes = 0
+        self.total_latency = 0.0
+        self.average_latency = 0.0  # moving average, used for routing
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+
+class MultiRemotePlantuml(RemotePlantuml):
+    def __init__(self, hosts: Iterable[str], retries: Optional[int] = None, config: Optional[str] = None,
+                 post: Optional[bool] = None, post_threshold: int = DEFAULT_POST_THRESHOLD,
+                 hedge: Optional[float] = None, hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+                 deadline: Optional[float] = None, breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+                 breaker_time: float = DEFAULT_BREAKER_TIME, eject_failures: int = DEFAULT_EJECT_FAILURES,
+                 eject_time: float = DEFAULT_EJECT_TIME, **kwargs):
+        """
+        :param hosts: hosts of the replicas
+        :param retries: retry times of failed (including timeout) requests on the other hosts, None means default
+        :param config: preamble file shared by all the diagrams, merged into each source code, None means no preamble
+        :param post: send source code by POST, True means always, False means never, None means only when the
+            encoded source code is longer than ``post_threshold``, GET is used when POST is not supported by server
+        :param post_threshold: max length of encoded source code sent by GET when ``post`` is None
+        :param hedge: percentile of the recent latencies, a request slower than it is sent once again to another
+            host and the first response is used, None means no hedging
+        :param hedge_budget: max ratio of the hedged requests to all the requests
+        :param deadline: total time in seconds of each request, including all the retries, None means no limit
+        :param breaker_failures: requests to a host fail fast after it failed for this times in a row
+        :param breaker_time: time in seconds before a failed host is tried again
+        :param eject_failures: a host is ejected after failed for this times in a row
+        :param eject_time: time of ejecting a host in seconds
+        :param kwargs: other arguments of requests, such as ``timeout`` (of each attempt)
+        """
+        hosts = tuple(hosts)
+        if not hosts:
+            raise ValueError('Hosts should be present, but no host found.')
+        for host in hosts:
+            _check_remote(host)
+        if eject_failures < 1:
+            raise ValueError(f'Eject failures should be no less than 1, but {eject_failures!r} found.')
+
+        # failed requests are retried on the other hosts, instead of the same host by session
+        RemotePlantuml.__init__(self, hosts[0], 0, config, post, post_threshold, hedge, hedge_budget,
+                                deadline, breaker_failures, breaker_time, **kwargs)
+        self.__states = [_HostState(_host_process(host)) for host in hosts]
+        self.__retries = DEFAULT_RETRIES if retries is None else retries
+        self.__eject_failures = eject_failures
+        self.__eject_time = eject_time
+        self.__lock = Lock()
+        self.__next = 0
+
+    @classmethod
+    def autoload(cls, hosts: Optional[Iterable[str]] = None, retries: Optional[int] = None,
+                 config: Optional[str] = None, post: Optional[bool] = None,
+                 post_threshold: int = DEFAULT_POST_THRESHOLD, hedge: Optional[float] = None,
+                 hedge_budget: float = DEFAULT_HEDGE_BUDGET, deadline: Optional[float] = None,
+                 breaker_failures: int = DEFAULT_BREAKER_FAILURES, breaker_time: float = DEFAULT_BREAKER_TIME,
+                 eject_failures: int = DEFAULT_EJECT_FAILURES, eject_time: float = DEFAULT_EJECT_TIME,
+                 **kwargs) -> 'MultiRemotePlantuml':
+        """
+        Autoload MultiRemotePlantuml object from given hosts, system environments (hosts separated by spaces or
+        commas) and official site
+        :param hosts: hosts of the replicas
+        :param retries: retry times of failed (including timeout) requests on the other hosts, None means default
+        :param config: preamble file shared by all the diagrams, merged into each source code, None means no preamble
+        :param post: send source code by POST, True means always, False means never, None means only when the
+            encoded source code is longer than ``post_threshold``, GET is used when POST is not supported by server
+        :param post_threshold: max length of encoded source code sent by GET when ``post`` is None
+        :param hedge: percentile of the recent latencies, a request slower than it is sent once again to another
+            host and the first response is used, None means no hedging
+        :param hedge_budget: max ratio of the hedged requests to all the requests
+        :param deadline: total time in seconds of each request, including all the retries, None means no limit
+        :param breaker_failures: requests to a host fail fast after it failed for this times in a row
+        :param breaker_time: time in seconds before a failed host is tried again
+        :param eject_failures: a host is ejected after failed for this times in a row
+        :param eject_time: time of ejecting a host in seconds
+        :param kwargs: other arguments of requests, such as ``timeout`` (of each attempt)
+        :return: multi-host remote plantuml object
+        """
+        return MultiRemotePlantuml(find_plantuml_hosts(hosts), retries, config, post, post_threshold,
+                                   hedge, hedge_budget, deadline, breaker_failures, breaker_time,
+                                   eject_failures, eject_time, **kwargs)
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        """
+        Hosts of the replicas
+        :return: tuple of urls
+        """
+        return tuple(str(state.host) for state in self.__states)
+
+    @property
+    def host_stats(self) -> Tuple[RemoteHostStats, ...]:
+        """
+        Statistics of the requests on each host
+        :return: tuple of statistics, in the order of hosts
+        """
+        _now = time.time()
+        with self.__lock:
+            return tuple(RemoteHostStats(
+                host=str(state.host),
+                outstanding=state.outstanding,
+                requests=state.requests,
+                failures=state.failures,
+                latency=state.total_latency / state.successes if state.successes else None,
+                ejected=state.ejected(_now),
+            ) for state in self.__states)
+
+    def probe_hosts(self) -> Tuple[RemoteHostStats, ...]:
+        """
+        Request the homepage of each host once, the result is recorded into the statistics
+        :return: statistics of each host, the same as :attr:`host_stats`
+        """
+        for state in self.__states:
+            with self.__lock:
+                state.outstanding += 1
+            _start = time.time()
+            try:
+                self._send(state.host, '')
+            except requests.RequestException as err:  # 5xx and 429 responses are raised by session
+                self.__release(state, time.time() - _start, False, _is_host_failure(err))
+            else:
+                self.__release(state, time.time() - _start, True)
+        return self.host_stats
+
+    def _properties(self) -> Mapping[str, Any]:
+        return {
+            'hosts': self.hosts,
+        }
+
+    def __acquire(self, tried: List[URLObject]) -> _HostState:
+        _now = time.time()
+        with self.__lock:
+            _available = [state for state in self.__states if self._breaker(state.host).available]
+            if not _available:
+                raise CircuitOpenError(f'All the hosts are down, the circuit breakers are open - {self.hosts!r}.')
+            _candidates = [state for state in _available if state.host not in tried] or _available
+            _healthy = [state for state in _candidates if not state.ejected(_now)]
+            if _healthy:
+                # least outstanding requests first, then lower latency, and rotated for the ties
+                _count = len(self.__states)
+                _start, self.__next = self.__next, (self.__next + 1) % _count
+                state = min(_healthy, key=lambda x: (
+                    x.outstanding, x.average_latency, (self.__states.index(x) - _start) % _count))
+            else:  # all ejected, the one to be recovered first is tried
+                state = min(_candidates, key=lambda x: x.ejected_until)
+
+            state.outstanding += 1
+            return state
+
+    def __release(self, state: _HostState, latency: float, success: bool, host_failure: bool = True):
+        # the failures which tell nothing about the host (such as throttling) are not counted for ejection
+        with self.__lock:
+            state.outstanding -= 1
+            state.requests += 1
+            if success:
+                state.successes += 1
+                state.total_latency += latency
+                state.average_latency = latency if state.successes == 1 else \
+                    _LATENCY_WEIGHT * latency + (1 - _LATENCY_WEIGHT) * state.average_latency
+                state.consecutive_failures = 0
+                state.ejected_until = 0.0
+            else:
+                state.failures += 1
+                if host_failure:
+                    state.consecutive_failures += 1
+                    if state.consecutive_failures >= self.__eject_failures:
+                        state.ejected_until = time.time() + self.__eject_time
+
+    def __next_attempt(self, attempts: int, deadline: Optional[float]) -> bool:
+        if attempts > self.__retries:
+            return False
+        elif attempts % len(self.__states) == 0:  # all the hosts are tried, wait before the next round
+            return self._backoff(attempts // len(self.__states), deadline)
+        else:
+            return True
+
+    def _dispatch(self, path: str, stream: bool = False, data: Optional[bytes] = None,
+                  hosts: Optional[List[URLObject]] = None, deadline: Optional[float] = None) -> requests.Response:
+        # the hosts tried by a hedged request are shared, so the duplicated one is sent to another host
+        _tried: List[URLObject] = [] if hosts is None else hosts
+        _attempts = 0
+        while True:
+            _timeout = self._attempt_timeout(deadline)
+            state = self.__acquire(_tried)
+            _tried.append(state.host)
+            _attempts += 1
+
+            _start = time.time()
+            try:
+                r = self._send(state.host, path, stream, data, _timeout)
+            except requests.RequestException as err:  # 5xx and 429 responses are raised by session
+                self.__release(state, time.time() - _start, False, _is_host_failure(err))
+                if not self.__next_attempt(_attempts, deadline):
+                    raise
+            else:
+                self.__release(state, time.time() - _start, True)
+                return r
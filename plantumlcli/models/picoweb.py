@@ -0,0 +1,359 @@
+"""
+Local plantuml served by the built-in http server of plantuml jar.
+
+With ``-picoweb:PORT:ADDRESS``, plantuml jar starts a tiny http server which speaks the same url scheme as
+plantuml server (e.g. ``/plantuml/png/<encoded>``). So a few warm jvm processes on localhost can be used
+through the protocol of :class:`RemotePlantuml`, without any external server.
+"""
+import atexit
+import os
+import socket
+import subprocess
+import tempfile
+import time
+from threading import Lock, Condition, Thread
+from typing import Optional, Tuple, List, Mapping, Any, Union, Iterable, Iterator, Set
+
+import requests
+from urlobject import URLObject
+
+from .base import PlantumlResourceType, PlantumlSyntaxResult
+from .layout import PlantumlLayout, apply_layout
+from .local import LocalPlantuml, LocalPlantumlExecuteError, find_java, find_plantuml
+from .preamble import _check_preamble
+from .remote import RemotePlantuml
+from ..utils import CommandLineExecuteError, kill_process_tree
+
+PICOWEB_ADDRESS = '127.0.0.1'
+_PICOWEB_PATH = 'plantuml'
+_PROBE_PATH = 'txt/SoWkIImgAStDuKfKqBLJIE9oICrB0N81'  # @startuml\na -> b\n@enduml
+_DEFAULT_START_TIMEOUT = 30.0
+_STOP_TIMEOUT = 5.0
+
+
+def _find_free_port(address: str = PICOWEB_ADDRESS) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((address, 0))
+        return sock.getsockname()[1]
+
+
+class LocalPicowebServer:
+    def __init__(self, command_line: Tuple[str, ...], port: Optional[int] = None, address: str = PICOWEB_ADDRESS,
+                 exc: type = CommandLineExecuteError):
+        """
+        :param command_line: command line of plantuml (without picoweb argument)
+        :param port: port of server, None means a free port will be used
+        :param address: listening address of server
+        :param exc: exception class to be raised
+        """
+        self.__port = port or _find_free_port(address)
+        self.__address = address
+        self.__command_line = tuple(command_line) + (f'-picoweb:{self.__port}:{self.__address}',)
+        self.__exc = exc
+
+        self.__stderr = tempfile.TemporaryFile()
+        self.__process = subprocess.Popen(
+            args=self.__command_line,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=self.__stderr,
+            start_new_session=os.name == 'posix',
+        )
+
+    @property
+    def command_line(self) -> Tuple[str, ...]:
+        """
+        Full command line of this server
+        :return: command line
+        """
+        return self.__command_line
+
+    @property
+    def port(self) -> int:
+        """
+        Port of this server
+        :return: port
+        """
+        return self.__port
+
+    @property
+    def url(self) -> str:
+        """
+        Base url of this server, can be used as host of remote plantuml
+        :return: url of server
+        """
+        return f'http://{self.__address}:{self.__port}/{_PICOWEB_PATH}'
+
+    @property
+    def alive(self) -> bool:
+        """
+        Process of this server is still running or not
+        :return: True if running, otherwise False
+        """
+        return self.__process.poll() is None
+
+    @property
+    def stderr(self) -> str:
+        """
+        Stderr output of this server
+        :return: stderr text
+        """
+        self.__stderr.seek(0)
+        return self.__stderr.read().decode('utf-8', errors='replace')
+
+    def wait_ready(self, timeout: Optional[float] = _DEFAULT_START_TIMEOUT):
+        """
+        Wait until this server is ready for requests, raise exception when it is exited or not ready in time
+        :param timeout: timeout in seconds, None means no limit
+        """
+        _deadline = None if timeout is None else time.time() + timeout
+        _probe_url = str(URLObject(self.url).add_path(_PROBE_PATH))
+        while True:
+            if not self.alive:
+                raise self.__exc(self.__command_line, self.__process.returncode, None, self.stderr)
+
+            try:
+                requests.get(_probe_url, timeout=1.0).raise_for_status()
+            except requests.RequestException:
+                if _deadline is not None and time.time() > _deadline:
+                    self.close()
+                    raise TimeoutError(f'Plantuml picoweb server not ready in {timeout!r} seconds.')
+                time.sleep(0.1)
+            else:
+                return
+
+    def close(self):
+        """
+        Stop this server, kill it when not exited in time, the children left by it (such as dot) are killed too
+        """
+        if self.alive:
+            self.__process.terminate()
+            try:
+                self.__process.wait(timeout=_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:  # pragma: no cover
+                pass
+        kill_process_tree(self.__process)
+        self.__process.wait()
+        self.__stderr.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class PicowebPlantuml(RemotePlantuml):
+    def __init__(self, java: str, plantuml: str, processes: int = 1,
+                 start_timeout: Optional[float] = _DEFAULT_START_TIMEOUT, use_cds: bool = True,
+                 max_heap: Optional[str] = None, layout: Union[int, str, PlantumlLayout] = PlantumlLayout.DOT,
+                 config: Optional[str] = None, **kwargs):
+        """
+        :param java: java executable file path
+        :param plantuml: plantuml jar file path
+        :param processes: amount of picoweb server processes
+        :param start_timeout: timeout of starting each server, None means no limit
+        :param use_cds: use the prebuilt cds archive of java and plantuml when present
+        :param max_heap: max heap size of each server process (such as ``512m``), None means default
+        :param layout: layout engine of graph diagrams, ``dot``, ``smetana`` or ``auto`` (smetana is used for
+            the diagrams which have the equivalent layout)
+        :param config: preamble file shared by all the diagrams, merged into each source code (picoweb ignores
+            ``-config``), None means no preamble
+        :param kwargs: other arguments of requests
+        """
+        if processes < 1:
+            raise ValueError(f'Processes should be no less than 1, but {processes!r} found.')
+        if config is not None:
+            _check_preamble(config)
+
+        self.__local = LocalPlantuml(java, plantuml, use_pipe=False, use_cds=use_cds, max_heap=max_heap)
+        self.__layout = PlantumlLayout.load(layout)  # picoweb ignores -P options, so applied to source code
+        self.__start_timeout = start_timeout
+        self.__lock = Lock()
+        self.__ready = Condition(self.__lock)
+        self.__servers: List[LocalPicowebServer] = []
+        self.__restarting: Set[int] = set()
+        self.__restart_error: Optional[Exception] = None
+        self.__restart_failures = 0
+        self.__next = 0
+        try:
+            self.__servers.extend(self.__new_server() for _ in range(processes))
+            for server in self.__servers:
+                server.wait_ready(self.__start_timeout)
+        except BaseException:
+            self.close()
+            raise
+
+        # picoweb answers POST with an error image, so source code is always sent by GET
+        RemotePlantuml.__init__(self, self.__servers[0].url, config=config, post=False, **kwargs)
+        atexit.register(self.close)
+
+    @classmethod
+    def autoload(cls, java: Optional[str] = None, plantuml: Optional[str] = None, processes: int = 1,
+                 start_timeout: Optional[float] = _DEFAULT_START_TIMEOUT, use_cds: bool = True,
+                 max_heap: Optional[str] = None, layout: Union[int, str, PlantumlLayout] = PlantumlLayout.DOT,
+                 config: Optional[str] = None, version: Optional[str] = None, **kwargs) -> 'PicowebPlantuml':
+        """
+        Autoload PicowebPlantuml object from given parameters and the environment
+        :param java: java executable file path
+        :param plantuml: plantuml jar file path
+        :param processes: amount of picoweb server processes
+        :param start_timeout: timeout of starting each server, None means no limit
+        :param use_cds: use the prebuilt cds archive of java and plantuml when present
+        :param max_heap: max heap size of each server process (such as ``512m``), None means default
+        :param layout: layout engine of graph diagrams, ``dot``, ``smetana`` or ``auto`` (smetana is used for
+            the diagrams which have the equivalent layout)
+        :param config: preamble file shared by all the diagrams, merged into each source code (picoweb ignores
+            ``-config``), None means no preamble
+        :param version: version of plantuml jar used when ``plantuml`` is not given, the jar is downloaded
+            to cache when not cached, None means the jar from environment
+        :param kwargs: other arguments of requests
+        :return: picoweb plantuml object
+        """
+        return PicowebPlantuml(find_java(java), find_plantuml(plantuml, version), processes=processes,
+                               start_timeout=start_timeout, use_cds=use_cds, max_heap=max_heap, layout=layout,
+                               config=config, **kwargs)
+
+    @property
+    def java(self) -> str:
+        """
+        Java executable file path
+        :return: java executable file path
+        """
+        return self.__local.java
+
+    @property
+    def plantuml(self) -> str:
+        """
+        Plantuml jar file path
+        :return: plantuml jar file path
+        """
+        return self.__local.plantuml
+
+    @property
+    def cds_archive(self) -> Optional[str]:
+        """
+        Cds archive used by the servers
+        :return: path of cds archive, None when not used
+        """
+        return self.__local.cds_archive
+
+    @property
+    def layout(self) -> PlantumlLayout:
+        """
+        Layout engine of graph diagrams
+        :return: layout engine
+        """
+        return self.__layout
+
+    @property
+    def hosts(self) -> Tuple[str, ...]:
+        """
+        Urls of the running servers
+        :return: tuple of urls
+        """
+        with self.__lock:
+            return tuple(server.url for server in self.__servers)
+
+    def __new_server(self) -> LocalPicowebServer:
+        return LocalPicowebServer(self.__local._command_line(), exc=LocalPlantumlExecuteError)
+
+    def close(self):
+        """
+        Stop all the servers
+        """
+        with self.__lock:
+            _servers, self.__servers = self.__servers, []
+            self.__ready.notify_all()
+        for server in _servers:
+            server.close()
+        atexit.unregister(self.close)
+
+    def _properties(self) -> Mapping[str, Any]:
+        return {
+            'java': self.__local.java,
+            'plantuml': self.__local.plantuml,
+            'processes': len(self.__servers),
+        }
+
+    def __pick_server(self) -> Optional[LocalPicowebServer]:
+        # called with the lock held, the crashed servers found are restarted in background
+        for _ in range(len(self.__servers)):
+            _index = self.__next
+            self.__next = (self.__next + 1) % len(self.__servers)
+            if _index in self.__restarting:
+                continue
+
+            server = self.__servers[_index]
+            if server.alive:
+                return server
+            self.__restarting.add(_index)
+            Thread(target=self.__restart, args=(_index, server), name='plantuml-picoweb-restart', daemon=True).start()
+
+        return None
+
+    def __restart(self, index: int, server: LocalPicowebServer):
+        # the jvm is started out of the lock, so the other servers are still used meanwhile
+        server.close()
+        _new_server, _error = None, None
+        try:
+            _new_server = self.__new_server()
+            _new_server.wait_ready(self.__start_timeout)
+        except Exception as err:
+            if _new_server is not None:
+                _new_server.close()
+            _new_server, _error = None, err
+
+        with self.__lock:
+            self.__restarting.discard(index)
+            if _new_server is not None and index < len(self.__servers) and self.__servers[index] is server:
+                self.__servers[index], _new_server = _new_server, None
+            elif _error is not None:
+                self.__restart_error = _error
+                self.__restart_failures += 1
+            self.__ready.notify_all()
+
+        if _new_server is not None:  # closed while restarting
+            _new_server.close()
+
+    def _request_host(self) -> URLObject:
+        with self.__lock:
+            while True:
+                if not self.__servers:
+                    raise RuntimeError('Plantuml picoweb servers are already closed.')
+
+                server = self.__pick_server()
+                if server is not None:
+                    return URLObject(server.url)
+
+                # all the servers are restarting, wait for one of them
+                _failures = self.__restart_failures
+                self.__ready.wait()
+                if self.__restart_failures > _failures:
+                    raise self.__restart_error
+
+    def _check_response(self, r: requests.Response):
+        RemotePlantuml._check_response(self, r)
+        if 'X-PlantUML-Diagram-Error' in r.headers:
+            raise requests.HTTPError(f'Error line {r.headers.get("X-PlantUML-Diagram-Error-Line", 0)} '
+                                     f'in picoweb request{os.linesep}{r.headers["X-PlantUML-Diagram-Error"]}',
+                                     response=r)
+
+    def _check_version(self, version: str):
+        self.__local._check_version(version)
+
+    def _get_version(self) -> str:
+        return self.__local.version
+
+    def _generate_uml_data(self, type_: PlantumlResourceType, code: str) -> bytes:
+        return RemotePlantuml._generate_uml_data(self, type_, apply_layout(code, self.__layout))
+
+    def _check_syntax(self, code: str) -> PlantumlSyntaxResult:
+        return self._restore_syntax_result(code, self.__local.check_syntax(self._apply_preamble(code)))
+
+    def _check_syntax_batch(self, codes: Iterable[str]) -> Iterator[PlantumlSyntaxResult]:
+        # picoweb has no check endpoint, so the syntax is checked by the jar directly
+        codes = list(codes)
+        _results = self.__local.check_syntax_batch(self._apply_preamble(code) for code in codes)
+        for code, result in zip(codes, _results):
+            yield self._restore_syntax_result(code, result)
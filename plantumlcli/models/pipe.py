@@ -0,0 +1,131 @@
+"""
+Helpers for plantuml's ``-pipe`` protocol.
+
+In pipe mode, plantuml reads diagram after diagram (``@startxxx`` ... ``@endxxx``) from stdin, and
+writes each result to stdout, followed by a delimiter line. With ``-pipeNoStderr``, errors are written
+to stdout as well, in the form of ``ERROR``, the line number and the error message.
+"""
+import os
+import re
+import uuid
+from typing import Tuple, Optional, Type, List
+
+from ..utils import CommandLineExecuteError
+
+PLANTUML_ERROR_EXITCODE = 200
+
+_START_PATTERN = re.compile(r'^\s*@start\w+')
+_END_PATTERN = re.compile(r'^\s*@end\w+')
+_ERROR_MARK = b'ERROR'
+
+
+def is_pipe_safe(code: str) -> bool:
+    """
+    Check if the source code can be sent through pipe mode safely
+    :param code: source code
+    :return: True when the code contains exactly one diagram block, otherwise False
+    """
+    _starts, _ends = [], []
+    for index, line in enumerate(code.splitlines()):
+        if _START_PATTERN.match(line):
+            _starts.append(index)
+        elif _END_PATTERN.match(line):
+            _ends.append(index)
+
+    return len(_starts) == 1 and len(_ends) == 1 and _starts[0] < _ends[0]
+
+
+def _split_blocks(code: str) -> List[Tuple[int, int]]:
+    _blocks, _start = [], None
+    _lines = code.splitlines()
+    for index, line in enumerate(_lines):
+        if _START_PATTERN.match(line):
+            _start = index
+        elif _END_PATTERN.match(line) and _start is not None:
+            _blocks.append((_start, index))
+            _start = None
+    return _blocks
+
+
+def _start_line(code: str) -> int:
+    for index, line in enumerate(code.splitlines()):
+        if _START_PATTERN.match(line):
+            return index
+    return 0  # pragma: no cover
+
+
+def new_pipe_delimiter() -> str:
+    """
+    Create a new random delimiter for pipe mode
+    :return: delimiter string
+    """
+    return f'__plantumlcli_{uuid.uuid4().hex}__'
+
+
+def pipe_args(delimiter: Optional[str] = None) -> Tuple[str, ...]:
+    """
+    Get the command line arguments of pipe mode
+    :param delimiter: delimiter between diagrams, None means only one diagram will be sent
+    :return: arguments tuple
+    """
+    if delimiter is not None:
+        return '-pipe', '-pipedelimitor', delimiter, '-pipeNoStderr', '-charset', 'UTF-8'
+    else:
+        return '-pipe', '-pipeNoStderr', '-charset', 'UTF-8'
+
+
+def pipe_marker(delimiter: str) -> bytes:
+    """
+    Get the delimiter line written by plantuml after each diagram
+    :param delimiter: delimiter between diagrams
+    :return: binary marker
+    """
+    return (delimiter + os.linesep).encode()
+
+
+def pipe_input(code: str) -> bytes:
+    """
+    Encode source code for plantuml's stdin in pipe mode
+    :param code: source code
+    :return: binary data to be written
+    """
+    if not code.endswith('\n'):
+        code = code + '\n'
+    return code.encode('utf-8')
+
+
+def parse_pipe_error(code: str, chunk: bytes) -> Optional[Tuple[int, str]]:
+    """
+    Parse the error information from one chunk of pipe mode output
+    :param code: source code of this chunk
+    :param chunk: output chunk of plantuml
+    :return: ``None`` when no error, otherwise tuple of (line number in source code, error message)
+    """
+    if chunk.rstrip() != _ERROR_MARK and not chunk.startswith(_ERROR_MARK + os.linesep.encode()):
+        return None
+
+    _lines = chunk.decode('utf-8', errors='replace').splitlines()[1:]
+    if _lines and _lines[0].strip().isdigit():
+        _line = _start_line(code) + int(_lines[0].strip()) + 1
+        _lines = _lines[1:]
+    else:
+        _line = 0
+    return _line, os.linesep.join(line for line in _lines if line.strip())
+
+
+def unpack_pipe_output(command_line: Tuple[str, ...], code: str, chunk: bytes,
+                       exc: Type[CommandLineExecuteError] = CommandLineExecuteError) -> bytes:
+    """
+    Unpack one chunk of pipe mode output, raise error when the diagram is failed
+    :param command_line: command line of the pipe mode process
+    :param code: source code of this chunk
+    :param chunk: output chunk of plantuml
+    :param exc: exception class to be raised
+    :return: binary data of the diagram
+    """
+    _error = parse_pipe_error(code, chunk)
+    if _error is not None:
+        _line, _message = _error
+        raise exc(command_line, PLANTUML_ERROR_EXITCODE, None,
+                  f'Error line {_line} in pipe input{os.linesep}{_message}')
+    return chunk
@@ -0,0 +1,406 @@
+"""
+Resident plantuml processes for local rendering.
+
+Each worker is a long-lived plantuml process in ``-pipe`` mode, so the cost of jvm startup and
+class loading is paid only once per worker instead of once per diagram. The pool keeps a bounded
+amount of workers, restarts the crashed ones and recycles each worker after a given amount of jobs.
+"""
+import atexit
+import os
+import subprocess
+from collections import deque
+from queue import Queue, Empty
+from threading import Thread, Lock, Condition
+from typing import Tuple, Optional, Type, Callable, Dict, List
+
+from .pipe import new_pipe_delimiter, pipe_args, pipe_marker, pipe_input, unpack_pipe_output
+from ..utils import CommandLineExecuteError, CommandLineTimeoutError, kill_process_tree
+
+_STDERR_KEEP_SIZE = 1 << 16
+_PROBE_CODE = '@startuml\na -> b\n@enduml'
+_DEFAULT_PROBE_TIMEOUT = 30.0
+
+
+class LocalPlantumlWorker:
+    def __init__(self, command_line: Tuple[str, ...], max_jobs: Optional[int] = None,
+                 exc: Type[CommandLineExecuteError] = CommandLineExecuteError,
+                 timeout_exc: Type[CommandLineTimeoutError] = CommandLineTimeoutError):
+        """
+        :param command_line: command line of plantuml (without pipe arguments)
+        :param max_jobs: max jobs before recycling this worker, None means never
+        :param exc: exception class to be raised
+        :param timeout_exc: exception class to be raised when timeout
+        """
+        self.__delimiter = new_pipe_delimiter()
+        self.__command_line = tuple(command_line) + pipe_args(self.__delimiter)
+        self.__max_jobs = max_jobs
+        self.__exc = exc
+        self.__timeout_exc = timeout_exc
+
+        self.__jobs = 0
+        self.__results = Queue()
+        self.__stderr = deque()
+        self.__stderr_size = 0
+        self.__stderr_lock = Lock()
+        self.__process = subprocess.Popen(
+            args=self.__command_line,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=os.name == 'posix',
+        )
+        Thread(target=self.__read_stdout, daemon=True).start()
+        Thread(target=self.__read_stderr, daemon=True).start()
+
+    @property
+    def command_line(self) -> Tuple[str, ...]:
+        """
+        Full command line of this worker
+        :return: command line
+        """
+        return self.__command_line
+
+    @property
+    def jobs(self) -> int:
+        """
+        Amount of jobs processed by this worker
+        :return: amount of jobs
+        """
+        return self.__jobs
+
+    @property
+    def alive(self) -> bool:
+        """
+        Process of this worker is still running or not
+        :return: True if running, otherwise False
+        """
+        return self.__process.poll() is None
+
+    @property
+    def expired(self) -> bool:
+        """
+        This worker should be recycled or not
+        :return: True if max jobs is reached, otherwise False
+        """
+        return self.__max_jobs is not None and self.__jobs >= self.__max_jobs
+
+    @property
+    def stderr(self) -> str:
+        """
+        Recent stderr output of this worker
+        :return: stderr text
+        """
+        with self.__stderr_lock:
+            return b''.join(self.__stderr).decode('utf-8', errors='replace')
+
+    def __read_stdout(self):
+        _marker = pipe_marker(self.__delimiter)
+        _buffer = bytearray()
+        _stream = self.__process.stdout
+        while True:
+            data = _stream.read1(1 << 16)
+            if not data:
+                break
+
+            _start = max(0, len(_buffer) - len(_marker) + 1)
+            _buffer.extend(data)
+            while True:
+                _position = _buffer.find(_marker, _start)
+                if _position < 0:
+                    break
+                self.__results.put(bytes(_buffer[:_position]))
+                del _buffer[:_position + len(_marker)]
+                _start = 0
+
+        self.__results.put(None)
+
+    def __read_stderr(self):
+        _stream = self.__process.stderr
+        while True:
+            data = _stream.read1(1 << 12)
+            if not data:
+                break
+
+            with self.__stderr_lock:
+                self.__stderr.append(data)
+                self.__stderr_size += len(data)
+                while self.__stderr_size > _STDERR_KEEP_SIZE and len(self.__stderr) > 1:
+                    self.__stderr_size -= len(self.__stderr.popleft())
+
+    def __crashed(self):
+        try:
+            exitcode = self.__process.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:  # pragma: no cover
+            self.kill()
+            exitcode = self.__process.wait()
+        return self.__exc(self.__command_line, exitcode, None, self.stderr)
+
+    def render(self, code: str, timeout: Optional[float] = None) -> bytes:
+        """
+        Render source code with this worker
+        :param code: source code, should be pipe safe
+        :param timeout: timeout in seconds, None means no limit
+        :return: binary data of diagram
+        """
+        try:
+            self.__process.stdin.write(pipe_input(code))
+            self.__process.stdin.flush()
+        except (BrokenPipeError, OSError, ValueError):
+            raise self.__crashed()
+
+        try:
+            chunk = self.__results.get(timeout=timeout)
+        except Empty:
+            self.kill()
+            raise self.__timeout_exc(self.__command_line, self.__process.returncode, None, self.stderr,
+                                     timeout=timeout)
+        if chunk is None:
+            raise self.__crashed()
+
+        self.__jobs += 1
+        return unpack_pipe_output(self.__command_line, code, chunk, self.__exc)
+
+    def ping(self, timeout: Optional[float] = _DEFAULT_PROBE_TIMEOUT) -> bool:
+        """
+        Health check of this worker, render a tiny diagram
+        :param timeout: timeout in seconds
+        :return: True if okay, otherwise False
+        """
+        try:
+            self.render(_PROBE_CODE, timeout)
+        except Exception:
+            return False
+        else:
+            return True
+
+    def kill(self):
+        """
+        Kill the process of this worker, together with its children
+        """
+        if self.alive:
+            kill_process_tree(self.__process)
+        self.__process.wait()
+
+    def close(self, timeout: float = 5.0):
+        """
+        Close this worker gracefully, kill it when not exited in time
+        :param timeout: timeout in seconds
+        """
+        try:
+            self.__process.stdin.close()
+        except (BrokenPipeError, OSError):  # pragma: no cover
+            pass
+
+        try:
+            self.__process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:  # pragma: no cover
+            self.kill()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class LocalPlantumlPool:
+    def __init__(self, command_line: Callable[[str], Tuple[str, ...]], size: int,
+                 max_jobs: Optional[int] = None, exc: Type[CommandLineExecuteError] = CommandLineExecuteError,
+                 timeout_exc: Type[CommandLineTimeoutError] = CommandLineTimeoutError):
+        """
+        :param command_line: function to get command line of the given resource type name
+        :param size: max amount of workers
+        :param max_jobs: max jobs before recycling a worker, None means never
+        :param exc: exception class to be raised
+        :param timeout_exc: exception class to be raised when timeout
+        """
+        if size < 1:
+            raise ValueError(f'Size of pool should be no less than 1, but {size!r} found.')
+
+        self.__command_line = command_line
+        self.__size = size
+        self.__max_jobs = max_jobs
+        self.__exc = exc
+        self.__timeout_exc = timeout_exc
+
+        self.__idle: Dict[str, List[LocalPlantumlWorker]] = {}
+        self.__busy = 0
+        self.__closed = False
+        self.__condition = Condition()
+        atexit.register(self.close)
+
+    @property
+    def size(self) -> int:
+        """
+        Max amount of workers
+        :return: size of pool
+        """
+        return self.__size
+
+    @property
+    def max_jobs(self) -> Optional[int]:
+        """
+        Max jobs before recycling a worker
+        :return: max jobs
+        """
+        return self.__max_jobs
+
+    def __idle_count(self) -> int:
+        return sum(len(workers) for workers in self.__idle.values())
+
+    def __spawn(self, type_name: str) -> LocalPlantumlWorker:
+        return LocalPlantumlWorker(self.__command_line(type_name), self.__max_jobs, self.__exc, self.__timeout_exc)
+
+    def __take_idle(self, type_name: str, retired: List[LocalPlantumlWorker]) -> Optional[LocalPlantumlWorker]:
+        # called with the condition held, the workers to be closed are put into retired
+        _idle = self.__idle.setdefault(type_name, [])
+        while _idle:
+            _worker = _idle.pop()
+            if _worker.alive and not _worker.expired:
+                return _worker
+            else:
+                retired.append(_worker)
+
+        # make room for the new worker, by retiring idle workers of other types
+        for _name, _workers in self.__idle.items():
+            while _workers and self.__busy + self.__idle_count() > self.__size:
+                retired.append(_workers.pop(0))
+        return None
+
+    def __acquire(self, type_name: str) -> LocalPlantumlWorker:
+        _retired = []
+        with self.__condition:
+            while not self.__closed and self.__busy >= self.__size:
+                self.__condition.wait()
+            if self.__closed:
+                raise RuntimeError('Plantuml pool is already closed.')
+
+            self.__busy += 1
+            worker = self.__take_idle(type_name, _retired)
+
+        for _worker in _retired:
+            _worker.close()
+        if worker is None:
+            try:
+                worker = self.__spawn(type_name)
+            except BaseException:
+                self.__release(type_name, None)
+                raise
+        return worker
+
+    def __release(self, type_name: str, worker: Optional[LocalPlantumlWorker]):
+        _retired = None
+        with self.__condition:
+            self.__busy -= 1
+            if worker is not None:
+                if self.__closed or not worker.alive or worker.expired:
+                    _retired = worker
+                else:
+                    self.__idle.setdefault(type_name, []).append(worker)
+            self.__condition.notify()
+
+        if _retired is not None:
+            _retired.close()
+
+    def prespawn(self, type_name: str, count: int = 1) -> int:
+        """
+        Start idle workers in advance, so the jvm startup is overlapped with the preparation of jobs
+        :param type_name: name of resource type, such as ``png``
+        :param count: amount of workers, limited by the free room of pool
+        :return: amount of workers started
+        """
+        with self.__condition:
+            if self.__closed:
+                return 0
+            _count = max(0, min(count, self.__size - self.__busy - self.__idle_count()))
+            self.__busy += _count  # the room is taken while spawning
+
+        _workers = []
+        try:
+            for _ in range(_count):
+                _workers.append(self.__spawn(type_name))
+        finally:
+            _retired = []
+            with self.__condition:
+                self.__busy -= _count
+                if self.__closed:
+                    _retired = _workers
+                else:
+                    self.__idle.setdefault(type_name, []).extend(_workers)
+                self.__condition.notify_all()
+            for _worker in _retired:
+                _worker.close()
+
+        return len(_workers)
+
+    def render(self, type_name: str, code: str, timeout: Optional[float] = None) -> bytes:
+        """
+        Render source code with a worker in this pool, crashed (not timeout) worker will be restarted once
+        :param type_name: name of resource type, such as ``png``
+        :param code: source code, should be pipe safe
+        :param timeout: timeout in seconds, None means no limit
+        :return: binary data of diagram
+        """
+        worker = self.__acquire(type_name)
+        try:
+            try:
+                return worker.render(code, timeout)
+            except self.__timeout_exc:
+                raise
+            except self.__exc:
+                if worker.alive:
+                    raise
+
+            # the worker is crashed, restart it and try again
+            worker.close()
+            worker = None
+            worker = self.__spawn(type_name)
+            return worker.render(code, timeout)
+        finally:
+            self.__release(type_name, worker)
+
+    def check(self) -> bool:
+        """
+        Health check of the idle workers, unhealthy ones will be removed and restarted when needed
+        :return: True if all the idle workers are okay, otherwise False
+        """
+        with self.__condition:
+            _items = [(name, workers.copy()) for name, workers in self.__idle.items()]
+
+        _success = True
+        for name, workers in _items:
+            for worker in workers:
+                with self.__condition:
+                    if worker not in self.__idle.get(name, []):
+                        continue
+                    self.__idle[name].remove(worker)
+                    self.__busy += 1
+
+                if not worker.ping():
+                    _success = False
+                    worker.kill()
+                    self.__release(name, None)
+                else:
+                    self.__release(name, worker)
+
+        return _success
+
+    def close(self):
+        """
+        Close all the workers in this pool
+        """
+        with self.__condition:
+            self.__closed = True
+            _workers = [worker for workers in self.__idle.values() for worker in workers]
+            self.__idle.clear()
+            self.__condition.notify_all()
+
+        for worker in _workers:
+            worker.close()
+        atexit.unregister(self.close)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,114 @@
+"""
+Shared preamble (config) of diagrams.
+
+The same theme, ``!include`` and ``skinparam`` lines are often put into every diagram. Instead of prepending
+them to each source code, a preamble file can be given once. Local plantuml reads it once for each jvm process
+by ``-config``, which inserts its lines after the start tag of each diagram. Remote plantuml (and picoweb,
+which ignores ``-config``) has no such option, so the preamble is merged into source code in the same way,
+and the line numbers of errors are mapped back to the original source code.
+"""
+import os
+from typing import Optional, Tuple
+
+from .base import PlantumlSyntaxResult
+from .pipe import _split_blocks
+from ..utils import load_text_file
+
+
+def _check_preamble(path: str):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'Preamble file {path!r} not found.')
+    if not os.path.isfile(path):
+        raise IsADirectoryError(f'Preamble file {path!r} is not a file.')
+
+
+def load_preamble(path: Optional[str]) -> Optional[str]:
+    """
+    Load preamble from file
+    :param path: path of preamble file, None means no preamble
+    :return: text of preamble without the tailing line breaks, None when no preamble
+    """
+    if path is None:
+        return None
+
+    _check_preamble(path)
+    return load_text_file(path).rstrip('\r\n')
+
+
+def preamble_args(path: Optional[str]) -> Tuple[str, ...]:
+    """
+    Get command line arguments of plantuml for the preamble file
+    :param path: path of preamble file, None means no preamble
+    :return: arguments tuple
+    """
+    if path is not None:
+        return '-config', os.path.abspath(path)
+    else:
+        return ()
+
+
+def apply_preamble(code: str, preamble: Optional[str]) -> str:
+    """
+    Merge preamble into source code, its lines are inserted after the start tag of each diagram,
+    just like ``-config`` of plantuml
+    :param code: source code
+    :param preamble: text of preamble, None means no preamble
+    :return: merged source code
+
+    Example::
+        >>> apply_preamble('@startuml\\nBob -> Alice\\n@enduml', 'skinparam monochrome true')
+        '@startuml\\nskinparam monochrome true\\nBob -> Alice\\n@enduml'
+    """
+    if not preamble:
+        return code
+
+    _lines = code.splitlines()
+    _blocks = _split_blocks(code)
+    if not _blocks:  # start tag will be added by plantuml
+        return f'{preamble}\n{code}'
+
+    _preamble_lines = preamble.splitlines()
+    for _start, _ in reversed(_blocks):
+        _lines[_start + 1:_start + 1] = _preamble_lines
+    return '\n'.join(_lines) + ('\n' if code.endswith('\n') else '')
+
+
+def original_line(code: str, preamble: Optional[str], line: Optional[int]) -> Optional[int]:
+    """
+    Map the line number in merged source code back to the original one
+    :param code: original source code
+    :param preamble: text of preamble, None means no preamble
+    :param line: line number in merged source code, starts from 1
+    :return: line number in original source code, the start tag is used when the line is in preamble
+    """
+    if not preamble or line is None:
+        return line
+
+    _count = len(preamble.splitlines())
+    _blocks = _split_blocks(code)
+    if not _blocks:
+        return max(1, line - _count)
+
+    _offset = 0
+    for _start, _ in _blocks:
+        _merged_start = _start + _offset + 1  # line number of start tag in merged code
+        if line <= _merged_start:
+            break
+        elif line <= _merged_start + _count:
+            return _start + 1
+        _offset += _count
+    return line - _offset
+
+
+def restore_syntax_result(code: str, preamble: Optional[str], result: PlantumlSyntaxResult) -> PlantumlSyntaxResult:
+    """
+    Map the line number of syntax checking result on merged source code back to the original one
+    :param code: original source code
+    :param preamble: text of preamble, None means no preamble
+    :param result: result of syntax checking on merged source code
+    :return: result of syntax checking on original source code
+    """
+    if not preamble or result.line is None:
+        return result
+    return PlantumlSyntaxResult(result.success, result.types, original_line(code, preamble, result.line),
+                                result.message)
@@ -2,18 +2,58 @@ import base64
 import os
 import re
 import string
+import time
 import zlib
-from typing import Optional, Mapping, Any, Union, Tuple
+from threading import Lock
+from typing import Optional, Mapping, Any, Union, Tuple, List, Dict
 
+import requests
 from pyquery import PyQuery
+from requests.exceptions import RetryError
+from urllib3.exceptions import ReadTimeoutError, ResponseError
 from urlobject import URLObject
 
-from .base import Plantuml, PlantumlResourceType, _has_cairosvg
-from ..utils import get_requests_session
+from .base import Plantuml, PlantumlResourceType, PlantumlSyntaxResult, _has_cairosvg
+from .breaker import CircuitBreaker, CircuitOpenError, CircuitState, DEFAULT_BREAKER_FAILURES, DEFAULT_BREAKER_TIME
+from .hedge import RequestHedging, DEFAULT_HEDGE_BUDGET
+from .preamble import load_preamble, apply_preamble, restore_syntax_result
+from ..utils import DEFAULT_TIMEOUT, DEFAULT_RETRIES, get_requests_session, backoff_time
 
 PLANTUML_HOST_ENV = 'PLANTUML_HOST'
 OFFICIAL_PLANTUML_HOST = 'http://www.plantuml.com/plantuml'
 
+_ERROR_HEADER = 'X-PlantUML-Diagram-Error'
+_ERROR_LINE_HEADER = 'X-PlantUML-Diagram-Error-Line'
+_ERROR_DESCRIPTION = '(Error)'
+
+# encoded source longer than this is sent by POST in auto mode, url longer than 8k is rejected by
+# the default configuration of many proxies and servlet containers (including jetty of plantuml-server)
+DEFAULT_POST_THRESHOLD = 4096
+_POST_PROBE_CODE = '@startuml\na -> b\n@enduml'
+_POST_UNSUPPORTED_STATUSES = (404, 405)
+_RETRY_ERRORS = (requests.ConnectionError, requests.Timeout, RetryError)
+_THROTTLED_ERROR = ResponseError.SPECIFIC_ERROR.format(status_code=429)
+
+
+def _error_reason(err: requests.RequestException) -> Optional[Exception]:
+    return getattr(err.args[0], 'reason', None) if err.args else None
+
+
+def _is_host_failure(err: requests.RequestException) -> bool:
+    """
+    Check if the error of request tells the host is failed (connection errors and 5xx responses), read timeouts
+    (may be a slow diagram) and throttling (429 responses, retried after backoff) are not counted
+    :param err: error of request
+    :return: True if failed, otherwise False
+    """
+    _reason = _error_reason(err)
+    if isinstance(err, requests.ReadTimeout) or isinstance(_reason, ReadTimeoutError):
+        return False
+    elif isinstance(err, RetryError) and isinstance(_reason, ResponseError) and str(_reason) == _THROTTLED_ERROR:
+        return False
+    else:
+        return True
+
 
 def find_plantuml_host_from_env() -> Optional[None]:
     return os.environ.get(PLANTUML_HOST_ENV, None)
@@ -33,6 +73,32 @@ def _host_process(host: str) -> URLObject:
     return URLObject(host).without_fragment().without_query()
 
 
+def _compress_code(code: str) -> str:
+    _compressed = zlib.compress(code.encode())[2:-4]
+    return base64.b64encode(_compressed).translate(_trans_from_base64_to_plantuml).decode()
+
+
+def _is_official_host(host: URLObject) -> bool:
+    return host.hostname in ('plantuml.com', 'www.plantuml.com') and \
+        len(host.path.segments) > 0 and host.path.segments[0] == 'plantuml'
+
+
+def _check_server_version(version: str):
+    if (not version) or ("plantuml" not in version.lower()) or ("version" not in version.lower()):
+        raise ValueError(f"Invalid version information from homepage - {version!r}.")
+
+
+def _version_from_homepage(content: bytes) -> str:
+    page = PyQuery(content.decode())
+    return (page.find('#footer') or page.find('.footer')).text().strip()
+
+
+def _parse_server_version(version: str) -> Tuple[int, int, int]:
+    (major, year, v), = re.findall(r'version\s*(?P<major>\d)[.\-]?(?P<year>\d{4})[.\-]?(?P<v>\d{1,2})',
+                                   version, re.IGNORECASE)
+    return int(major), int(year), int(v.lstrip('0') or '0')
+
+
 def _check_remote(host: str):
     if not host:
         raise ValueError(f"Host should be present, but {host!r} found.")
@@ -43,12 +109,25 @@ def _check_remote(host: str):
 
 
 class RemotePlantuml(Plantuml):
-    __BYTE_TRANS = _trans_from_base64_to_plantuml
-
-    def __init__(self, host: str, **kwargs):
+    def __init__(self, host: str, retries: Optional[int] = None, config: Optional[str] = None,
+                 post: Optional[bool] = None, post_threshold: int = DEFAULT_POST_THRESHOLD,
+                 hedge: Optional[float] = None, hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+                 deadline: Optional[float] = None, breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+                 breaker_time: float = DEFAULT_BREAKER_TIME, **kwargs):
         """
         :param host: the given host
-        :param kwargs: other arguments
+        :param retries: retry times of failed (including timeout) requests, None means default
+        :param config: preamble file shared by all the diagrams, merged into each source code, None means no preamble
+        :param post: send source code by POST, True means always, False means never, None means only when the
+            encoded source code is longer than ``post_threshold``, GET is used when POST is not supported by server
+        :param post_threshold: max length of encoded source code sent by GET when ``post`` is None
+        :param hedge: percentile of the recent latencies, a request slower than it is sent once again and the
+            first response is used, None means no hedging
+        :param hedge_budget: max ratio of the hedged requests to all the requests
+        :param deadline: total time in seconds of each request, including all the retries, None means no limit
+        :param breaker_failures: requests to a host fail fast after it failed for this times in a row
+        :param breaker_time: time in seconds before a failed host is tried again
+        :param kwargs: other arguments of requests, such as ``timeout`` (of each attempt)
         """
         Plantuml.__init__(self)
 
@@ -56,18 +135,48 @@ class RemotePlantuml(Plantuml):
         _check_remote(self.__host)
         self.__host = _host_process(self.__host)
 
-        self.__session = get_requests_session()
+        # failed requests are retried here instead of by session, within the deadline and the circuit breaker
+        self.__session = get_requests_session(max_retries=0)
+        self.__retries = DEFAULT_RETRIES if retries is None else retries
+        self.__deadline = deadline
+        self.__breaker_failures = breaker_failures
+        self.__breaker_time = breaker_time
+        self.__breakers: Dict[str, CircuitBreaker] = {}
+        self.__breaker_lock = Lock()
         self.__request_params = kwargs
+        self.__check_available = None
+        self.__post = post
+        self.__post_threshold = post_threshold
+        self.__post_available = None
+        self.__hedging = RequestHedging(hedge, hedge_budget) if hedge is not None else None
+        self.__config = config
+        self.__preamble = load_preamble(config)
 
     @classmethod
-    def autoload(cls, host: Optional[str] = None, **kwargs) -> 'RemotePlantuml':
+    def autoload(cls, host: Optional[str] = None, retries: Optional[int] = None, config: Optional[str] = None,
+                 post: Optional[bool] = None, post_threshold: int = DEFAULT_POST_THRESHOLD,
+                 hedge: Optional[float] = None, hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+                 deadline: Optional[float] = None, breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+                 breaker_time: float = DEFAULT_BREAKER_TIME, **kwargs) -> 'RemotePlantuml':
         """
         Autoload RemotePlantuml object from given host, system environments and official site
         :param host: the given host
-        :param kwargs: other arguments
+        :param retries: retry times of failed (including timeout) requests, None means default
+        :param config: preamble file shared by all the diagrams, merged into each source code, None means no preamble
+        :param post: send source code by POST, True means always, False means never, None means only when the
+            encoded source code is longer than ``post_threshold``, GET is used when POST is not supported by server
+        :param post_threshold: max length of encoded source code sent by GET when ``post`` is None
+        :param hedge: percentile of the recent latencies, a request slower than it is sent once again and the
+            first response is used, None means no hedging
+        :param hedge_budget: max ratio of the hedged requests to all the requests
+        :param deadline: total time in seconds of each request, including all the retries, None means no limit
+        :param breaker_failures: requests to a host fail fast after it failed for this times in a row
+        :param breaker_time: time in seconds before a failed host is tried again
+        :param kwargs: other arguments of requests, such as ``timeout`` (of each attempt)
         :return: remote plantuml object
         """
-        return RemotePlantuml(find_plantuml_host(host), **kwargs)
+        return RemotePlantuml(find_plantuml_host(host), retries, config, post, post_threshold,
+                              hedge, hedge_budget, deadline, breaker_failures, breaker_time, **kwargs)
 
     @property
     def host(self) -> str:
@@ -77,35 +186,152 @@ class RemotePlantuml(Plantuml):
         """
         return str(self.__host)
 
+    @property
+    def config(self) -> Optional[str]:
+        """
+        Preamble file shared by all the diagrams
+        :return: path of preamble file, None means no preamble
+        """
+        return self.__config
+
+    @property
+    def hedging(self) -> Optional[RequestHedging]:
+        """
+        Hedging of the requests
+        :return: hedging object, None means no hedging
+        """
+        return self.__hedging
+
+    @property
+    def deadline(self) -> Optional[float]:
+        """
+        Total time of each request, including all the retries
+        :return: deadline in seconds, None means no limit
+        """
+        return self.__deadline
+
+    def _breaker(self, host: URLObject) -> CircuitBreaker:
+        with self.__breaker_lock:
+            _key = str(host)
+            if _key not in self.__breakers:
+                self.__breakers[_key] = CircuitBreaker(self.__breaker_failures, self.__breaker_time)
+            return self.__breakers[_key]
+
+    def circuit_state(self, host: Optional[str] = None) -> CircuitState:
+        """
+        State of the circuit breaker of host
+        :param host: url of host, None means the host of this plantuml
+        :return: state of circuit breaker
+        """
+        return self._breaker(self.__host if host is None else _host_process(host)).state
+
     def _properties(self) -> Mapping[str, Any]:
         return {
             'host': str(self.__host),
         }
 
-    @classmethod
-    def __compress(cls, code: str) -> str:
-        _compressed = zlib.compress(code.encode())[2:-4]
-        return base64.b64encode(_compressed).translate(cls.__BYTE_TRANS).decode()
+    def _apply_preamble(self, code: str) -> str:
+        return apply_preamble(code, self.__preamble)
+
+    def _restore_syntax_result(self, code: str, result: PlantumlSyntaxResult) -> PlantumlSyntaxResult:
+        return restore_syntax_result(code, self.__preamble, result)
 
     def __request_url(self, path: str) -> str:
         return str(self.__host.add_path(path))
 
-    def __request(self, path: str, stream: bool = False):
-        r = self.__session.get(self.__request_url(path), stream=stream, **self.__request_params)
+    def _request_host(self) -> URLObject:
+        return self.__host
+
+    def _check_response(self, r: requests.Response):
         r.raise_for_status()
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> Any:
+        # timeout of the next attempt, cut by the time left before deadline
+        if deadline is None:
+            return None
+
+        _left = deadline - time.time()
+        if _left <= 0:
+            raise requests.Timeout(f'Deadline of {self.__deadline!r} seconds exceeded.')
+        _timeout = self.__request_params.get('timeout', None) or DEFAULT_TIMEOUT
+        if isinstance(_timeout, tuple):  # (connect, read)
+            return tuple(_left if t is None else min(t, _left) for t in _timeout)
+        else:
+            return min(_timeout, _left)
+
+    def _backoff(self, retry: int, deadline: Optional[float]) -> bool:
+        # wait before the next retry, False when no time left for it
+        _wait = backoff_time(retry)
+        if deadline is not None and time.time() + _wait >= deadline:
+            return False
+        time.sleep(_wait)
+        return True
+
+    def _send(self, host: URLObject, path: str, stream: bool = False,
+              data: Optional[bytes] = None, timeout: Any = None) -> requests.Response:
+        _breaker = self._breaker(host)
+        if not _breaker.acquire():
+            raise CircuitOpenError(f'Host {str(host)!r} is down, the circuit breaker is open.')
+
+        _url = str(host.add_path(path))
+        _params = self.__request_params if timeout is None else {**self.__request_params, 'timeout': timeout}
+        try:
+            if data is None:
+                r = self.__session.get(_url, stream=stream, **_params)
+            else:
+                r = self.__session.post(_url, data=data, headers={'Content-Type': 'text/plain; charset=utf-8'},
+                                        stream=stream, **_params)
+        except requests.RequestException as err:
+            if _is_host_failure(err):
+                _breaker.failure()
+            else:
+                _breaker.release()  # the host is not known down
+            # read timeout is wrapped by session, unwrap it to keep the error typed
+            _reason = _error_reason(err)
+            if isinstance(err, requests.ConnectionError) and isinstance(_reason, ReadTimeoutError):
+                raise requests.ReadTimeout(_reason, request=err.request, response=err.response) from err
+            raise
+
+        _breaker.success()
+        return r
+
+    def _dispatch(self, path: str, stream: bool = False, data: Optional[bytes] = None,
+                  hosts: Optional[List[URLObject]] = None, deadline: Optional[float] = None) -> requests.Response:
+        # hosts is shared by the hedged requests, which record and avoid the hosts used by each other
+        _ = hosts
+        retry = 0
+        while True:
+            try:
+                return self._send(self._request_host(), path, stream, data, self._attempt_timeout(deadline))
+            except CircuitOpenError:  # known down, not retried
+                raise
+            except _RETRY_ERRORS:
+                retry += 1
+                if retry > self.__retries or not self._backoff(retry, deadline):
+                    raise
+
+    def _request(self, path: str, stream: bool = False, check: bool = True,
+                 data: Optional[bytes] = None) -> requests.Response:
+        _deadline = None if self.__deadline is None else time.time() + self.__deadline
+        if self.__hedging is None:
+            r = self._dispatch(path, stream, data, deadline=_deadline)
+        else:
+            _hosts = []
+            r = self.__hedging.call(lambda: self._dispatch(path, stream, data, _hosts, _deadline))
+
+        if check:
+            self._check_response(r)
         return r
 
     def __get_homepage(self):
-        return self.__request('')
+        return self._request('')
 
     def _is_official(self):
-        return self.__host.hostname in ('plantuml.com', 'www.plantuml.com') and \
-            len(self.__host.path.segments) > 0 and self.__host.path.segments[0] == 'plantuml'
+        return _is_official_host(self.__host)
 
     def _check_version(self, version: str):
         if not self._is_official():
-            if (not version) or ("plantuml" not in version.lower()) or ("version" not in version.lower()):
-                raise ValueError(f"Invalid version information from homepage - {version!r}.")
+            _check_server_version(version)
 
     def _check_type_supported(self, type_: PlantumlResourceType):
         if type_ == PlantumlResourceType.PDF:
@@ -120,26 +346,49 @@ class RemotePlantuml(Plantuml):
 
     def _get_version(self) -> str:
         if not self._is_official():
-            r = self.__get_homepage()
-            page = PyQuery(r.content.decode())
-            return (page.find('#footer') or page.find('.footer')).text().strip()
+            return _version_from_homepage(self.__get_homepage().content)
         else:
             return 'Official Site'
 
     def _get_server_version(self) -> Tuple[int, int, int]:
-        (major, year, v), = re.findall(r'version\s*(?P<major>\d)[.\-]?(?P<year>\d{4})[.\-]?(?P<v>\d{1,2})',
-                                       self._get_version(), re.IGNORECASE)
-
-        return int(major), int(year), int(v.lstrip('0') or '0')
+        return _parse_server_version(self._get_version())
 
     def __get_uml_path(self, type_: str, code: str):
-        return f"{type_}/{self.__compress(code)}"
+        return f"{type_}/{_compress_code(self._apply_preamble(code))}"
 
     def __get_uml_url(self, type_: str, code: str) -> str:
         return self.__request_url(self.__get_uml_path(type_, code))
 
+    def __probe_post(self) -> bool:
+        # some servers (such as picoweb) answer POST with an error image, so the content type is checked
+        try:
+            r = self._request('txt', check=False, data=_POST_PROBE_CODE.encode())
+        except requests.RequestException:
+            return False
+        return r.status_code == 200 and r.headers.get('Content-Type', '').startswith('text/plain')
+
+    def _use_post(self, encoded: str) -> bool:
+        if self.__post is False or (self.__post is None and len(encoded) <= self.__post_threshold):
+            return False
+        if self.__post_available is None:
+            self.__post_available = self.__probe_post()
+        return self.__post_available
+
+    def __request_uml(self, type_: str, code: str, check: bool = True):
+        _code = self._apply_preamble(code)
+        _encoded = _compress_code(_code)
+        if self._use_post(_encoded):
+            r = self._request(type_, check=False, data=_code.encode())
+            if r.status_code not in _POST_UNSUPPORTED_STATUSES:
+                if check:
+                    self._check_response(r)
+                return r
+            self.__post_available = False  # such as the routes behind a proxy, fallback to GET
+
+        return self._request(f"{type_}/{_encoded}", check=check)
+
     def __get_uml(self, type_: str, code: str) -> bytes:
-        r = self.__request(self.__get_uml_path(type_, code))
+        r = self.__request_uml(type_, code)
         return r.content
 
     def _generate_uml_data(self, type_: PlantumlResourceType, code: str) -> bytes:
@@ -151,6 +400,43 @@ class RemotePlantuml(Plantuml):
         else:
             return self.__get_uml(type_.name.lower(), code)
 
+    def __check_syntax_by_endpoint(self, code: str) -> Optional[PlantumlSyntaxResult]:
+        r = self._request(f'check/{_compress_code(self._apply_preamble(code))}', check=False)
+        if r.status_code == 404 or not r.headers.get('Content-Type', '').startswith('text/plain'):
+            return None  # check endpoint not provided by this server
+
+        if r.status_code != 400:
+            r.raise_for_status()
+        _description = r.text.strip()
+        if r.status_code == 400 or _ERROR_DESCRIPTION in _description or _ERROR_HEADER in r.headers:
+            if _ERROR_LINE_HEADER not in r.headers:
+                return self.__check_syntax_by_render(code)  # get the details of error
+            return PlantumlSyntaxResult(False, line=int(r.headers[_ERROR_LINE_HEADER]),
+                                        message=r.headers.get(_ERROR_HEADER, _description))
+        else:
+            return PlantumlSyntaxResult(True)
+
+    def __check_syntax_by_render(self, code: str) -> PlantumlSyntaxResult:
+        r = self.__request_uml('svg', code, check=False)
+        if _ERROR_HEADER in r.headers:
+            _line = r.headers.get(_ERROR_LINE_HEADER, '')
+            return PlantumlSyntaxResult(False, line=int(_line) if _line.isdigit() else None,
+                                        message=r.headers[_ERROR_HEADER])
+        elif r.status_code == 400:
+            return PlantumlSyntaxResult(False, message=r.reason or 'Bad Request')
+        else:
+            r.raise_for_status()
+            return PlantumlSyntaxResult(True)
+
+    def _check_syntax(self, code: str) -> PlantumlSyntaxResult:
+        if self.__check_available is not False:
+            _result = self.__check_syntax_by_endpoint(code)
+            self.__check_available = _result is not None
+            if _result is not None:
+                return self._restore_syntax_result(code, _result)
+
+        return self._restore_syntax_result(code, self.__check_syntax_by_render(code))
+
     def _generate_uml_url(self, type_: PlantumlResourceType, code: str) -> str:
         return self.__get_uml_url(type_.name.lower(), code)
 
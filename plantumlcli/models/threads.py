@@ -0,0 +1,153 @@
+"""
+Internal parallelism (``-nbthread``) of local plantuml, the best split of cpu budget is measured on the host.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import cpu_count
+from typing import Optional, List, Dict, Callable, Tuple
+
+from .cds import get_runtime_stamp
+from ..download.base import PLANTUML_CACHE_DIR
+from ..utils import save_text_file, execute, short_hash, load_json_file, save_json_file
+
+PLANTUML_THREADS_DIR = os.path.join(PLANTUML_CACHE_DIR, 'threads')
+
+_TUNING_TYPE = 'png'
+_TUNING_ROUNDS = 4  # amount of diagrams for each cpu
+_TUNING_CODES = [
+    '@startuml\nAlice -> Bob : hello {index}\nBob --> Alice : ok\n@enduml',
+    '@startuml\nstart\n:step {index};\nif (ok?) then (yes)\n:a;\nelse (no)\n:b;\nendif\nstop\n@enduml',
+    '@startuml\n!pragma layout smetana\nclass A{index}\nclass B\nA{index} --> B\n@enduml',
+]
+
+
+def thread_splits(cpus: Optional[int] = None) -> List[int]:
+    """
+    Get candidates of internal threads for each jvm process
+    :param cpus: amount of cpus, None means cpu count of the host
+    :return: list of thread amounts, from 1 to ``cpus``
+
+    Example::
+        >>> thread_splits(8)
+        [1, 2, 4, 8]
+        >>> thread_splits(6)
+        [1, 2, 4, 6]
+    """
+    cpus = cpus or cpu_count()
+    _splits, _threads = [], 1
+    while _threads < cpus:
+        _splits.append(_threads)
+        _threads *= 2
+    _splits.append(cpus)
+    return _splits
+
+
+def jvm_processes(concurrency: int, threads: int) -> int:
+    """
+    Get amount of jvm processes when each one runs with the given internal threads
+    :param concurrency: total concurrency (cpu budget)
+    :param threads: internal threads of each jvm process
+    :return: amount of jvm processes, no less than 1
+    """
+    return max(1, concurrency // max(1, threads))
+
+
+def tuning_codes(count: int) -> List[str]:
+    """
+    Get source codes of the tuning corpus
+    :param count: amount of diagrams
+    :return: list of source codes
+    """
+    return [_TUNING_CODES[index % len(_TUNING_CODES)].format(index=index) for index in range(count)]
+
+
+def _split_items(items: List[str], parts: int) -> List[List[str]]:
+    return [items[index::parts] for index in range(parts) if items[index::parts]]
+
+
+def measure_threads(command_line: Callable[..., Tuple[str, ...]], codes: List[str], threads: int,
+                    concurrency: Optional[int] = None) -> float:
+    """
+    Measure time cost of rendering the codes, with the cpu budget split into jvm processes with the given threads
+    :param command_line: function to get command line of plantuml from its arguments
+    :param codes: source codes to be rendered
+    :param threads: internal threads of each jvm process
+    :param concurrency: total concurrency (cpu budget), None means cpu count of the host
+    :return: time cost in seconds
+    """
+    concurrency = concurrency or cpu_count()
+    with tempfile.TemporaryDirectory(prefix='puml') as workdir:
+        _chunks = []
+        for index, chunk in enumerate(_split_items(codes, jvm_processes(concurrency, threads))):
+            _chunk_dir = os.path.join(workdir, str(index))
+            os.makedirs(_chunk_dir)
+            _files = []
+            for code_index, code in enumerate(chunk):
+                _file = os.path.join(_chunk_dir, f'{code_index}.puml')
+                save_text_file(_file, code)
+                _files.append(_file)
+            _chunks.append((_chunk_dir, _files))
+
+        def _render(chunk_dir: str, files: List[str]):
+            _thread_args = ('-nbthread', str(threads)) if threads > 1 else ()
+            execute(*command_line(f'-t{_TUNING_TYPE}', *_thread_args, '-o', os.path.join(chunk_dir, 'output'),
+                                  *files))
+
+        _start = time.time()
+        with ThreadPoolExecutor(max_workers=len(_chunks)) as pool:
+            for future in [pool.submit(_render, chunk_dir, files) for chunk_dir, files in _chunks]:
+                future.result()
+        return time.time() - _start
+
+
+def _threads_file(java: str, plantuml: str) -> str:
+    return os.path.join(PLANTUML_THREADS_DIR, f'{short_hash(os.path.realpath(java), os.path.realpath(plantuml))}.json')
+
+
+def _threads_stamp(java: str, plantuml: str) -> Dict[str, object]:
+    return {**get_runtime_stamp(java, plantuml), 'cpus': cpu_count()}
+
+
+def tune_threads(java: str, plantuml: str, command_line: Callable[..., Tuple[str, ...]],
+                 splits: Optional[List[int]] = None, count: Optional[int] = None) -> int:
+    """
+    Measure the best internal threads of each jvm process on the host, and save it to cache
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :param command_line: function to get command line of plantuml from its arguments
+    :param splits: candidates of internal threads, None means all of :func:`thread_splits`
+    :param count: amount of diagrams in tuning corpus, None means 4 for each cpu
+    :return: best internal threads
+    """
+    splits = splits or thread_splits()
+    _codes = tuning_codes(count or cpu_count() * _TUNING_ROUNDS)
+    measure_threads(command_line, _codes[:1], 1)  # warm up, so the file cache is not measured
+    _costs = {threads: measure_threads(command_line, _codes, threads) for threads in splits}
+    _threads = min(splits, key=lambda x: (_costs[x], x))
+
+    save_json_file(_threads_file(java, plantuml), {
+        **_threads_stamp(java, plantuml),
+        'threads': _threads, 'costs': {str(key): value for key, value in _costs.items()},
+    })
+    return _threads
+
+
+def get_tuned_threads(java: str, plantuml: str) -> Optional[int]:
+    """
+    Get the tuned internal threads of each jvm process for the given java and plantuml
+    :param java: java executable file
+    :param plantuml: path of plantuml jar file
+    :return: best internal threads, None when not tuned or the tuning is stale
+    """
+    _saved = load_json_file(_threads_file(java, plantuml))
+    if _saved is None:
+        return None
+
+    _threads = _saved.pop('threads', None)
+    _saved.pop('costs', None)
+    if _saved == _threads_stamp(java, plantuml) and isinstance(_threads, int) and _threads >= 1:
+        return _threads
+    else:
+        return None
@@ -1,8 +1,12 @@
+from .cache import short_hash, file_stat, load_json_file, save_json_file
 from .concurrent import linear_process
 from .decorator import check_func, timing_func
 from .download import download_file
 from .encoding import auto_decode
-from .execute import CommandLineExecuteError, execute
+from .execute import CommandLineExecuteError, CommandLineTimeoutError, execute, execute_stream, kill_process_tree
 from .file import load_binary_file, load_text_file, save_binary_file, save_text_file
 from .function import all_func
-from .session import TimeoutHTTPAdapter, get_requests_session, get_random_ua
+from .memory import parse_memory_size, jvm_memory_size, get_available_memory, jvm_memory_budget, \
+    admit_jvm_processes
+from .session import DEFAULT_TIMEOUT, DEFAULT_RETRIES, RETRY_STATUSES, TimeoutHTTPAdapter, get_requests_session, \
+    get_random_ua, backoff_time
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Optional, Tuple, Dict, Any
+
+
+def short_hash(*items: str) -> str:
+    """
+    Get short hash of the given strings, used as the name of cached files
+    :param items: strings to be hashed
+    :return: the first 16 chars of sha256 hash
+    """
+    return hashlib.sha256('\0'.join(items).encode()).hexdigest()[:16]
+
+
+def file_stat(filename: str) -> Tuple[int, int]:
+    """
+    Get size and modification time of file, used for checking if the cached data is stale.
+    The data cached for a java executable and a plantuml jar (such as cds archives, tuned jvm options and threads)
+    is saved with a stamp of their paths, sizes and modification times, and it is stale once any of them is changed.
+    :param filename: file path
+    :return: size in bytes, modification time in nanoseconds
+    """
+    _stat = os.stat(filename)
+    return _stat.st_size, _stat.st_mtime_ns
+
+
+def load_json_file(filename: str) -> Optional[Dict[str, Any]]:
+    """
+    Load json data from given path
+    :param filename: file path
+    :return: json data, None when not exist or broken
+    """
+    try:
+        with open(filename, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json_file(filename: str, data: Dict[str, Any]):
+    """
+    Save json data to given path, the file is replaced atomically so the concurrent readers never see a partial one
+    :param filename: file path
+    :param data: json data
+    """
+    _dir = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(_dir, exist_ok=True)
+    _fd, _tmp = tempfile.mkstemp(prefix='.stamp', dir=_dir)
+    with os.fdopen(_fd, 'w') as f:
+        json.dump(data, f, indent=4, sort_keys=True)
+    os.replace(_tmp, filename)
@@ -1,5 +1,9 @@
+import os
+import signal
 import subprocess
-from typing import Tuple, Optional, Type
+import time
+from threading import Thread, Timer
+from typing import Tuple, Optional, Type, AnyStr, Iterator, BinaryIO, List
 
 
 class CommandLineExecuteError(Exception):
@@ -37,6 +41,41 @@ class CommandLineExecuteError(Exception):
             raise cls(command_line, exitcode, stdout, stderr, **kwargs)
 
 
+class CommandLineTimeoutError(CommandLineExecuteError, TimeoutError):
+    def __init__(self, command_line: Tuple[str], exitcode: int,
+                 stdout: Optional[str] = None, stderr: Optional[str] = None, timeout: Optional[float] = None,
+                 **kwargs):
+        CommandLineExecuteError.__init__(self, command_line, exitcode, stdout, stderr, **kwargs)
+        self.__timeout = timeout
+
+    @property
+    def timeout(self) -> Optional[float]:
+        return self.__timeout
+
+    def __str__(self):
+        return f'Command line not completed in {self.__timeout!r} seconds.'
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} timeout: {self.__timeout!r}, command_line: {self.command_line!r}>'
+
+
+_USE_PROCESS_GROUP = os.name == 'posix'
+
+
+def kill_process_tree(process: subprocess.Popen):
+    """
+    Kill the process and its children (such as graphviz processes started by plantuml)
+    :param process: process started in a new session
+    """
+    if _USE_PROCESS_GROUP:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):  # pragma: no cover
+            pass
+    if process.poll() is None:
+        process.kill()
+
+
 def _decode_if_not_none(value: Optional[bytes]) -> Optional[str]:
     if value is not None:
         return value.decode()
@@ -44,15 +83,173 @@ def _decode_if_not_none(value: Optional[bytes]) -> Optional[str]:
         return value
 
 
-def execute(*cmdline: str, exc: Type[CommandLineExecuteError] = CommandLineExecuteError
-            ) -> Tuple[Optional[str], Optional[str]]:
+def execute(*cmdline: str, exc: Type[CommandLineExecuteError] = CommandLineExecuteError,
+            stdin: Optional[bytes] = None, decode: bool = True, timeout: Optional[float] = None,
+            timeout_exc: Type[CommandLineTimeoutError] = CommandLineTimeoutError, cwd: Optional[str] = None) \
+        -> Tuple[Optional[AnyStr], Optional[str]]:
+    """
+    Execute command line and wait for it
+    :param cmdline: command line
+    :param exc: exception class to be raised when exitcode is not 0
+    :param stdin: binary data to be sent to stdin, None means no stdin
+    :param decode: decode stdout or not, binary stdout will be returned when not decoded
+    :param timeout: timeout in seconds, the process and its children will be killed when expired, \
+        None means no limit
+    :param timeout_exc: exception class to be raised when timeout
+    :param cwd: working directory of the command, None means current directory
+    :return: tuple of stdout and stderr
+    """
     process = subprocess.Popen(
         args=cmdline,
+        stdin=subprocess.PIPE if stdin is not None else None,
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=_USE_PROCESS_GROUP,  # so its process group can be killed as a whole
     )
-    _stdout, _stderr = process.communicate()
-    _stdout, _stderr = _decode_if_not_none(_stdout), _decode_if_not_none(_stderr)
+    try:
+        _stdout, _stderr = process.communicate(stdin, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_tree(process)
+        _stdout, _stderr = process.communicate()
+        raise timeout_exc(cmdline, process.returncode, None, _decode_if_not_none(_stderr), timeout=timeout)
+    except BaseException:
+        # such as KeyboardInterrupt, the process should not be left running
+        kill_process_tree(process)
+        raise
+
+    if decode:
+        _stdout = _decode_if_not_none(_stdout)
+    _stderr = _decode_if_not_none(_stderr)
 
     exc.try_raise(cmdline, process.returncode, _stdout, _stderr)
     return _stdout, _stderr
+
+
+_STREAM_CHUNK_SIZE = 1 << 16
+_STDERR_LIMIT = 1 << 16
+
+
+def _write_stdin(stream: BinaryIO, data: bytes):
+    try:
+        stream.write(data)
+    except (BrokenPipeError, OSError, ValueError):
+        pass  # the process exited early, the error will be reported by its exitcode
+    finally:
+        try:
+            stream.close()
+        except (BrokenPipeError, OSError):  # pragma: no cover
+            pass
+
+
+def _read_limited(stream: BinaryIO, chunks: List[bytes], limit: int):
+    _size = 0
+    while True:
+        data = stream.read(_STREAM_CHUNK_SIZE)
+        if not data:
+            break
+        if _size < limit:
+            chunks.append(data[:limit - _size])
+        _size += len(data)
+
+    if _size > limit:
+        chunks.append(f'{os.linesep}... ({_size - limit} bytes truncated)'.encode())
+
+
+def _start_io_threads(process: subprocess.Popen, stdin: Optional[bytes],
+                      stderr_chunks: List[bytes], stderr_limit: int) -> List[Thread]:
+    _threads = [Thread(target=_read_limited, args=(process.stderr, stderr_chunks, stderr_limit), daemon=True)]
+    if stdin is not None:
+        _threads.append(Thread(target=_write_stdin, args=(process.stdin, stdin), daemon=True))
+    for thread in _threads:
+        thread.start()
+    return _threads
+
+
+def _start_deadline_timer(process: subprocess.Popen, timeout: Optional[float], expired: List[bool]) -> Optional[Timer]:
+    if timeout is None:
+        return None
+
+    def _expire():
+        if process.poll() is not None:
+            return  # exited just before the deadline, not a timeout
+        expired.append(True)
+        kill_process_tree(process)
+
+    _timer = Timer(timeout, _expire)
+    _timer.daemon = True
+    _timer.start()
+    return _timer
+
+
+def _stop_deadline_timer(timer: Optional[Timer]):
+    if timer is not None:
+        timer.cancel()
+        timer.join()
+
+
+def _wait_rest_of_deadline(process: subprocess.Popen, deadline: Optional[float], expired: List[bool]):
+    try:
+        process.wait(timeout=max(0.0, deadline - time.monotonic()) if deadline is not None else None)
+    except subprocess.TimeoutExpired:
+        expired.append(True)
+        kill_process_tree(process)
+        process.wait()
+
+
+def execute_stream(*cmdline: str, exc: Type[CommandLineExecuteError] = CommandLineExecuteError,
+                   stdin: Optional[bytes] = None, timeout: Optional[float] = None,
+                   timeout_exc: Type[CommandLineTimeoutError] = CommandLineTimeoutError, cwd: Optional[str] = None,
+                   chunk_size: int = _STREAM_CHUNK_SIZE, stderr_limit: int = _STDERR_LIMIT) -> Iterator[bytes]:
+    """
+    Execute command line, and yield the binary stdout incrementally instead of holding it in memory.
+    The exception is raised after all the stdout is yielded, without stdout in it.
+    :param cmdline: command line
+    :param exc: exception class to be raised when exitcode is not 0
+    :param stdin: binary data to be sent to stdin, None means no stdin
+    :param timeout: timeout in seconds, the process and its children will be killed when expired, \
+        None means no limit
+    :param timeout_exc: exception class to be raised when timeout
+    :param cwd: working directory of the command, None means current directory
+    :param chunk_size: max size of each stdout chunk
+    :param stderr_limit: max size of stderr kept for error message, the rest is truncated
+    :return: iterator of stdout chunks
+    """
+    process = subprocess.Popen(
+        args=cmdline,
+        stdin=subprocess.PIPE if stdin is not None else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=cwd,
+        start_new_session=_USE_PROCESS_GROUP,  # so its process group can be killed as a whole
+    )
+    _stderr_chunks = []
+    _threads = _start_io_threads(process, stdin, _stderr_chunks, stderr_limit)
+    _expired = []
+    _deadline = time.monotonic() + timeout if timeout is not None else None
+    _timer = _start_deadline_timer(process, timeout, _expired)
+    try:
+        while True:
+            data = process.stdout.read1(chunk_size)
+            if not data:
+                break
+            yield data
+
+        _stop_deadline_timer(_timer)  # stdout is closed, the rest of the deadline is applied to waiting
+        _wait_rest_of_deadline(process, _deadline, _expired)
+    except BaseException:
+        # such as KeyboardInterrupt or the iterator is closed, the process should not be left running
+        kill_process_tree(process)
+        process.wait()
+        raise
+    finally:
+        _stop_deadline_timer(_timer)
+        for thread in _threads:
+            thread.join()
+        process.stdout.close()
+        process.stderr.close()
+
+    _stderr = b''.join(_stderr_chunks).decode(errors='replace')
+    if _expired:
+        raise timeout_exc(cmdline, process.returncode, None, _stderr, timeout=timeout)
+    exc.try_raise(cmdline, process.returncode, None, _stderr)
@@ -0,0 +1,111 @@
+import re
+from typing import Optional
+
+_MEMINFO_FILE = '/proc/meminfo'
+_CGROUP_V2_LIMIT_FILE = '/sys/fs/cgroup/memory.max'
+_CGROUP_V2_USAGE_FILE = '/sys/fs/cgroup/memory.current'
+_CGROUP_V1_LIMIT_FILE = '/sys/fs/cgroup/memory/memory.limit_in_bytes'
+_CGROUP_V1_USAGE_FILE = '/sys/fs/cgroup/memory/memory.usage_in_bytes'
+_CGROUP_UNLIMITED = 1 << 60
+
+_MEMORY_SIZE_PATTERN = re.compile(r'^\s*(?P<value>\d+)\s*(?P<unit>[kmgt]?)b?\s*$', re.IGNORECASE)
+_MEMORY_UNITS = {'': 1, 'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30, 't': 1 << 40}
+
+JVM_DEFAULT_MEMORY = 512 << 20
+JVM_NON_HEAP_MEMORY = 128 << 20
+
+
+def parse_memory_size(size: str) -> int:
+    """
+    Parse memory size in the format of jvm options
+    :param size: memory size, such as ``512m`` and ``2g``
+    :return: size in bytes
+
+    Example::
+        >>> parse_memory_size('512m')
+        536870912
+    """
+    _matching = _MEMORY_SIZE_PATTERN.fullmatch(size)
+    if not _matching:
+        raise ValueError(f'Invalid memory size - {size!r}.')
+    return int(_matching.group('value')) * _MEMORY_UNITS[_matching.group('unit').lower()]
+
+
+def jvm_memory_size(size: str) -> str:
+    """
+    Normalize memory size to the format accepted by jvm options (such as ``-Xmx``)
+    :param size: memory size, such as ``512m``, ``512MB`` and ``2 g``
+    :return: memory size for jvm options
+
+    Example::
+        >>> jvm_memory_size('512MB')
+        '512m'
+    """
+    _matching = _MEMORY_SIZE_PATTERN.fullmatch(size)
+    if not _matching:
+        raise ValueError(f'Invalid memory size - {size!r}.')
+    return f"{int(_matching.group('value'))}{_matching.group('unit').lower()}"
+
+
+def _read_int_file(filename: str) -> Optional[int]:
+    try:
+        with open(filename, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def _meminfo_available() -> Optional[int]:
+    try:
+        with open(_MEMINFO_FILE, 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return parse_memory_size(line.split(':', 1)[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _cgroup_available() -> Optional[int]:
+    for limit_file, usage_file in [(_CGROUP_V2_LIMIT_FILE, _CGROUP_V2_USAGE_FILE),
+                                   (_CGROUP_V1_LIMIT_FILE, _CGROUP_V1_USAGE_FILE)]:
+        _limit, _usage = _read_int_file(limit_file), _read_int_file(usage_file)
+        if _limit is not None and _usage is not None and _limit < _CGROUP_UNLIMITED:
+            return max(0, _limit - _usage)
+    return None
+
+
+def get_available_memory() -> Optional[int]:
+    """
+    Get available memory of current environment, both system memory and cgroup limit are considered
+    :return: available memory in bytes, None when unknown
+    """
+    _values = [value for value in (_meminfo_available(), _cgroup_available()) if value is not None]
+    return min(_values) if _values else None
+
+
+def jvm_memory_budget(max_heap: Optional[str] = None) -> int:
+    """
+    Get memory budget of one jvm process
+    :param max_heap: max heap size of jvm (``-Xmx``), None means the default one
+    :return: memory budget in bytes
+    """
+    if max_heap:
+        return parse_memory_size(max_heap) + JVM_NON_HEAP_MEMORY
+    else:
+        return JVM_DEFAULT_MEMORY
+
+
+def admit_jvm_processes(concurrency: int, budget: int, available: Optional[int] = None) -> int:
+    """
+    Get amount of jvm processes can be run at the same time, without oversubscribing memory
+    :param concurrency: expected concurrency, not limited by cpu count here (the default of cli is)
+    :param budget: memory budget of one jvm process
+    :param available: available memory in bytes, None means detect from current environment
+    :return: admitted concurrency, no less than 1
+    """
+    _limit = concurrency
+    available = get_available_memory() if available is None else available
+    if available is not None:
+        _limit = min(_limit, available // budget)
+    return max(1, _limit)
@@ -20,6 +20,24 @@ from random_user_agent.user_agent import UserAgent
 from requests.adapters import HTTPAdapter, Retry
 
 DEFAULT_TIMEOUT = 15  # seconds
+DEFAULT_RETRIES = 5
+# only the transient ones, statuses like 501 (not implemented) and 505 (http version not supported) never succeed
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504, 507, 509)
+BACKOFF_FACTOR = 1.0
+
+
+def backoff_time(retry: int, factor: float = BACKOFF_FACTOR) -> float:
+    """
+    Get the time to wait before a retry, in the same way as the sessions (urllib3).
+
+    :param retry: Index of the retry, starts from 1.
+    :type retry: int
+    :param factor: Backoff factor.
+    :type factor: float
+    :return: Time to wait in seconds, the first retry is not delayed.
+    :rtype: float
+    """
+    return 0.0 if retry <= 1 else factor * (2 ** (retry - 1))
 
 
 class TimeoutHTTPAdapter(HTTPAdapter):
@@ -52,7 +70,7 @@ class TimeoutHTTPAdapter(HTTPAdapter):
         return super().send(request, **kwargs)
 
 
-def get_requests_session(max_retries: int = 5, timeout: int = DEFAULT_TIMEOUT, verify: bool = True,
+def get_requests_session(max_retries: int = DEFAULT_RETRIES, timeout: int = DEFAULT_TIMEOUT, verify: bool = True,
                          headers: Optional[Dict[str, str]] = None, session: Optional[requests.Session] = None,
                          use_random_ua: bool = False) \
         -> requests.Session:
@@ -76,8 +94,8 @@ def get_requests_session(max_retries: int = 5, timeout: int = DEFAULT_TIMEOUT, v
     """
     session = session or requests.session()
     retries = Retry(
-        total=max_retries, backoff_factor=1,
-        status_forcelist=[408, 429, 500, 501, 502, 503, 504, 505, 506, 507, 509, 510, 511],
+        total=max_retries, backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=list(RETRY_STATUSES),
         allowed_methods=["HEAD", "GET", "POST", "PUT", "DELETE", "OPTIONS", "TRACE"],
     )
     adapter = TimeoutHTTPAdapter(max_retries=retries, timeout=timeout, pool_connections=32, pool_maxsize=32)
@@ -1,9 +1,13 @@
 import hashlib
 import os.path
+import shutil
+from unittest.mock import patch
 
 import pytest
 
 from plantumlcli.download import get_plantuml_jar_url, get_plantuml_jar_file
+from plantumlcli.download import base
+from plantumlcli.download.base import download_plantuml_jar_file, get_verified_sha256, _get_verified_stamp_file
 
 
 def _get_file_sha256(filename: str) -> str:
@@ -187,3 +191,28 @@ class TestDownloadBase:
         file = get_plantuml_jar_file(version)
         assert os.path.getsize(file) == size
         assert _get_file_sha256(file) == sha256
+
+    def test_verified_stamp(self, plantuml_jar_version, plantuml_jar_file, tmp_path):
+        _file = str(tmp_path / os.path.basename(plantuml_jar_file))
+        shutil.copyfile(plantuml_jar_file, _file)
+        with patch('plantumlcli.download.base.download_file') as _download:
+            download_plantuml_jar_file(plantuml_jar_version, _file)
+            assert os.path.exists(_get_verified_stamp_file(_file))
+
+            assert get_verified_sha256(_file) == _get_file_sha256(_file)
+
+            # verified file is not hashed again
+            with patch('plantumlcli.download.base._get_file_sha256') as _hash:
+                download_plantuml_jar_file(plantuml_jar_version, _file)
+                _hash.assert_not_called()
+
+            # changed file is hashed again
+            _stat = os.stat(_file)
+            os.utime(_file, ns=(_stat.st_atime_ns, _stat.st_mtime_ns + 1000000000))
+            assert get_verified_sha256(_file) is None
+            with patch('plantumlcli.download.base._get_file_sha256', wraps=base._get_file_sha256) as _hash:
+                download_plantuml_jar_file(plantuml_jar_version, _file)
+                _hash.assert_called_once_with(_file)
+                download_plantuml_jar_file(plantuml_jar_version, _file)
+                _hash.assert_called_once_with(_file)
+            _download.assert_not_called()
@@ -1,14 +1,17 @@
 import os
 from typing import List
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 from click.testing import CliRunner
 from requests import HTTPError
 
 from plantumlcli.entry import cli
-from plantumlcli.models import Plantuml
+from plantumlcli.entry.local import warm_up_local
+from plantumlcli.models import Plantuml, LocalPlantuml
+from plantumlcli.utils import execute_stream
 from .conftest import _has_cairosvg
+from ..testings import StandInServer
 
 
 # noinspection DuplicatedCode,PyTypeChecker,HttpUrlsUsage
@@ -68,6 +71,44 @@ class TestEntranceCli:
         assert "Local plantuml not detected or has problem." not in result.stdout
         assert "Remote plantuml not detected or has problem." in result.stdout
 
+    def test_multiple_hosts(self, uml_helloworld):
+        with StandInServer() as a, StandInServer(failures=100) as b:
+            runner = CliRunner()
+            result = runner.invoke(cli, args=['-cR', '-r', a.url, '-r', b.url])
+            assert result.exit_code == 0
+            assert "Remote plantuml detected." in result.stdout
+            assert f"Remote host : {a.url} (okay, latency " in result.stdout
+            assert f"Remote host : {b.url} (" in result.stdout
+
+            result = runner.invoke(cli, args=['-R', '-T', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_HOST': f'{b.url},{a.url}'})
+            assert result.exit_code == 0
+            assert '/plantuml/txt/' in result.stdout
+
+    def test_hedge(self, uml_helloworld):
+        with StandInServer() as a, StandInServer() as b:
+            runner = CliRunner()
+            result = runner.invoke(cli, args=['-R', '-T', '-r', a.url, '-r', b.url, '--hedge', '95',
+                                              '--hedge-budget', '0.1', os.path.abspath(uml_helloworld)])
+            assert result.exit_code == 0
+            assert '/plantuml/txt/' in result.stdout
+
+        runner = CliRunner()
+        for args in (['--hedge', '100'], ['--hedge', '0'], ['--hedge', '95', '--hedge-budget', '2']):
+            result = runner.invoke(cli, args=['-R', '-T', *args, os.path.abspath(uml_helloworld)])
+            assert result.exit_code != 0
+
+    def test_host_down_abort(self, uml_helloworld, uml_common):
+        with StandInServer(failures=100) as server:
+            runner = CliRunner()
+            with runner.isolated_filesystem(), patch('plantumlcli.models.remote.backoff_time', return_value=0.0):
+                result = runner.invoke(cli, ['-R', '-r', server.url, '-n', '1', '-t', 'txt',
+                                             os.path.abspath(uml_helloworld), os.path.abspath(uml_common)])
+                assert result.exit_code == -6
+                assert 'circuit breaker is open' in result.output
+                assert not os.listdir('.')
+            assert len(server.paths) == 5
+
     def test_check_local(self, plantuml_jar_file):
         runner = CliRunner()
         result = runner.invoke(cli, args=['-cL'], env={'PLANTUML_JAR': plantuml_jar_file})
@@ -77,6 +118,44 @@ class TestEntranceCli:
         assert "Remote plantuml detected." not in result.stdout
         assert "Remote plantuml not detected or has problem." not in result.stdout
 
+    def test_check_local_launcher(self, plantuml_jar_file, uml_helloworld, tmp_path):
+        _wrapper = str(tmp_path / 'wrapper')
+        with open(_wrapper, 'w') as f:
+            f.write(f'#!/bin/sh\nexec java -jar {plantuml_jar_file} "$@"\n')
+        os.chmod(_wrapper, 0o755)
+
+        runner = CliRunner()
+        result = runner.invoke(cli, args=['-cL'], env={'PLANTUML_JAR': plantuml_jar_file})
+        assert result.exit_code == 0
+        assert f"-jar {plantuml_jar_file} (stock jvm)" in result.stdout
+
+        result = runner.invoke(cli, args=['-cL', '--launcher', _wrapper])
+        assert result.exit_code == 0
+        assert "Local plantuml detected." in result.stdout
+        assert f"Launcher : {_wrapper}\n" in result.stdout
+        assert "Plantuml jar" not in result.stdout
+
+        result = runner.invoke(cli, args=['-L', '-T', os.path.abspath(uml_helloworld)],
+                               env={'PLANTUML_LAUNCHER': _wrapper})
+        assert result.exit_code == 0
+        assert 'Alice' in result.stdout
+
+        result = runner.invoke(cli, args=['-cL', '--launcher', str(tmp_path / 'not_exist')])
+        assert result.exit_code != 0
+        assert "Launcher executable" in result.stdout
+
+    def test_check_local_plantuml_version(self, plantuml_jar_version, plantuml_jar_file, tmp_path):
+        runner = CliRunner()
+        result = runner.invoke(cli, args=['-cL', '--plantuml-version', plantuml_jar_version])
+        assert result.exit_code == 0
+        assert "Local plantuml detected." in result.stdout
+        assert f"Plantuml jar : {plantuml_jar_file}\n" in result.stdout
+
+        result = runner.invoke(cli, args=['-cL', '--plantuml-version', plantuml_jar_version,
+                                          '-p', str(tmp_path / 'not_exist.jar')])
+        assert result.exit_code == 0
+        assert f"Plantuml jar : {plantuml_jar_file}\n" in result.stdout
+
     def test_check_local_error(self):
         runner = CliRunner()
         result = runner.invoke(cli, args=['-cL'])
@@ -93,6 +172,294 @@ class TestEntranceCli:
         assert "Remote plantuml detected." not in result.stdout
         assert "Remote plantuml not detected or has problem." not in result.stdout
 
+    def test_picoweb(self, plantuml_jar_file, uml_helloworld):
+        runner = CliRunner()
+        result = runner.invoke(cli, args=['-cL', '-W', '2'], env={'PLANTUML_JAR': plantuml_jar_file})
+        assert result.exit_code == 0
+        assert "Local plantuml detected." in result.stdout
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '-W', '1', '-t', 'txt', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+
+        result = runner.invoke(cli, args=['-cL', '-W', '-1'], env={'PLANTUML_JAR': plantuml_jar_file})
+        assert result.exit_code != 0
+
+    def test_max_heap(self, plantuml_jar_file, uml_helloworld, uml_common):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            with patch('plantumlcli.utils.memory.get_available_memory', return_value=1 << 30):
+                result = runner.invoke(cli, ['-L', '--max-heap', '256m', '-n', '8', '-t', 'txt',
+                                             os.path.abspath(uml_helloworld), os.path.abspath(uml_common)],
+                                       env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+            assert os.path.getsize('common.txt') > 0
+
+        result = runner.invoke(cli, ['-L', '--max-heap', '256x', os.path.abspath(uml_helloworld)],
+                               env={'PLANTUML_JAR': plantuml_jar_file})
+        assert result.exit_code != 0
+
+    def test_layout(self, plantuml_jar_file, uml_helloworld, uml_common):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            for layout in ('dot', 'smetana', 'AUTO'):
+                result = runner.invoke(cli, ['-L', '--layout', layout, '-t', 'svg',
+                                             os.path.abspath(uml_helloworld), os.path.abspath(uml_common)],
+                                       env={'PLANTUML_JAR': plantuml_jar_file})
+                assert result.exit_code == 0
+                assert os.path.getsize('helloworld.svg') > 0
+                assert os.path.getsize('common.svg') > 0
+
+        result = runner.invoke(cli, ['-L', '--layout', 'elk', os.path.abspath(uml_helloworld)],
+                               env={'PLANTUML_JAR': plantuml_jar_file})
+        assert result.exit_code != 0
+
+    def test_timeout(self, plantuml_jar_file, uml_helloworld, uml_common, tmp_path):
+        slow_java = str(tmp_path / 'java')
+        with open(slow_java, 'w') as f:
+            f.write('#!/bin/sh\nsleep 30\n')
+        os.chmod(slow_java, 0o755)
+
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '-j', slow_java, '--timeout', '0.5', '-t', 'txt',
+                                         os.path.abspath(uml_helloworld), os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == -3
+            assert f'{os.path.abspath(uml_helloworld)}: [timeout]' in result.stdout
+            assert f'{os.path.abspath(uml_common)}: [timeout]' in result.stdout
+            assert '2 file(s) not rendered in time.' in result.output
+
+            result = runner.invoke(cli, ['-L', '-j', slow_java, '--timeout', '0.5', '-T',
+                                         os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code != 0
+            assert f'{os.path.abspath(uml_helloworld)}: [timeout]' in result.stdout
+
+        result = runner.invoke(cli, ['-L', '--timeout', '0', os.path.abspath(uml_helloworld)])
+        assert result.exit_code != 0
+        result = runner.invoke(cli, ['-L', '--retries', '-1', os.path.abspath(uml_helloworld)])
+        assert result.exit_code != 0
+
+    def test_build_cds(self, plantuml_jar_file, tmp_path):
+        runner = CliRunner()
+        with patch('plantumlcli.models.cds.PLANTUML_CDS_DIR', str(tmp_path)):
+            result = runner.invoke(cli, args=['--build-cds'], env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert "Cds archive of local plantuml built." in result.stdout
+
+            result = runner.invoke(cli, args=['-cL'], env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert "Cds archive : " in result.stdout
+
+            result = runner.invoke(cli, args=['-cL', '--no-cds'], env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert "Cds archive : " not in result.stdout
+
+        result = runner.invoke(cli, args=['--build-cds'], env={'PLANTUML_JAR': '/path/not/exist'})
+        assert result.exit_code == -1
+        assert "Local plantuml not found" in result.output
+
+    def test_threads(self, plantuml_jar_file, uml_helloworld, uml_common, tmp_path):
+        runner = CliRunner()
+        with patch('plantumlcli.models.threads.PLANTUML_THREADS_DIR', str(tmp_path)), \
+                patch('plantumlcli.models.threads.thread_splits', return_value=[1, 2]), \
+                patch('plantumlcli.models.threads.tuning_codes',
+                      side_effect=lambda count: ['@startuml\na->b\n@enduml'] * 4):
+            result = runner.invoke(cli, args=['--tune-threads'], env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert "Threads of local plantuml tuned." in result.stdout
+            assert "Jvm threads : " in result.stdout
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--threads', '2', '-n', '2', '-t', 'txt',
+                                         os.path.abspath(uml_helloworld), os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+            assert os.path.getsize('common.txt') > 0
+
+        result = runner.invoke(cli, ['-L', '--threads', '0', os.path.abspath(uml_helloworld)])
+        assert result.exit_code != 0
+        result = runner.invoke(cli, args=['--tune-threads'], env={'PLANTUML_JAR': '/path/not/exist'})
+        assert result.exit_code == -1
+        assert "Local plantuml not found" in result.output
+
+    def test_jvm_options(self, plantuml_jar_file, uml_helloworld, tmp_path):
+        runner = CliRunner()
+        with patch('plantumlcli.models.jvm.PLANTUML_JVM_DIR', str(tmp_path)), \
+                patch('plantumlcli.models.jvm.JVM_OPTION_PROFILES', {'serial': ('-XX:+UseSerialGC',)}):
+            result = runner.invoke(cli, args=['--tune-jvm', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert "Jvm options of local plantuml tuned." in result.stdout
+            assert "Jvm options : -XX:+UseSerialGC" in result.stdout
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--jvm-option', '-XX:TieredStopAtLevel=1', '--jvm-option=-Xss1m',
+                                         '-t', 'txt', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+
+            result = runner.invoke(cli, ['-L', '--no-standby', '--jvm-option', '-XX:+NoSuchOptionOfJvm', '-T',
+                                         os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code != 0
+
+        with patch('plantumlcli.models.jvm.PLANTUML_JVM_DIR', str(tmp_path)), \
+                patch('plantumlcli.models.jvm.JVM_OPTION_PROFILES', {'bogus': ('-XX:+NoSuchOptionOfJvm',)}):
+            result = runner.invoke(cli, args=['--tune-jvm', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == -1
+            assert "Jvm options not tuned" in result.output
+
+        result = runner.invoke(cli, args=['--tune-jvm'], env={'PLANTUML_JAR': '/path/not/exist'})
+        assert result.exit_code == -1
+        assert "Local plantuml not found" in result.output
+
+    def test_standby(self, plantuml_jar_file, uml_helloworld, uml_common):
+        runner = CliRunner()
+        with runner.isolated_filesystem(), \
+                patch('plantumlcli.entry.cli.warm_up_local', side_effect=warm_up_local) as _warm_up:
+            result = runner.invoke(cli, ['-L', '-t', 'txt', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+            assert _warm_up.call_count == 1
+
+            result = runner.invoke(cli, ['-L', '-T', os.path.abspath(uml_helloworld), os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert 'Alice' in result.stdout
+            assert _warm_up.call_count == 2
+
+            result = runner.invoke(cli, ['-L', '--no-standby', '-t', 'txt', os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('common.txt') > 0
+            assert _warm_up.call_count == 2
+
+            result = runner.invoke(cli, ['-L', '--check-syntax', os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert _warm_up.call_count == 2
+
+            result = runner.invoke(cli, ['-L', '--all-pages', '-t', 'txt', os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert _warm_up.call_count == 2  # pages are rendered by file, standby jvm is never used
+
+    def test_standby_single_file_with_threads(self, plantuml_jar_file, uml_helloworld):
+        runner = CliRunner()
+        with runner.isolated_filesystem(), \
+                patch('plantumlcli.entry.cli.warm_up_local', side_effect=warm_up_local) as _warm_up, \
+                patch.object(LocalPlantuml, 'warm_up', autospec=True, side_effect=LocalPlantuml.warm_up) as _start:
+            result = runner.invoke(cli, ['-L', '--threads', '4', '-t', 'txt', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+            assert _warm_up.call_count == 1
+            _start.assert_called_once()
+            assert _start.call_args[0][2] == 1  # one standby jvm for the single file
+
+    def test_metrics(self, plantuml_jar_file, uml_helloworld, uml_common):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--metrics', '-t', 'txt',
+                                         os.path.abspath(uml_helloworld), os.path.abspath(uml_common)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.txt') > 0
+            assert os.path.getsize('common.txt') > 0
+            assert f'{os.path.abspath(uml_helloworld)}: wall ' in result.stdout
+            assert 'startup ' in result.stdout
+            assert 'generation ' in result.stdout
+
+            result = runner.invoke(cli, ['-R', '--metrics', os.path.abspath(uml_helloworld)])
+            assert result.exit_code == -5
+            assert 'Metrics are only supported by local plantuml' in result.output
+
+            result = runner.invoke(cli, ['-L', '--metrics', '--launcher', '{java} -jar {plantuml}',
+                                         os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == -5
+            assert 'Metrics are only supported by local plantuml' in result.output
+
+    def test_config(self, plantuml_jar_file, uml_helloworld, tmp_path):
+        _config = str(tmp_path / 'config.puml')
+        with open(_config, 'w') as f:
+            f.write('skinparam monochrome true\n')
+        _bad = str(tmp_path / 'bad.puml')
+        with open(_bad, 'w') as f:
+            f.write('@startuml\nBob->Alice\nthis ]] bad [[\n@enduml\n')
+
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--config', _config, '-t', 'svg', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.getsize('helloworld.svg') > 0
+
+            result = runner.invoke(cli, ['-L', '--config', _config, '--check-syntax', _bad],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == -4
+            assert f'{_bad}:3: Syntax Error?' in result.stdout
+
+            result = runner.invoke(cli, ['-L', '--config', str(tmp_path / 'not_exist.puml'),
+                                         os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code != 0
+
+    def test_all_pages(self, plantuml_jar_file, uml_helloworld, tmp_path):
+        _pages = str(tmp_path / 'pages.puml')
+        with open(_pages, 'w') as f:
+            f.write('@startuml\nA -> B\nnewpage\nB -> C\n@enduml\n\n@startuml named\nX -> Y\n@enduml\n')
+
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--all-pages', _pages, os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert sorted(os.listdir('.')) == ['helloworld.png', 'pages.png', 'pages_001.png', 'pages_002.png']
+
+            result = runner.invoke(cli, ['-L', '--all-pages', '-t', 'txt', '-o', 'output.txt', _pages],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.exists('output.txt')
+            assert os.path.exists('output_002.txt')
+
+            result = runner.invoke(cli, ['-L', '-t', 'txt', '-o', 'first.txt', _pages],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert os.path.exists('first.txt')
+            assert not os.path.exists('first_001.txt')
+
+    def test_check_syntax(self, plantuml_jar_file, uml_helloworld, uml_common, uml_invalid, tmp_path):
+        _bad = str(tmp_path / 'bad.puml')
+        with open(_bad, 'w') as f:
+            f.write('@startuml\nBob->Alice\nthis ]] bad [[\n@enduml\n')
+
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--check-syntax', uml_helloworld, uml_common],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == 0
+            assert f'{uml_helloworld}: ok' in result.stdout
+            assert f'{uml_common}: ok' in result.stdout
+            assert not os.listdir('.')  # nothing rendered
+
+            result = runner.invoke(cli, ['-L', '--check-syntax', '-n', '2', uml_helloworld, _bad, uml_invalid],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+            assert result.exit_code == -4
+            assert f'{uml_helloworld}: ok' in result.stdout
+            assert f'{_bad}:3: Syntax Error?' in result.stdout
+            assert f'{uml_invalid}: No diagram found.' in result.stdout
+            assert '2 file(s) with syntax error.' in result.output
+
     def test_homepage_url(self, uml_helloworld, uml_common, uml_chinese, uml_large):
         runner = CliRunner()
         result = runner.invoke(cli, args=['--homepage-url', uml_helloworld], env={'PLANTUML_HOST': ''})
@@ -423,6 +790,74 @@ class TestEntranceCli:
             assert not os.path.exists('new_file_2.eps')
             assert not os.path.exists('new_file_3.eps')
 
+    def test_file_dump_local(self, plantuml_jar_file, uml_helloworld, uml_chinese, uml_invalid):
+        runner = CliRunner()
+
+        with runner.isolated_filesystem():
+            os.makedirs('new/path', exist_ok=True)
+            result = runner.invoke(cli, ['-L', '-t', 'txt', '-n', '2', '-O', 'new/path',
+                                         os.path.abspath(uml_helloworld), os.path.abspath(uml_chinese),
+                                         os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+
+            assert result.exit_code == 0
+            assert os.path.exists('new/path/helloworld.txt')
+            self._size_check(self._TXT_SIZES, os.path.getsize('new/path/helloworld.txt'))
+            assert os.path.exists('new/path/chinese.txt')
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '-t', 'eps', '-o', 'new_file.eps', '-o', 'new_file_2.eps',
+                                         '-o', 'new_file_3.eps', os.path.abspath(uml_helloworld),
+                                         os.path.abspath(uml_invalid), os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+
+            assert result.exit_code != 0
+            assert os.path.exists('new_file.eps')
+            self._size_check(self._EPS_SIZES, os.path.getsize('new_file.eps'))
+            assert not os.path.exists('new_file_2.eps')
+            assert not os.path.exists('new_file_3.eps')
+
+        with runner.isolated_filesystem():
+            result = runner.invoke(cli, ['-L', '--no-pipe', '-t', 'txt', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+
+            assert result.exit_code == 0
+            self._size_check(self._TXT_SIZES, os.path.getsize('helloworld.txt'))
+
+    def test_file_dump_local_stream(self, plantuml_jar_file, uml_helloworld):
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            with patch('plantumlcli.models.local.execute_stream', side_effect=execute_stream) as _execute_stream:
+                result = runner.invoke(cli, ['-L', '--no-standby', '-t', 'svg', os.path.abspath(uml_helloworld)],
+                                       env={'PLANTUML_JAR': plantuml_jar_file})
+                assert _execute_stream.call_count == 1  # a single source is streamed to the output file
+
+            assert result.exit_code == 0
+            with open('helloworld.svg', 'rb') as f:
+                assert f.read().startswith(b'<')
+
+    def test_file_dump_local_batch(self, plantuml_jar_file, uml_helloworld):
+        runner = CliRunner()
+
+        with runner.isolated_filesystem():
+            for name in ['a', 'b']:
+                os.makedirs(name, exist_ok=True)
+                with open(os.path.join(name, 'same.puml'), 'w') as f:
+                    f.write(f'@startuml\n{name}1 -> {name}2\n@enduml\n@startuml\nX -> Y\n@enduml\n')
+
+            os.makedirs('out/sub', exist_ok=True)
+            result = runner.invoke(cli, ['-L', '-t', 'txt', '-n', '1', '-O', 'out', '-o', 'sub/first.txt',
+                                         '-o', 'second.txt', '-o', 'third.txt',
+                                         'a/same.puml', 'b/same.puml', os.path.abspath(uml_helloworld)],
+                                   env={'PLANTUML_JAR': plantuml_jar_file})
+
+            assert result.exit_code == 0
+            with open('out/sub/first.txt') as f:
+                assert 'a1' in f.read()
+            with open('out/second.txt') as f:
+                assert 'b1' in f.read()
+            self._size_check(self._TXT_SIZES, os.path.getsize('out/third.txt'))
+
     def test_auto_select_error(self, uml_helloworld):
         runner = CliRunner()
         result = runner.invoke(cli, args=['-T', uml_helloworld],
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import shutil
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+import pytest
+
+from plantumlcli.models.aioremote import AsyncRemotePlantuml, _has_aiohttp
+from plantumlcli.models.picoweb import LocalPicowebServer
+from plantumlcli.models.remote import RemotePlantuml
+from ..testings import StandInServer
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.unittest
+@skipUnless(_has_aiohttp(), 'Aiohttp required.')
+class TestModelsAioremote:
+    def test_init(self):
+        plantuml = AsyncRemotePlantuml('http://127.0.0.1:1/plantuml?x=1', concurrency=3)
+        assert plantuml.host == 'http://127.0.0.1:1/plantuml'
+        assert plantuml.concurrency == 3
+        assert repr(plantuml) == "<AsyncRemotePlantuml host: 'http://127.0.0.1:1/plantuml'>"
+
+        with pytest.raises(ValueError):
+            AsyncRemotePlantuml('')
+        with pytest.raises(ValueError):
+            AsyncRemotePlantuml('socks5://127.0.0.1:1/plantuml')
+        with pytest.raises(ValueError):
+            AsyncRemotePlantuml('http://127.0.0.1:1/plantuml', concurrency=0)
+
+    def test_get_url(self, uml_helloworld_code):
+        _host = 'http://127.0.0.1:1/plantuml'
+        plantuml = AsyncRemotePlantuml(_host)
+        for type_ in ['png', 'svg', 'txt']:
+            assert _run(plantuml.get_url(type_, uml_helloworld_code)) == \
+                   RemotePlantuml(_host).get_url(type_, uml_helloworld_code)
+
+    def test_check(self):
+        async def _check(host: str):
+            async with AsyncRemotePlantuml(host) as plantuml:
+                return await plantuml.test()
+
+        with StandInServer() as server:
+            assert _run(_check(server.url))
+        with StandInServer(version=b'<html>Not plantuml</html>') as server:
+            assert not _run(_check(server.url))
+
+    def test_dump_binary(self, uml_helloworld_code, tmp_path):
+        _path = str(tmp_path / 'helloworld.png')
+
+        async def _dump(host: str):
+            async with AsyncRemotePlantuml(host) as plantuml:
+                await plantuml.dump(_path, 'png', uml_helloworld_code)
+                return await plantuml.dump_binary('png', uml_helloworld_code), \
+                    await plantuml.get_url('png', uml_helloworld_code)
+
+        with StandInServer() as server:
+            _data, _url = _run(_dump(server.url))
+        assert _url.endswith(_data.decode())
+        with open(_path, 'rb') as f:
+            assert f.read() == _data
+
+    def test_dump_binary_batch(self):
+        _codes = [f'@startuml\nA -> B{i}\n@enduml' for i in range(40)]
+
+        async def _dump_batch(host: str):
+            async with AsyncRemotePlantuml(host, concurrency=8) as plantuml:
+                return [item async for item in plantuml.dump_binary_batch('png', _codes)], \
+                    [await plantuml.get_url('png', code) for code in _codes]
+
+        with StandInServer(delay=0.1) as server:
+            _start = time.time()
+            _results, _urls = _run(_dump_batch(server.url))
+            _duration = time.time() - _start
+            assert server.max_in_flight <= 8
+
+        assert [success for success, _ in _results] == [True] * 40
+        assert all(url.endswith(data.decode()) for (_, data), url in zip(_results, _urls))
+        assert _duration < 40 * 0.1 * 0.75  # requests are in flight concurrently
+
+    def test_retries(self, uml_helloworld_code):
+        async def _dump(host: str, retries: int):
+            async with AsyncRemotePlantuml(host, retries=retries) as plantuml:
+                return await plantuml.dump_binary('txt', uml_helloworld_code)
+
+        with StandInServer(failures=1) as server:
+            assert _run(_dump(server.url, 1))
+            assert len(server.paths) == 2
+
+        import aiohttp
+        with StandInServer(failures=1) as server:
+            with pytest.raises(aiohttp.ClientResponseError) as e:
+                _run(_dump(server.url, 0))
+            assert e.value.status == 503
+
+    def test_timeout(self, uml_helloworld_code):
+        async def _dump(host: str):
+            async with AsyncRemotePlantuml(host, retries=1, timeout=0.3) as plantuml:
+                return await plantuml.dump_binary('txt', uml_helloworld_code)
+
+        with StandInServer(delay=2.0) as server:
+            _start = time.time()
+            with pytest.raises(asyncio.TimeoutError):
+                _run(_dump(server.url))
+            assert time.time() - _start < 2.0
+            assert len(server.paths) == 2
+
+    def test_pdf_not_supported(self, uml_helloworld_code):
+        async def _dump(host: str):
+            async with AsyncRemotePlantuml(host) as plantuml:
+                return await plantuml.dump_binary('pdf', uml_helloworld_code)
+
+        _old_homepage = b'<html><body><div id="footer">PlantUML Version 1.2020.19</div></body></html>'
+        with patch('plantumlcli.models.aioremote._has_cairosvg', return_value=False):
+            with StandInServer(version=_old_homepage) as server:
+                with pytest.raises(ValueError):
+                    _run(_dump(server.url))
+            with StandInServer() as server:
+                assert _run(_dump(server.url)).startswith(b'/plantuml/pdf/')
+
+    def test_picoweb(self, plantuml_jar_file, uml_helloworld_code):
+        _codes = [uml_helloworld_code, '@startuml\nBob -> Alice\n@enduml', 'this ]] bad [[']
+
+        async def _dump_batch(host: str):
+            async with AsyncRemotePlantuml(host) as plantuml:
+                return [item async for item in plantuml.dump_binary_batch('txt', _codes)]
+
+        with LocalPicowebServer((shutil.which('java'), '-jar', plantuml_jar_file)) as picoweb:
+            picoweb.wait_ready()
+            _expected = list(RemotePlantuml(picoweb.url).dump_binary_batch('txt', _codes))
+            _results = _run(_dump_batch(picoweb.url))
+
+        assert _results == _expected
+        assert b'Syntax Error?' in _results[2][1]
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
@@ -6,7 +6,7 @@ import pytest
 from urlobject import URLObject
 
 from plantumlcli import LocalPlantuml, RemotePlantuml
-from plantumlcli.models.base import PlantumlType, PlantumlResourceType, try_plantuml
+from plantumlcli.models.base import PlantumlType, PlantumlResourceType, try_plantuml, page_path
 from plantumlcli.models.remote import OFFICIAL_PLANTUML_HOST
 
 
@@ -29,6 +29,11 @@ class TestModelsBaseEnums:
             PlantumlResourceType.SVG,
         }) == 4
 
+    def test_page_path(self):
+        assert page_path('name.png', 0) == 'name.png'
+        assert page_path('name.png', 1) == 'name_001.png'
+        assert page_path(os.path.join('output', 'name.png'), 12) == os.path.join('output', 'name_012.png')
+
     def test_plantuml_resource_type_load(self):
         assert PlantumlResourceType.load('txt') == PlantumlResourceType.TXT
         assert PlantumlResourceType.load('pNG') == PlantumlResourceType.PNG
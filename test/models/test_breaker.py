@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+from requests import ConnectionError
+
+from plantumlcli.models.breaker import CircuitBreaker, CircuitState, CircuitOpenError
+
+
+@pytest.mark.unittest
+class TestModelsBreaker:
+    def test_init(self):
+        breaker = CircuitBreaker()
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.available
+        assert issubclass(CircuitOpenError, ConnectionError)
+
+        with pytest.raises(ValueError):
+            CircuitBreaker(failures=0)
+
+    def test_open(self):
+        breaker = CircuitBreaker(failures=3, reset_time=10.0)
+        breaker.failure()
+        breaker.failure()
+        breaker.success()  # not in a row
+        breaker.failure()
+        breaker.failure()
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.acquire()
+
+        breaker.failure()
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.available
+        assert not breaker.acquire()
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(failures=1, reset_time=0.2)
+        breaker.failure()
+        assert not breaker.acquire()
+
+        time.sleep(0.2)
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.available
+        assert breaker.acquire()  # only one trial request
+        assert not breaker.available
+        assert not breaker.acquire()
+
+        breaker.failure()  # trial failed, opened again
+        assert breaker.state == CircuitState.OPEN
+        assert not breaker.acquire()
+
+        time.sleep(0.2)
+        assert breaker.acquire()
+        breaker.success()  # trial succeeded, closed
+        assert breaker.state == CircuitState.CLOSED
+        assert breaker.acquire() and breaker.acquire()
+
+    def test_release(self):
+        breaker = CircuitBreaker(failures=2, reset_time=0.2)
+        breaker.failure()
+        breaker.release()
+        breaker.failure()
+        assert breaker.state == CircuitState.OPEN  # released request is not counted as success
+
+        time.sleep(0.2)
+        assert breaker.acquire()
+        breaker.release()  # trial told nothing, another one is let through
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.acquire()
+
+    def test_lost_trial(self):
+        breaker = CircuitBreaker(failures=1, reset_time=0.2)
+        breaker.failure()
+        time.sleep(0.2)
+        assert breaker.acquire()
+        assert not breaker.acquire()
+        time.sleep(0.2)  # the trial is not reported in reset time
+        assert breaker.acquire()
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
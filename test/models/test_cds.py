@@ -0,0 +1,137 @@
+import os
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from plantumlcli import LocalPlantuml
+from plantumlcli.download.base import _save_verified_stamp
+from plantumlcli.models import cds, local
+from plantumlcli.models.cds import get_jar_sha256, get_cds_dir, build_cds_archive, get_cds_archive, cds_options
+from plantumlcli.utils import execute
+
+
+@pytest.fixture()
+def cds_dir(tmp_path):
+    _dir = str(tmp_path / 'cds')
+    with patch.object(cds, 'PLANTUML_CDS_DIR', _dir):
+        yield _dir
+
+
+@pytest.fixture()
+def jar_copy(tmp_path, plantuml_jar_file):
+    _filename = str(tmp_path / 'plantuml.jar')
+    shutil.copyfile(plantuml_jar_file, _filename)
+    return _filename
+
+
+@pytest.fixture()
+def bad_java(tmp_path):
+    _filename = str(tmp_path / 'java')
+    with open(_filename, 'w') as f:
+        f.write('#!/bin/sh\necho "Unrecognized VM option" >&2\nexit 1\n')
+    os.chmod(_filename, os.stat(_filename).st_mode | stat.S_IEXEC)
+    return _filename
+
+
+@pytest.mark.unittest
+class TestModelsCds:
+    def test_get_jar_sha256(self, cds_dir, jar_copy, plantuml_jar_file):
+        _sha256 = get_jar_sha256(jar_copy)
+        assert len(_sha256) == 64
+        assert get_jar_sha256(plantuml_jar_file) == _sha256
+        with patch.object(cds, '_get_file_sha256') as _hash:
+            assert get_jar_sha256(jar_copy) == _sha256
+            _hash.assert_not_called()
+
+        with open(jar_copy, 'ab') as f:
+            f.write(b'\x00')
+        assert get_jar_sha256(jar_copy) != _sha256
+
+    def test_get_jar_sha256_verified(self, cds_dir, jar_copy):
+        _save_verified_stamp(jar_copy, '0' * 64)
+        with patch.object(cds, '_get_file_sha256') as _hash:
+            assert get_jar_sha256(jar_copy) == '0' * 64  # taken from the stamp of download
+            _hash.assert_not_called()
+        assert not os.path.exists(os.path.join(cds_dir, 'hashes'))
+
+    def test_get_cds_dir(self, cds_dir, jar_copy, plantuml_jar_file):
+        java = shutil.which('java')
+        assert get_cds_dir(java, jar_copy).startswith(cds_dir)
+        assert os.path.dirname(get_cds_dir(java, jar_copy)) == os.path.dirname(get_cds_dir(java, plantuml_jar_file))
+        assert get_cds_dir(java, jar_copy) != get_cds_dir(java, plantuml_jar_file)
+
+    def test_not_hashed_without_archive(self, cds_dir, jar_copy):
+        java = shutil.which('java')
+        with patch.object(cds, '_get_file_sha256') as _hash:
+            assert get_cds_dir(java, jar_copy).startswith(cds_dir)
+            assert get_cds_archive(java, jar_copy) is None
+            _hash.assert_not_called()
+
+    def test_build(self, cds_dir, jar_copy, uml_helloworld_code):
+        java = shutil.which('java')
+        assert get_cds_archive(java, jar_copy) is None
+
+        archive = build_cds_archive(java, jar_copy)
+        assert archive is not None
+        assert os.path.exists(archive)
+        assert get_cds_archive(java, jar_copy) == archive
+
+        _stdout, _ = execute(java, *cds_options(archive), '-jar', jar_copy, '-ttxt', '-pipe',
+                             stdin=uml_helloworld_code.encode())
+        assert 'Bob' in _stdout
+        assert 'warning' not in _stdout
+
+        plantuml = LocalPlantuml(java, jar_copy)
+        assert plantuml.cds_archive == archive
+        assert 'Alice' in plantuml.dump_txt(uml_helloworld_code)
+        assert LocalPlantuml(java, jar_copy, use_cds=False).cds_archive is None
+
+    def test_stale(self, cds_dir, jar_copy):
+        java = shutil.which('java')
+        archive = build_cds_archive(java, jar_copy)
+        with open(jar_copy, 'ab') as f:
+            f.write(b'\x00')
+        with patch.object(cds, 'build_cds_archive', return_value=archive) as _build:
+            assert get_cds_archive(java, jar_copy) == archive
+            _build.assert_called_once_with(java, jar_copy)
+
+    def test_touched(self, cds_dir, jar_copy):
+        java = shutil.which('java')
+        archive = build_cds_archive(java, jar_copy)
+        os.utime(jar_copy, ns=(0, 0))
+        with patch.object(cds, 'build_cds_archive') as _build:
+            assert get_cds_archive(java, jar_copy) == archive  # same content, archive is kept
+            _build.assert_not_called()
+        with patch.object(cds, '_get_file_sha256') as _hash:
+            assert get_cds_archive(java, jar_copy) == archive  # stamp is refreshed, not hashed again
+            _hash.assert_not_called()
+
+    def test_not_supported(self, cds_dir, jar_copy, bad_java):
+        assert build_cds_archive(bad_java, jar_copy) is None
+        with patch.object(cds, 'build_cds_archive') as _build:
+            assert get_cds_archive(bad_java, jar_copy) is None
+            _build.assert_not_called()
+        assert LocalPlantuml(bad_java, jar_copy).cds_archive is None
+
+    def test_loaded_once_by_threads(self, cds_dir, jar_copy):
+        java = shutil.which('java')
+        plantuml = LocalPlantuml(java, jar_copy)
+        _barrier = threading.Barrier(8)
+
+        def _get_archive(*args):
+            time.sleep(0.2)
+            return None
+
+        def _load():
+            _barrier.wait()
+            return plantuml.cds_archive
+
+        with patch.object(local, 'get_cds_archive', side_effect=_get_archive) as _get:
+            with ThreadPoolExecutor(8) as executor:
+                assert list(executor.map(lambda _: _load(), range(8))) == [None] * 8
+            _get.assert_called_once_with(java, jar_copy)
@@ -0,0 +1,164 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Barrier
+from unittest.mock import MagicMock
+
+import pytest
+
+from plantumlcli.models.hedge import RequestHedging
+from plantumlcli.models.remote import RemotePlantuml
+from ..testings import StandInServer
+
+
+def _primed(percentile: float = 50, budget: float = 1.0, latency: float = 0.05) -> RequestHedging:
+    hedging = RequestHedging(percentile, budget)
+    for _ in range(20):
+        hedging.record(latency)
+    return hedging
+
+
+def _calls(*delays: float):
+    # the n-th call sleeps for delays[n] and returns n
+    _lock, _count = Lock(), [0]
+
+    def _func():
+        with _lock:
+            _index = _count[0]
+            _count[0] += 1
+        time.sleep(delays[_index])
+        return _index
+
+    return _func, _count
+
+
+@pytest.mark.unittest
+class TestModelsHedge:
+    def test_init(self):
+        hedging = RequestHedging(95)
+        assert hedging.percentile == 95
+        assert hedging.budget == 0.05
+        assert (hedging.requests, hedging.hedged) == (0, 0)
+
+        with pytest.raises(ValueError):
+            RequestHedging(0)
+        with pytest.raises(ValueError):
+            RequestHedging(100)
+        with pytest.raises(ValueError):
+            RequestHedging(95, -0.1)
+        with pytest.raises(ValueError):
+            RequestHedging(95, 1.5)
+
+    def test_delay(self):
+        hedging = RequestHedging(90, min_samples=5)
+        for latency in [0.5, 0.1, 0.3, 0.2]:
+            hedging.record(latency)
+        assert hedging.delay() is None
+        hedging.record(0.4)
+        assert hedging.delay() == 0.5
+        for latency in [0.6, 0.7, 0.8, 0.9, 1.0]:
+            hedging.record(latency)
+        assert hedging.delay() == 0.9
+
+        hedging = RequestHedging(50, window=4, min_samples=1)
+        for latency in [9.0, 9.0, 0.1, 0.2, 0.3, 0.4]:
+            hedging.record(latency)
+        assert hedging.delay() == 0.2
+
+    def test_call(self):
+        hedging = RequestHedging(50, 1.0)
+        _func, _count = _calls(0.2)
+        assert hedging.call(_func) == 0  # not hedged before the latencies are known
+        assert (_count[0], hedging.requests, hedging.hedged) == (1, 1, 0)
+
+        hedging = _primed()
+        _func, _count = _calls(0.0)
+        assert hedging.call(_func) == 0  # fast, not hedged
+        assert (_count[0], hedging.hedged) == (1, 0)
+
+        _func, _count = _calls(1.0, 0.0)
+        _start = time.time()
+        assert hedging.call(_func) == 1  # the duplicated one is faster
+        assert time.time() - _start < 0.5
+        assert (_count[0], hedging.requests, hedging.hedged) == (2, 2, 1)
+
+    def test_not_capped(self):
+        hedging = _primed(latency=10.0)
+        _barrier = Barrier(100, timeout=10.0)  # broken unless all the requests are in flight together
+
+        def _func():
+            _barrier.wait()
+            return 0
+
+        with ThreadPoolExecutor(100) as pool:
+            assert list(pool.map(lambda _: hedging.call(_func), range(100))) == [0] * 100
+        assert (hedging.requests, hedging.hedged) == (100, 0)
+
+    def test_budget(self):
+        hedging = _primed(budget=0.0)
+        _func, _count = _calls(0.3, 0.0)
+        assert hedging.call(_func) == 0
+        assert (_count[0], hedging.hedged) == (1, 0)
+
+        hedging = _primed(budget=0.5)
+        for _ in range(4):
+            hedging.call(_calls(0.2, 0.0)[0])
+        assert (hedging.requests, hedging.hedged) == (4, 2)
+
+    def test_errors(self):
+        hedging = _primed()
+
+        def _fail_first():
+            if not _failed:
+                _failed.append(True)
+                time.sleep(0.2)
+                raise ValueError('first failed')
+            return 'second'
+
+        _failed = []
+        assert hedging.call(_fail_first) == 'second'
+
+        def _fail():
+            time.sleep(0.2)
+            raise ValueError('failed')
+
+        with pytest.raises(ValueError):
+            hedging.call(_fail)
+
+    def test_slower_closed(self):
+        hedging = _primed()
+        _responses = [MagicMock(), MagicMock()]
+        _delays = iter([0.5, 0.0])
+
+        def _func():
+            _delay = next(_delays)
+            time.sleep(_delay)
+            return _responses[0 if _delay else 1]
+
+        assert hedging.call(_func) is _responses[1]
+        time.sleep(0.8)
+        _responses[0].close.assert_called_once()
+        _responses[1].close.assert_not_called()
+
+    def test_remote(self, uml_helloworld_code):
+        with StandInServer(delays=[1.0]) as server:
+            plantuml = RemotePlantuml(server.url, hedge=50, hedge_budget=1.0)
+            for _ in range(20):
+                plantuml.hedging.record(0.05)
+            _start = time.time()
+            assert plantuml.dump_binary('txt', uml_helloworld_code).startswith(b'/plantuml/txt/')
+            assert time.time() - _start < 0.8
+            assert plantuml.hedging.hedged == 1
+            assert len([path for path in server.paths if path.startswith('/plantuml/txt/')]) == 2
+            plantuml.close()
+
+        with StandInServer(delays=[1.0]) as server:
+            plantuml = RemotePlantuml(server.url)
+            assert plantuml.hedging is None
+            _start = time.time()
+            assert plantuml.dump_binary('txt', uml_helloworld_code).startswith(b'/plantuml/txt/')
+            assert time.time() - _start >= 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
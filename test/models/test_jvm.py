@@ -0,0 +1,95 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from plantumlcli import LocalPlantuml
+from plantumlcli.models import jvm
+from plantumlcli.models.jvm import JVM_OPTION_PROFILES, measure_jvm_options, tune_jvm_options, \
+    get_tuned_jvm_options
+from plantumlcli.utils import execute
+
+_PROFILES = {'default': (), 'serial': ('-XX:+UseSerialGC',), 'bogus': ('-XX:+NoSuchOptionOfJvm',)}
+_CODES = ['@startuml\nAlice -> Bob\n@enduml']
+
+
+@pytest.fixture()
+def jvm_dir(tmp_path):
+    _dir = str(tmp_path / 'jvm')
+    with patch.object(jvm, 'PLANTUML_JVM_DIR', _dir):
+        yield _dir
+
+
+@pytest.fixture()
+def jar_copy(tmp_path, plantuml_jar_file):
+    _filename = str(tmp_path / 'plantuml.jar')
+    shutil.copyfile(plantuml_jar_file, _filename)
+    return _filename
+
+
+@pytest.mark.unittest
+class TestModelsJvm:
+    def test_profiles(self):
+        assert JVM_OPTION_PROFILES['default'] == ()
+        assert all(all(option.startswith('-') for option in options) for options in JVM_OPTION_PROFILES.values())
+        # heap and stack are not sized by the profiles, so the memory budget of max_heap holds
+        assert not any(option.startswith(('-Xmx', '-Xms', '-Xss'))
+                       for options in JVM_OPTION_PROFILES.values() for option in options)
+
+    def test_measure_jvm_options(self, jvm_dir, plantuml_jar_file):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        with patch('plantumlcli.models.jvm.execute', side_effect=execute) as _execute:
+            assert measure_jvm_options(plantuml._command_line, _CODES * 2, ('-XX:+UseSerialGC',)) > 0
+            assert _execute.call_count == 2
+            assert '-XX:+UseSerialGC' in _execute.call_args[0]
+        assert measure_jvm_options(plantuml._command_line, _CODES, ('-XX:+NoSuchOptionOfJvm',)) is None
+
+    def test_tune_jvm_options(self, jvm_dir, jar_copy):
+        plantuml = LocalPlantuml.autoload(plantuml=jar_copy)
+        assert get_tuned_jvm_options(plantuml.java, jar_copy) is None
+        assert plantuml.jvm_options == ()
+
+        _options = tune_jvm_options(plantuml.java, jar_copy, plantuml._command_line, codes=_CODES, profiles=_PROFILES)
+        assert _options in (_PROFILES['default'], _PROFILES['serial'])
+        assert get_tuned_jvm_options(plantuml.java, jar_copy) == _options
+        assert LocalPlantuml.autoload(plantuml=jar_copy).jvm_options == _options
+        assert LocalPlantuml.autoload(plantuml=jar_copy, jvm_options=['-Xss1m']).jvm_options == ('-Xss1m',)
+        assert LocalPlantuml.autoload(plantuml=jar_copy, jvm_options=[]).jvm_options == ()
+
+        with pytest.raises(ValueError):
+            tune_jvm_options(plantuml.java, jar_copy, plantuml._command_line, codes=_CODES,
+                             profiles={'bogus': _PROFILES['bogus']})
+
+        with open(jar_copy, 'ab') as f:  # jar changed, tuning is stale
+            f.write(b'\0')
+        assert get_tuned_jvm_options(plantuml.java, jar_copy) is None
+
+    def test_tune_jvm_options_broken_diagram(self, jvm_dir, jar_copy):
+        plantuml = LocalPlantuml.autoload(plantuml=jar_copy)
+        _codes = [*_CODES, '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml']
+        assert measure_jvm_options(plantuml._command_line, _codes, ()) > 0  # error image is still measured
+        _options = tune_jvm_options(plantuml.java, jar_copy, plantuml._command_line, codes=_codes, profiles=_PROFILES)
+        assert _options in (_PROFILES['default'], _PROFILES['serial'])
+
+    def test_local(self, jvm_dir, jar_copy, uml_helloworld_code):
+        plantuml = LocalPlantuml.autoload(plantuml=jar_copy, max_heap='256m', use_cds=False)
+        assert plantuml.tune_jvm_options(_CODES, {'serial': _PROFILES['serial']}) == ('-XX:+UseSerialGC',)
+        assert plantuml.jvm_options == ('-XX:+UseSerialGC',)
+        assert plantuml._command_line('-version')[:4] == (plantuml.java, '-XX:+UseSerialGC', '-Xmx256m', '-jar')
+        with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+            assert 'Alice' in plantuml.dump_txt(uml_helloworld_code)
+            assert '-XX:+UseSerialGC' in _execute.call_args[0]
+
+        plantuml = LocalPlantuml.autoload(plantuml=jar_copy, jvm_options=['-XX:TieredStopAtLevel=1'], use_cds=False)
+        assert plantuml._command_line('-version')[:3] == (plantuml.java, '-XX:TieredStopAtLevel=1', '-jar')
+        assert 'Alice' in plantuml.dump_txt(uml_helloworld_code)
+
+        native = LocalPlantuml(None, None, launcher=shutil.which('java'))
+        assert native.jvm_options == ()
+        with pytest.raises(ValueError):
+            native.tune_jvm_options()
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
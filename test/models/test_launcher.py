@@ -0,0 +1,51 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from plantumlcli.models.launcher import find_launcher_from_env, find_launcher, launcher_command, \
+    launcher_uses_java, launcher_uses_plantuml, check_launcher
+
+
+@pytest.mark.unittest
+class TestModelsLauncher:
+    def test_find_launcher(self):
+        with patch.dict(os.environ, {'PLANTUML_LAUNCHER': '/opt/plantuml-native'}):
+            assert find_launcher_from_env() == '/opt/plantuml-native'
+            assert find_launcher() == '/opt/plantuml-native'
+            assert find_launcher('/usr/bin/wrapper') == '/usr/bin/wrapper'
+        with patch.dict(os.environ, {'PLANTUML_LAUNCHER': ''}):
+            assert find_launcher_from_env() is None
+            assert find_launcher() is None
+
+    def test_launcher_command(self):
+        assert launcher_command('{java} -Xshare:off -jar {plantuml}', '/usr/bin/java', '/opt/plantuml.jar') == \
+               ('/usr/bin/java', '-Xshare:off', '-jar', '/opt/plantuml.jar')
+        assert launcher_command('"/opt/plantuml native/plantuml" --headless') == \
+               ('/opt/plantuml native/plantuml', '--headless')
+        assert launcher_command('wrapper --jar={plantuml}', plantuml='/my path/plantuml.jar') == \
+               ('wrapper', '--jar=/my path/plantuml.jar')
+
+        assert launcher_uses_java('{java} -jar {plantuml}')
+        assert launcher_uses_plantuml('{java} -jar {plantuml}')
+        assert not launcher_uses_java('/opt/plantuml-native')
+        assert not launcher_uses_plantuml('/opt/plantuml-native')
+
+    def test_check_launcher(self, tmp_path):
+        check_launcher((shutil.which('java'), '-jar'))
+        check_launcher(('sh', '-c'))
+        with pytest.raises(ValueError):
+            check_launcher(())
+        with pytest.raises(FileNotFoundError):
+            check_launcher((str(tmp_path / 'not_exist'),))
+
+        _filename = str(tmp_path / 'not_executable')
+        with open(_filename, 'w') as f:
+            f.write('#!/bin/sh\n')
+        with pytest.raises(PermissionError):
+            check_launcher((_filename,))
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
@@ -0,0 +1,129 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+from plantumlcli import LocalPlantuml
+from plantumlcli.models.layout import PlantumlLayout, diagram_type, is_smetana_equivalent, layout_args, \
+    apply_layout, SMETANA_PRAGMA
+from ..testings import get_testfile
+
+_CLASS_CODE = '@startuml\nclass A\nclass B\nA <|-- B\n@enduml'
+_SEQUENCE_CODE = '@startuml\nBob -> Alice : hello\n@enduml'
+_SAMPLE_CODES = {
+    'class': _CLASS_CODE,
+    'object': '@startuml\nobject user\nobject group\nuser --> group\n@enduml',
+    'usecase': '@startuml\nactor User\n(Login)\nUser --> (Login)\n@enduml',
+    'component': '@startuml\n[Web] --> [Database]\n@enduml',
+    'deployment': '@startuml\nnode server\ndatabase db\nserver --> db\n@enduml',
+    'state': '@startuml\n[*] --> Idle\nIdle --> Running\nRunning --> [*]\n@enduml',
+    'activity': '@startuml\nstart\n:Hello;\nstop\n@enduml',
+    'activity_legacy': '@startuml\n(*) --> "Hello"\n"Hello" --> (*)\n@enduml',
+    'sequence': '@startuml\nparticipant Bob\ndatabase Db\nBob -> Db : query\n@enduml',
+    'mindmap': '@startmindmap\n* root\n** child\n@endmindmap',
+}
+
+
+@pytest.mark.unittest
+class TestModelsLayout:
+    def test_load(self):
+        assert PlantumlLayout.load(PlantumlLayout.AUTO) == PlantumlLayout.AUTO
+        assert PlantumlLayout.load('smetana') == PlantumlLayout.SMETANA
+        assert PlantumlLayout.load(1) == PlantumlLayout.DOT
+        with pytest.raises(ValueError):
+            PlantumlLayout.load(100)
+        with pytest.raises(KeyError):
+            PlantumlLayout.load('elk')
+        with pytest.raises(TypeError):
+            PlantumlLayout.load(None)
+
+    def test_diagram_type(self):
+        for type_, code in _SAMPLE_CODES.items():
+            assert diagram_type(code) == type_, code
+        assert diagram_type(_SEQUENCE_CODE) == 'sequence'
+        assert diagram_type('Bob -> Alice') == 'sequence'
+        assert diagram_type("@startuml\n' class A\nBob -> Alice\n@enduml") == 'sequence'
+        assert diagram_type(Path(get_testfile('umls', 'common.puml')).read_text()) == 'state'
+
+    def test_is_smetana_equivalent(self):
+        assert is_smetana_equivalent(_CLASS_CODE)
+        assert not is_smetana_equivalent(_SEQUENCE_CODE)
+        assert not is_smetana_equivalent(_SAMPLE_CODES['activity_legacy'])
+        assert not is_smetana_equivalent('@startuml\nskinparam linetype ortho\nclass A\n@enduml')
+
+    def test_layout_args(self):
+        assert layout_args(PlantumlLayout.DOT) == ()
+        assert layout_args(PlantumlLayout.SMETANA) == ('-Playout=smetana',)
+        assert layout_args(PlantumlLayout.AUTO) == ()
+
+    def test_apply_layout(self):
+        assert apply_layout(_CLASS_CODE, PlantumlLayout.DOT) == _CLASS_CODE
+        assert apply_layout(_CLASS_CODE, PlantumlLayout.AUTO) == \
+               '@startuml\nclass A\nclass B\nA <|-- B\n!pragma layout smetana\n@enduml'
+        assert apply_layout(_CLASS_CODE + '\n', PlantumlLayout.AUTO).endswith('@enduml\n')
+        assert apply_layout(_SEQUENCE_CODE, PlantumlLayout.AUTO) == _SEQUENCE_CODE
+        assert SMETANA_PRAGMA in apply_layout(_SEQUENCE_CODE, PlantumlLayout.SMETANA)
+
+        _code = '@startuml\n!pragma layout elk\nclass A\n@enduml'
+        assert apply_layout(_code, PlantumlLayout.AUTO) == _code
+        assert apply_layout(apply_layout(_CLASS_CODE, PlantumlLayout.AUTO), PlantumlLayout.AUTO).count(
+            SMETANA_PRAGMA) == 1
+
+        _multiple = apply_layout(f'{_SEQUENCE_CODE}\n{_CLASS_CODE}', PlantumlLayout.AUTO).splitlines()
+        assert _multiple.index(SMETANA_PRAGMA) == len(_multiple) - 2
+        assert _multiple.count(SMETANA_PRAGMA) == 1
+
+
+def _has_dot() -> bool:
+    return bool(os.environ.get('GRAPHVIZ_DOT') or shutil.which('dot'))
+
+
+_BENCHMARK_CODES = {
+    **_SAMPLE_CODES,
+    'common.puml': Path(get_testfile('umls', 'common.puml')).read_text(),
+    'large.puml': Path(get_testfile('umls', 'large.puml')).read_text(),
+}
+
+
+@pytest.fixture(scope='module')
+def layout_plantumls(plantuml_jar_file):
+    return {
+        layout: LocalPlantuml.autoload(plantuml=plantuml_jar_file, layout=layout)
+        for layout in PlantumlLayout.__members__.values()
+    }
+
+
+@pytest.mark.benchmark
+class TestModelsLayoutBenchmark:
+    _ROUNDS = 5
+    _NOISE = 1.25  # costs within this ratio are not told apart
+
+    def _cost(self, plantuml: LocalPlantuml, code: str) -> float:
+        plantuml.dump_binary('svg', code)  # warm up
+        _costs = []
+        for _ in range(self._ROUNDS):
+            _start = time.time()
+            plantuml.dump_binary('svg', code)
+            _costs.append(time.time() - _start)
+        return min(_costs)
+
+    @pytest.mark.skipif(not _has_dot(), reason='Graphviz dot not installed.')
+    @pytest.mark.parametrize('name', list(_BENCHMARK_CODES))
+    def test_latency(self, benchmark, layout_plantumls, name):
+        _code = _BENCHMARK_CODES[name]
+        _costs = {layout: self._cost(plantuml, _code) for layout, plantuml in layout_plantumls.items()}
+        # the cost of each engine is reported together with the benchmark of auto layout
+        benchmark.extra_info.update({'type': diagram_type(_code), **{
+            f'{layout.name.lower()}_cost': cost for layout, cost in _costs.items()
+        }})
+        benchmark.pedantic(layout_plantumls[PlantumlLayout.AUTO].dump_binary, args=('svg', _code),
+                           rounds=self._ROUNDS, warmup_rounds=1)
+
+        if is_smetana_equivalent(_code):
+            _picked = PlantumlLayout.SMETANA
+            assert _costs[PlantumlLayout.SMETANA] < _costs[PlantumlLayout.DOT], _costs  # no dot process forked
+        else:
+            _picked = PlantumlLayout.DOT
+        assert _costs[PlantumlLayout.AUTO] < _costs[_picked] * self._NOISE, _costs
@@ -1,5 +1,7 @@
 import os
 import shutil
+import time
+from pathlib import Path
 from tempfile import NamedTemporaryFile
 from typing import List
 from unittest import skipUnless
@@ -8,8 +10,11 @@ from unittest.mock import patch
 import pytest
 
 from plantumlcli import LocalPlantuml
-from plantumlcli.models.local import LocalPlantumlExecuteError, find_java_from_env, find_java, find_plantuml_from_env, \
-    find_plantuml
+from plantumlcli.utils import execute, execute_stream
+from plantumlcli.models.local import LocalPlantumlExecuteError, LocalPlantumlTimeoutError, find_java_from_env, \
+    find_java, find_plantuml_from_env, find_plantuml, _parse_files_messages, _map_output_files, _read_jar_version, \
+    _is_multi_page, _anonymize_starts
+from plantumlcli.models.layout import PlantumlLayout
 from .conftest import _has_cairosvg
 from ..testings import get_testfile
 
@@ -29,6 +34,33 @@ def invalid_jar_file():
     return get_testfile('jars', 'helloworld.jar')
 
 
+@pytest.fixture()
+def slow_java(tmp_path):
+    _filename = str(tmp_path / 'java')
+    with open(_filename, 'w') as f:
+        f.write('#!/bin/sh\nsleep 30\n')
+    os.chmod(_filename, 0o755)
+    return _filename
+
+
+@pytest.fixture()
+def hanging_java(tmp_path):
+    # renders each input file as 'ok', but hangs when any of them contains 'hang'
+    _filename = str(tmp_path / 'java')
+    with open(_filename, 'w') as f:
+        f.write('#!/bin/sh\n'
+                'out=\n'
+                'while [ $# -gt 0 ]; do\n'
+                '  case "$1" in\n'
+                '    -o) out="$2"; shift ;;\n'
+                '    *.puml) if grep -q hang "$1"; then sleep 30; fi; echo ok > "$out/$(basename "$1" .puml).txt" ;;\n'
+                '  esac\n'
+                '  shift\n'
+                'done\n')
+    os.chmod(_filename, 0o755)
+    return _filename
+
+
 @pytest.mark.unittest
 class TestModelsLocal:
     @pytest.fixture()
@@ -54,6 +86,14 @@ class TestModelsLocal:
         assert plantuml_jar_version in plantuml.version
         assert 'plantuml' in plantuml.version.lower()
 
+    def test_version_from_jar(self, plantuml_jar_file, java_file, plantuml):
+        _stdout, _ = execute(java_file, '-jar', plantuml_jar_file, '-version')
+        assert _stdout.startswith(plantuml.version + ' ')
+
+        with patch('plantumlcli.models.local.execute') as _execute:
+            _ = plantuml.version
+            _execute.assert_not_called()
+
     def test_version_broken(self, plantuml_jar_file, java_file, broken_jar_file):
         plantuml = LocalPlantuml(java=java_file, plantuml=broken_jar_file)
         with pytest.raises(LocalPlantumlExecuteError) as e:
@@ -74,6 +114,11 @@ class TestModelsLocal:
     def test_plantuml(self, plantuml_jar_file, plantuml):
         assert plantuml.plantuml == plantuml_jar_file
 
+    def test_plantuml_version(self, plantuml_jar_version, plantuml_jar_file, invalid_jar_file):
+        assert LocalPlantuml.autoload(version=plantuml_jar_version).plantuml == plantuml_jar_file
+        assert LocalPlantuml.autoload(plantuml=invalid_jar_file, version=plantuml_jar_version).plantuml == \
+               invalid_jar_file
+
     def test_repr(self, plantuml_jar_file, plantuml):
         assert repr(plantuml) == \
                f'<LocalPlantuml java: {shutil.which("java")!r}, plantuml: {plantuml_jar_file!r}>'
@@ -160,9 +205,369 @@ class TestModelsLocal:
             assert os.path.exists(file.name)
             self._size_check(self._PDF_SIZES, os.path.getsize(file.name))
 
+    def test_pool(self, plantuml_jar_file, uml_helloworld_code):
+        with LocalPlantuml.autoload(plantuml=plantuml_jar_file, pool_size=2, pool_max_jobs=3) as plantuml:
+            assert plantuml.pool is not None
+            assert plantuml.pool.size == 2
+            assert plantuml.pool.max_jobs == 3
+
+            for _ in range(4):
+                self._size_check(self._TXT_SIZES, len(plantuml.dump_txt(uml_helloworld_code)))
+            self._size_check(self._PNG_SIZES, len(plantuml.dump_binary('png', uml_helloworld_code)))
+            with NamedTemporaryFile() as file:
+                plantuml.dump(file.name, 'svg', uml_helloworld_code)
+                self._size_check(self._SVG_SIZES, os.path.getsize(file.name))
+
+            with pytest.raises(LocalPlantumlExecuteError) as e:
+                plantuml.dump_txt('@startuml\nBob->Alice\nthis ]] bad [[\n@enduml')
+            assert e.value.exitcode == 200
+
+            # not pipe safe, fallback to standalone process
+            with pytest.raises((LocalPlantumlExecuteError, FileNotFoundError)):
+                plantuml.dump_txt('Bob->Alice')
+
+    def test_warm_up(self, plantuml_jar_file, uml_helloworld_code, slow_java):
+        with LocalPlantuml.autoload(plantuml=plantuml_jar_file) as plantuml:
+            assert plantuml.standby == 0
+            assert plantuml.warm_up('txt', 2) == 2
+            assert plantuml.standby == 2
+            _expected = LocalPlantuml.autoload(plantuml=plantuml_jar_file).dump_txt(uml_helloworld_code)
+            with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+                assert plantuml.dump_txt(uml_helloworld_code) == _expected
+                assert plantuml.standby == 1
+                _results = list(plantuml.dump_binary_batch('txt', [uml_helloworld_code] * 2))
+                assert [success for success, _ in _results] == [True, True]
+                assert plantuml.standby == 0
+                assert _execute.call_count == 0
+
+            assert plantuml.warm_up('png') == 1
+            with pytest.raises(LocalPlantumlExecuteError):
+                plantuml.dump_binary('png', '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml')
+            assert plantuml.warm_up('svg', 0) == 0
+            assert plantuml.warm_up('svg') == 1
+        assert plantuml.standby == 0
+
+        assert LocalPlantuml.autoload(plantuml=plantuml_jar_file, use_pipe=False).warm_up('txt') == 0
+        with LocalPlantuml.autoload(plantuml=plantuml_jar_file, pool_size=1) as pooled:
+            assert pooled.warm_up('txt', 2) == 1
+            assert pooled.standby == 0
+            assert 'Alice' in pooled.dump_txt(uml_helloworld_code)
+
+        with LocalPlantuml(slow_java, plantuml_jar_file, timeout=0.5) as slow:
+            assert slow.warm_up('txt') == 1
+            with pytest.raises(LocalPlantumlTimeoutError):
+                slow.dump_txt(uml_helloworld_code)
+            assert slow.standby == 0
+
+    def test_dump_stream(self, plantuml_jar_file, uml_helloworld_code, slow_java, tmp_path):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        output_dir = tmp_path / 'output'
+        output_dir.mkdir()
+        _filename = str(output_dir / 'helloworld.svg')
+        with patch('plantumlcli.models.local.execute_stream', side_effect=execute_stream) as _execute_stream:
+            plantuml.dump(_filename, 'svg', uml_helloworld_code)
+            assert _execute_stream.call_count == 1
+        assert Path(_filename).read_bytes() == plantuml.dump_binary('svg', uml_helloworld_code)
+        _umask = os.umask(0)
+        os.umask(_umask)
+        assert os.stat(_filename).st_mode & 0o777 == 0o666 & ~_umask  # not the 0600 of temporary file
+
+        _filename = str(output_dir / 'invalid.png')
+        with pytest.raises(LocalPlantumlExecuteError) as e:
+            plantuml.dump(_filename, 'png', '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml')
+        assert e.value.exitcode == 200
+        assert 'line 3' in e.value.stderr
+        assert os.listdir(str(output_dir)) == ['helloworld.svg']
+
+        _filename = str(output_dir / 'no_pipe.txt')
+        no_pipe = LocalPlantuml.autoload(plantuml=plantuml_jar_file, use_pipe=False)
+        with patch('plantumlcli.models.local.execute_stream', side_effect=execute_stream) as _execute_stream:
+            no_pipe.dump(_filename, 'txt', uml_helloworld_code)
+            assert _execute_stream.call_count == 0
+        assert Path(_filename).read_text() == plantuml.dump_txt(uml_helloworld_code)
+
+        with pytest.raises(LocalPlantumlTimeoutError):
+            LocalPlantuml(slow_java, plantuml_jar_file, timeout=0.5).dump(str(output_dir / 'slow.txt'), 'txt',
+                                                                          uml_helloworld_code)
+        assert sorted(os.listdir(str(output_dir))) == ['helloworld.svg', 'no_pipe.txt']
+
+    def test_dump_pages(self, plantuml, tmp_path):
+        _code = '@startuml\nA -> B\nnewpage\nB -> C\n@enduml\n\n' \
+                '@startuml named\nX -> Y\n@enduml\n@startuml\nZ -> W\n@enduml\n'
+        _pages = plantuml.dump_binary_pages('txt', _code)
+        assert len(_pages) == 4
+        assert [[name for name in 'ABCXYZW' if f'|{name}|' in page.decode()] for page in _pages] == \
+               [['A', 'B', 'C'], ['A', 'B', 'C'], ['X', 'Y'], ['Z', 'W']]
+        assert plantuml.dump_binary_pages('png', _code)[2].startswith(b'\x89PNG')
+        assert plantuml.dump_binary_pages('txt', '@startuml\nA -> B\n@enduml') == \
+               [plantuml.dump_binary('txt', '@startuml\nA -> B\n@enduml')]
+
+        _paths = plantuml.dump_pages(str(tmp_path / 'pages.png'), 'png', _code)
+        assert [os.path.basename(path) for path in _paths] == \
+               ['pages.png', 'pages_001.png', 'pages_002.png', 'pages_003.png']
+        assert sorted(os.listdir(str(tmp_path))) == ['pages.png', 'pages_001.png', 'pages_002.png', 'pages_003.png']
+
+        with pytest.raises(LocalPlantumlExecuteError):
+            plantuml.dump_binary_pages('png', '@startuml\nA -> B\n@enduml\n@startuml\nthis ]] bad [[\n@enduml')
+
+    def test_launcher(self, plantuml_jar_file, uml_helloworld_code, plantuml, tmp_path):
+        _wrapper = str(tmp_path / 'wrapper')
+        with open(_wrapper, 'w') as f:
+            f.write(f'#!/bin/sh\nexec {shutil.which("java")} -jar {plantuml_jar_file} "$@"\n')
+        os.chmod(_wrapper, 0o755)
+
+        native = LocalPlantuml(None, None, launcher=_wrapper)
+        assert native.launcher == _wrapper
+        assert native.launch_command == (_wrapper,)
+        assert repr(native) == f'<LocalPlantuml java: None, launcher: {_wrapper!r}, plantuml: None>'
+        assert native.version == plantuml.version
+        assert native.cds_archive is None
+        assert native.build_cds() is None
+        assert native.threads == 1
+        with pytest.raises(ValueError):
+            native.tune_threads()
+        _expected = plantuml.dump_txt(uml_helloworld_code)
+        with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+            assert native.dump_txt(uml_helloworld_code) == _expected
+            assert _execute.call_args[0][0] == _wrapper
+        assert native.dump_binary('png', uml_helloworld_code).startswith(b'\x89PNG')
+        with pytest.raises(ValueError):  # java preferences of the user can not be kept untouched
+            native.dump_binary_with_metrics('txt', uml_helloworld_code)
+
+        with patch.dict(os.environ, {'PLANTUML_LAUNCHER': '{java} -Xshare:off -jar {plantuml}'}):
+            templated = LocalPlantuml.autoload(plantuml=plantuml_jar_file, max_heap='256m')
+        assert templated.launch_command == (shutil.which('java'), '-Xshare:off', '-jar', plantuml_jar_file)
+        assert templated.dump_txt(uml_helloworld_code) == plantuml.dump_txt(uml_helloworld_code)
+        assert plantuml.launcher is None
+        assert plantuml.launch_command[-2:] == ('-jar', plantuml_jar_file)
+
+        with pytest.raises(FileNotFoundError):
+            LocalPlantuml(None, None, launcher=str(tmp_path / 'not_exist'))
+        with pytest.raises(ValueError):
+            LocalPlantuml(None, plantuml_jar_file, launcher='{java} -jar {plantuml}')
+        with pytest.raises(FileNotFoundError):
+            LocalPlantuml(shutil.which('java'), 'path_not_exist', launcher='{java} -jar {plantuml}')
+
+    def test_pool_disabled(self, plantuml):
+        assert plantuml.pool is None
+
+    def test_use_pipe(self, plantuml_jar_file, uml_helloworld_code, plantuml):
+        assert plantuml.use_pipe
+        no_pipe = LocalPlantuml.autoload(plantuml=plantuml_jar_file, use_pipe=False)
+        assert not no_pipe.use_pipe
+
+        for type_ in ['txt', 'png', 'svg', 'eps']:
+            assert plantuml.dump_binary(type_, uml_helloworld_code) == no_pipe.dump_binary(type_, uml_helloworld_code)
+
+        _results = list(no_pipe.dump_binary_batch('txt', [uml_helloworld_code, 'Bob->Alice', uml_helloworld_code]))
+        assert [success for success, _ in _results] == [True, False, True]
+
+        with pytest.raises(LocalPlantumlExecuteError) as e:
+            plantuml.dump_txt('@startuml\nBob->Alice\nthis ]] bad [[\n@enduml')
+        assert e.value.exitcode == 200
+        assert 'line 3' in e.value.stderr
+
+    def test_max_heap(self, plantuml_jar_file, uml_helloworld_code, plantuml):
+        assert plantuml.max_heap is None
+        limited = LocalPlantuml.autoload(plantuml=plantuml_jar_file, max_heap='256m')
+        assert limited.max_heap == '256m'
+        assert limited.memory_budget < plantuml.memory_budget
+        self._size_check(self._TXT_SIZES, len(limited.dump_txt(uml_helloworld_code)))
+
+        with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+            limited.dump_txt(uml_helloworld_code)
+            assert '-Xmx256m' in _execute.call_args[0]
+
+        spaced = LocalPlantuml.autoload(plantuml=plantuml_jar_file, max_heap='256 MB')
+        assert spaced.max_heap == '256m'  # normalized for -Xmx
+        self._size_check(self._TXT_SIZES, len(spaced.dump_txt(uml_helloworld_code)))
+
+        with pytest.raises(ValueError):
+            LocalPlantuml.autoload(plantuml=plantuml_jar_file, max_heap='256x')
+
+    def test_timeout(self, plantuml_jar_file, uml_helloworld_code, slow_java):
+        plantuml = LocalPlantuml(slow_java, plantuml_jar_file, timeout=0.5, retries=1)
+        assert plantuml.timeout == 0.5
+        assert plantuml.retries == 1
+
+        _start = time.time()
+        with pytest.raises(LocalPlantumlTimeoutError) as e:
+            plantuml.dump_txt(uml_helloworld_code)
+        assert isinstance(e.value, TimeoutError)
+        assert 0.9 < time.time() - _start < 5.0
+
+        _start = time.time()
+        _results = list(plantuml.dump_binary_batch('txt', [uml_helloworld_code, 'Bob->Alice']))
+        assert [type(err) for _, err in _results] == [LocalPlantumlTimeoutError, LocalPlantumlTimeoutError]
+        assert time.time() - _start < 10.0
+
+    def test_timeout_batch(self, plantuml_jar_file, hanging_java):
+        plantuml = LocalPlantuml(hanging_java, plantuml_jar_file, timeout=0.5, threads=2)
+        _codes = [f'@startuml\nBob -> Alice : {index}\n@enduml' for index in range(64)]
+        _codes[7] = '@startuml\nBob -> Alice : hang\n@enduml'
+
+        _start = time.time()
+        _results = list(plantuml.dump_binary_batch('txt', _codes))
+        # the batch is given up after a few timeouts instead of one per diagram, then rendered standalone
+        assert time.time() - _start < 8.0
+        assert [success for success, _ in _results] == [index != 7 for index in range(64)]
+        assert isinstance(_results[7][1], LocalPlantumlTimeoutError)
+        assert all(data.strip() == b'ok' for success, data in _results if success)
+
+    def test_layout(self, plantuml_jar_file, plantuml):
+        _code = '@startuml\nclass A\nclass B\nA <|-- B\n@enduml'
+        assert plantuml.layout == PlantumlLayout.DOT
+        assert '-Playout=smetana' not in plantuml._command_line()
+
+        smetana = LocalPlantuml.autoload(plantuml=plantuml_jar_file, layout='smetana')
+        assert smetana.layout == PlantumlLayout.SMETANA
+        assert '-Playout=smetana' in smetana._command_line()
+
+        auto = LocalPlantuml.autoload(plantuml=plantuml_jar_file, layout=PlantumlLayout.AUTO)
+        assert '-Playout=smetana' not in auto._command_line()
+        for layout_plantuml in (smetana, auto):
+            _data = layout_plantuml.dump_binary('svg', _code)
+            assert _data.lstrip().startswith(b'<')
+            assert b'Dot executable' not in _data  # rendered without graphviz dot
+            assert [success for success, _ in layout_plantuml.dump_binary_batch('svg', [_code, _code])] == \
+                   [True, True]
+
+        with pytest.raises(KeyError):
+            LocalPlantuml.autoload(plantuml=plantuml_jar_file, layout='elk')
+
+    def test_check_syntax(self, uml_helloworld_code, plantuml):
+        _result = plantuml.check_syntax(uml_helloworld_code)
+        assert _result
+        assert _result.types == ('SEQUENCE',)
+        assert (_result.line, _result.message) == (None, None)
+
+        _codes = [
+            uml_helloworld_code,
+            '\n@startuml\nBob->Alice\nthis ]] bad [[\n@enduml',
+            '@startuml\nclass A\n@enduml\n@startmindmap\n* a\n@endmindmap\n@startuml\n!include not_exist.puml\n@enduml',
+            'Bob -> Alice',
+            '@startuml\nBob -> Alice',
+        ]
+        with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+            _results = list(plantuml.check_syntax_batch(_codes))
+            assert _execute.call_count == 1
+            assert '-syntax' in _execute.call_args[0]
+        assert [bool(result) for result in _results] == [True, False, False, False, False]
+        assert (_results[1].line, _results[1].message) == (4, 'Syntax Error?')
+        assert _results[2].types == ('CLASS', 'MINDMAP')
+        assert _results[2].line == 8
+        assert 'not_exist.puml' in _results[2].message
+        assert _results[3].line is None
+        assert 'not ended' in _results[4].message
+
+    def test_use_pipe_misbehave(self, uml_helloworld_code, plantuml):
+        from plantumlcli.models import local
+
+        _origin_execute = local.execute
+
+        def _execute(*cmdline, **kwargs):
+            if '-pipe' in cmdline:
+                return b'', ''
+            else:
+                return _origin_execute(*cmdline, **kwargs)
+
+        with patch.object(local, 'execute', _execute):
+            self._size_check(self._TXT_SIZES, len(plantuml.dump_txt(uml_helloworld_code)))
+            assert not plantuml.use_pipe
+
+    def test_dump_binary_batch(self, uml_helloworld_code, plantuml):
+        _codes = [
+            uml_helloworld_code,
+            '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml',
+            uml_helloworld_code,
+            'Bob->Alice',
+            uml_helloworld_code,
+        ]
+        _results = list(plantuml.dump_binary_batch('txt', _codes))
+        assert len(_results) == 5
+        assert [success for success, _ in _results] == [True, False, True, False, True]
+        for _, data in _results[0::2]:
+            assert isinstance(data, bytes)
+            self._size_check(self._TXT_SIZES, len(data))
+
+        _, err = _results[1]
+        assert isinstance(err, LocalPlantumlExecuteError)
+        assert err.exitcode == 200
+        assert 'line 3' in err.stderr
+        _, err = _results[3]
+        assert isinstance(err, (LocalPlantumlExecuteError, FileNotFoundError))
+
+    def test_dump_binary_batch_png(self, uml_helloworld_code, plantuml):
+        _results = list(plantuml.dump_binary_batch('png', [uml_helloworld_code] * 3))
+        assert len(_results) == 3
+        for success, data in _results:
+            assert success
+            self._size_check(self._PNG_SIZES, len(data))
+
+    def test_dump_binary_batch_files(self, uml_helloworld_code, plantuml):
+        _codes = [
+            '@startuml\nA -> B\n@enduml\n@startuml\nC -> D\n@enduml',
+            'Bob->Alice',
+            '@startuml\nA -> B\nthis ]] bad [[\n@enduml\n@startuml\nE -> F\n@enduml',
+            '@startuml named\nG -> H\n@enduml\n@startuml\nI -> J\n@enduml',
+            uml_helloworld_code,
+        ]
+        _results = list(plantuml.dump_binary_batch('txt', _codes))
+        assert [success for success, _ in _results] == [True, False, False, True, True]
+
+        _, data = _results[0]
+        assert b'A' in data and b'B' in data
+        assert b'C' not in data
+        _, err = _results[1]
+        assert isinstance(err, (LocalPlantumlExecuteError, FileNotFoundError))
+        _, err = _results[2]
+        assert isinstance(err, LocalPlantumlExecuteError)
+        assert err.exitcode == 200
+        assert 'Error line 3' in err.stderr
+        _, data = _results[4]
+        self._size_check(self._TXT_SIZES, len(data))
+
+    def test_dump_binary_batch_pool(self, plantuml_jar_file, uml_helloworld_code):
+        with LocalPlantuml.autoload(plantuml=plantuml_jar_file, pool_size=1) as plantuml:
+            _results = list(plantuml.dump_binary_batch('svg', [uml_helloworld_code] * 3))
+            assert len(_results) == 3
+            for success, data in _results:
+                assert success
+                self._size_check(self._SVG_SIZES, len(data))
+
 
 @pytest.mark.unittest
 class TestModelsLocalCommon:
+    def test_read_jar_version(self, plantuml_jar_version, plantuml_jar_file, broken_jar_file, invalid_jar_file):
+        assert _read_jar_version(plantuml_jar_file) == f'PlantUML version {plantuml_jar_version}'
+        assert _read_jar_version(broken_jar_file) is None
+        assert _read_jar_version(invalid_jar_file) is None
+        assert _read_jar_version('path_not_exist') is None
+
+    def test_parse_files_messages(self):
+        assert _parse_files_messages('Error line 3 in file: /tmp/x/input/2.puml\n'
+                                     'Warning: no image in /tmp/x/input/10.puml\n'
+                                     'Warning: no image in /tmp/x/input/other.puml\n'
+                                     'Some diagram description contains errors\n') == {
+            2: ['Error line 3 in file: /tmp/x/input/2.puml'],
+            10: ['Warning: no image in /tmp/x/input/10.puml'],
+        }
+        assert _parse_files_messages('') == {}
+
+    def test_map_output_files(self):
+        assert _map_output_files(['1_001.png', '0.png', '1.png', 'named.png', '1_002.png', '12.atxt']) == {
+            0: [('0.png', 0)],
+            1: [('1.png', 0), ('1_001.png', 1), ('1_002.png', 2)],
+            12: [('12.atxt', 0)],
+        }
+
+    def test_multi_page(self):
+        assert not _is_multi_page('@startuml\nA -> B\n@enduml')
+        assert _is_multi_page('@startuml\nA -> B\nnewpage\nB -> C\n@enduml')
+        assert _is_multi_page('@startuml\nA -> B\n@enduml\n@startuml\nB -> C\n@enduml')
+        assert _anonymize_starts('@startuml first\nA -> B\n@enduml\n@startmindmap(id=x)\n* a\n@endmindmap') == \
+               '@startuml\nA -> B\n@enduml\n@startmindmap\n* a\n@endmindmap'
+
     def test_find_java_from_env(self):
         with patch('shutil.which', lambda x: '/usr/bin/java'):
             assert find_java_from_env() == '/usr/bin/java'
@@ -200,3 +605,26 @@ class TestModelsLocalCommon:
         with patch.dict('os.environ', {'PLANTUML_JAR': ''}):
             assert find_plantuml('/usr/bin/plantuml.jar') == '/usr/bin/plantuml.jar'
             assert not find_plantuml()
+
+
+@pytest.mark.benchmark
+class TestModelsLocalBenchmark:
+    def test_check_syntax(self, plantuml_jar_file):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        _names = ('helloworld.puml', 'common.puml', 'chinese.puml', 'large.puml')
+        _codes = [Path(get_testfile('umls', name)).read_text() for name in _names]
+        _batch = (_codes * 40)[:40]
+        _check_costs, _render_costs = [], []
+        for _ in range(3):  # best of the rounds, so the noise of host is not measured
+            _start = time.time()
+            _results = list(plantuml.check_syntax_batch(_batch))
+            _check_costs.append(time.time() - _start)
+            assert len(_results) == 40 and all(_results)
+
+            _start = time.time()
+            _rendered = list(plantuml.dump_binary_batch('png', _batch))
+            _render_costs.append(time.time() - _start)
+            assert len(_rendered) == 40 and all(success for success, _ in _rendered)
+
+        # both of them pay one jvm startup, the rest of syntax checking skips the layout and the rasterizing
+        assert min(_check_costs) < min(_render_costs) / 1.5, (_check_costs, _render_costs)
@@ -0,0 +1,92 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from plantumlcli import LocalPlantuml
+from plantumlcli.models.local import LocalPlantumlExecuteError
+from plantumlcli.models.metrics import PlantumlMetrics, metrics_args, metrics_jvm_options, parse_duration, \
+    parse_stats_html
+from plantumlcli.utils import execute
+
+_HEADERS = '<tr bgcolor=#e0e0e0><td><b>Diagram type</b></td><td><b># Parsed</b></td>' \
+           '<td><b>Mean parsing<br>time (ms)</b></td><td><b>Standard<br>deviation (ms)</b></td>' \
+           '<td><b>Max parsing<br>time (ms)</b></td><td><b># Generated</b></td>' \
+           '<td><b>Mean generation<br>time (ms)</b></td><td><b>Standard<br>deviation (ms)</b></td>' \
+           '<td><b>Max generation<br>time (ms)</b></td></tr>'
+_STATS_HTML = '<html><h2>Statistics</h2><table border=1><tr><td>Session ID</td></tr>' \
+              '<tr><td>1</td></tr></table>' \
+              '<h2>Current session statistics</h2><table border=1 cellspacing=0 cellpadding=2>' + _HEADERS + \
+              '<tr bgcolor=#fcfcfc><td>SequenceDiagram</td><td align=right>2</td><td align=right>270</td>' \
+              '<td align=right>0</td><td align=right>270</td><td align=right>1</td><td align=right>188</td>' \
+              '<td align=right>0</td><td align=right>188</td></tr>' \
+              '<tr bgcolor=#f0f0f0><td><b>Total</b></td><td align=right><b>2</b></td><td align=right><b>270</b></td>' \
+              '<td align=right><b>0</b></td><td align=right><b>270</b></td><td align=right><b>1</b></td>' \
+              '<td align=right><b>188</b></td><td align=right><b>0</b></td><td align=right><b>188</b></td></tr>' \
+              '</table></html>'
+
+
+@pytest.mark.unittest
+class TestModelsMetrics:
+    def test_metrics(self):
+        _metrics = PlantumlMetrics(2.0, 1.5, ('SequenceDiagram',), 0.3, 0.2)
+        assert _metrics.wall_time == 2.0
+        assert _metrics.duration == 1.5
+        assert _metrics.types == ('SequenceDiagram',)
+        assert _metrics.parse_time == 0.3
+        assert _metrics.generation_time == 0.2
+        assert _metrics.startup_time == pytest.approx(0.5)
+        assert _metrics.init_time == pytest.approx(1.0)
+        assert 'startup_time: 0.500s' in repr(_metrics)
+
+        _metrics = PlantumlMetrics(2.0)
+        assert _metrics.startup_time is None
+        assert _metrics.init_time is None
+        assert repr(_metrics) == '<PlantumlMetrics types: (), wall_time: 2.000s>'
+
+    def test_args(self, tmp_path):
+        assert '-duration' in metrics_args()
+        assert '-htmlstats' in metrics_args()
+        assert metrics_jvm_options(str(tmp_path)) == (f'-Djava.util.prefs.userRoot={tmp_path / "prefs"}',)
+
+    def test_parse_duration(self):
+        assert parse_duration('Duration = 1.371 seconds') == 1.371
+        assert parse_duration('some warning\nDuration = 2 seconds\n') == 2.0
+        assert parse_duration('') is None
+        assert parse_duration(None) is None
+
+    def test_parse_stats_html(self):
+        _types, _parse_time, _generation_time = parse_stats_html(_STATS_HTML)
+        assert _types == ('SequenceDiagram',)
+        assert _parse_time == pytest.approx(0.54)
+        assert _generation_time == pytest.approx(0.188)
+
+        _types, _parse_time, _ = parse_stats_html(_STATS_HTML.replace('<b>270</b>', '<b>1,270</b>', 1))
+        assert _parse_time == pytest.approx(2.54)
+
+        assert parse_stats_html('<html></html>') == ((), None, None)
+        assert parse_stats_html('<h2>Current session statistics</h2><table></table>') == ((), None, None)
+        assert parse_stats_html('<h2>Current session statistics</h2><table>' + _HEADERS + '</table>') == \
+               ((), None, None)
+
+    def test_dump_binary_with_metrics(self, plantuml_jar_file, uml_helloworld_code):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+            _data, _metrics = plantuml.dump_binary_with_metrics('txt', uml_helloworld_code)
+            assert '-duration' in _execute.call_args[0]
+            assert os.path.basename(_execute.call_args[1]['cwd']).startswith('puml')
+
+        assert _data.decode() == plantuml.dump_txt(uml_helloworld_code)
+        assert _metrics.types == ('SequenceDiagram',)
+        assert 0 < _metrics.duration < _metrics.wall_time
+        assert _metrics.startup_time > 0
+        assert _metrics.parse_time is not None
+        assert _metrics.generation_time is not None
+
+        _data, _metrics = LocalPlantuml.autoload(plantuml=plantuml_jar_file, use_pipe=False) \
+            .dump_binary_with_metrics('svg', '@startuml\nclass A\n!pragma layout smetana\n@enduml')
+        assert b'<svg' in _data
+        assert _metrics.types == ('ClassDiagram',)
+
+        with pytest.raises(LocalPlantumlExecuteError):
+            plantuml.dump_binary_with_metrics('png', '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml')
@@ -0,0 +1,155 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+from requests import HTTPError, ConnectionError
+from requests.exceptions import RetryError
+
+from plantumlcli.models.breaker import CircuitOpenError, CircuitState
+from plantumlcli.models.multiremote import MultiRemotePlantuml, RemoteHostStats, find_plantuml_hosts, \
+    find_plantuml_hosts_from_env
+from plantumlcli.models.remote import OFFICIAL_PLANTUML_HOST
+from ..testings import StandInServer
+
+
+def _closed_host() -> str:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f'http://127.0.0.1:{sock.getsockname()[1]}/plantuml'
+
+
+@pytest.mark.unittest
+class TestModelsMultiremote:
+    def test_find_plantuml_hosts(self):
+        with patch.dict(os.environ, {'PLANTUML_HOST': 'http://host-a/plantuml, http://host-b/plantuml\thttp://c'}):
+            assert find_plantuml_hosts_from_env() == ('http://host-a/plantuml', 'http://host-b/plantuml', 'http://c')
+            assert find_plantuml_hosts(['http://d']) == ('http://d',)
+            assert find_plantuml_hosts() == ('http://host-a/plantuml', 'http://host-b/plantuml', 'http://c')
+        with patch.dict(os.environ, {'PLANTUML_HOST': ''}):
+            assert find_plantuml_hosts_from_env() == ()
+            assert find_plantuml_hosts() == (OFFICIAL_PLANTUML_HOST,)
+
+    def test_init(self):
+        plantuml = MultiRemotePlantuml(['http://host-a/plantuml', 'http://host-b/plantuml?x=1'])
+        assert plantuml.hosts == ('http://host-a/plantuml', 'http://host-b/plantuml')
+        assert repr(plantuml) == "<MultiRemotePlantuml hosts: ('http://host-a/plantuml', 'http://host-b/plantuml')>"
+        assert [stats.requests for stats in plantuml.host_stats] == [0, 0]
+
+        with pytest.raises(ValueError):
+            MultiRemotePlantuml([])
+        with pytest.raises(ValueError):
+            MultiRemotePlantuml(['http://host-a/plantuml', 'socks5://host-b/plantuml'])
+        with pytest.raises(ValueError):
+            MultiRemotePlantuml(['http://host-a/plantuml'], eject_failures=0)
+
+    def test_least_outstanding(self, uml_helloworld_code):
+        with StandInServer(delay=0.3) as a, StandInServer(delay=0.3) as b, StandInServer(delay=0.3) as c:
+            plantuml = MultiRemotePlantuml([a.url, b.url, c.url])
+            _start = time.time()
+            with ThreadPoolExecutor(6) as pool:
+                _results = list(pool.map(lambda _: plantuml.dump_binary('txt', uml_helloworld_code), range(6)))
+            assert time.time() - _start < 0.3 * 3
+
+            assert [len(server.paths) for server in (a, b, c)] == [2, 2, 2]
+            assert all(server.max_in_flight <= 2 for server in (a, b, c))
+            assert all(data.startswith(b'/plantuml/txt/') for data in _results)
+            _stats = plantuml.host_stats
+            assert [(stats.requests, stats.failures, stats.outstanding) for stats in _stats] == [(2, 0, 0)] * 3
+            assert all(stats.latency >= 0.3 and not stats.ejected for stats in _stats)
+
+    def test_failover(self, uml_helloworld_code):
+        _down = _closed_host()
+        with StandInServer() as healthy, StandInServer(failures=100) as failing:
+            plantuml = MultiRemotePlantuml([_down, failing.url, healthy.url], eject_failures=2)
+            for _ in range(6):
+                assert plantuml.dump_binary('txt', uml_helloworld_code).startswith(b'/plantuml/txt/')
+
+            _down_stats, _failing_stats, _healthy_stats = plantuml.host_stats
+            assert (_down_stats.failures, _down_stats.ejected) == (2, True)
+            assert (_failing_stats.failures, _failing_stats.ejected) == (2, True)
+            assert (_healthy_stats.requests, _healthy_stats.failures) == (6, 0)
+            assert len(failing.paths) == 2  # ejected hosts are not requested any more
+
+    def test_eject_recover(self, uml_helloworld_code):
+        with StandInServer(failures=2) as server:
+            plantuml = MultiRemotePlantuml([server.url], retries=1, eject_failures=2, eject_time=0.5)
+            with pytest.raises(RetryError):  # 503 responses are raised by session
+                plantuml.dump_binary('txt', uml_helloworld_code)
+            assert plantuml.host_stats[0].ejected
+
+            time.sleep(0.5)
+            assert not plantuml.host_stats[0].ejected
+            assert plantuml.dump_binary('txt', uml_helloworld_code)
+            assert (plantuml.host_stats[0].requests, plantuml.host_stats[0].failures) == (3, 2)
+
+    def test_throttling_not_ejected(self, uml_helloworld_code):
+        with StandInServer(failures=4, failure_status=429) as busy, StandInServer(delay=0.2) as other:
+            plantuml = MultiRemotePlantuml([busy.url, other.url], retries=5, eject_failures=2)
+            with patch('plantumlcli.models.remote.backoff_time', return_value=0.0):
+                for _ in range(4):
+                    assert plantuml.dump_binary('txt', uml_helloworld_code).startswith(b'/plantuml/txt/')
+
+            _busy_stats, _ = plantuml.host_stats
+            assert _busy_stats.failures >= 2  # throttled, but healthy
+            assert not _busy_stats.ejected
+
+    def test_all_down(self, uml_helloworld_code):
+        plantuml = MultiRemotePlantuml([_closed_host(), _closed_host()], retries=3)
+        with pytest.raises(ConnectionError):
+            plantuml.dump_binary('txt', uml_helloworld_code)
+        assert sum(stats.failures for stats in plantuml.host_stats) == 4
+        assert not plantuml.test()
+
+    def test_probe_hosts(self):
+        _down = _closed_host()
+        with StandInServer(delay=0.1) as server:
+            plantuml = MultiRemotePlantuml([server.url, _down])
+            assert plantuml.test()
+            _stats = plantuml.probe_hosts()
+            assert isinstance(_stats[0], RemoteHostStats)
+            assert _stats[0].latency >= 0.1 and _stats[0].failures == 0
+            assert _stats[1].latency is None and _stats[1].failures >= 1
+            assert repr(_stats[1]).startswith(f"<RemoteHostStats host: {_down!r}, outstanding: 0,")
+
+    def test_client_error_not_failed_over(self, uml_helloworld_code):
+        with StandInServer() as a, StandInServer() as b:
+            plantuml = MultiRemotePlantuml([a.url, b.url])
+            with patch.object(MultiRemotePlantuml, '_check_response', side_effect=HTTPError('400 Bad Request')):
+                with pytest.raises(HTTPError):
+                    plantuml.dump_binary('txt', uml_helloworld_code)
+            assert len(a.paths) + len(b.paths) == 1
+            assert sum(stats.failures for stats in plantuml.host_stats) == 0
+
+    def test_circuit_open(self, uml_helloworld_code):
+        _down = _closed_host()
+        with StandInServer() as healthy:
+            plantuml = MultiRemotePlantuml([_down, healthy.url], breaker_failures=1, breaker_time=10.0)
+            for _ in range(4):
+                assert plantuml.dump_binary('txt', uml_helloworld_code).startswith(b'/plantuml/txt/')
+            assert plantuml.circuit_state(_down) == CircuitState.OPEN
+            assert plantuml.host_stats[0].requests == 1  # skipped after opened, even when recovered from ejection
+
+        plantuml = MultiRemotePlantuml([_closed_host(), _closed_host()], retries=10, breaker_failures=1)
+        _start = time.time()
+        with pytest.raises(CircuitOpenError):
+            plantuml.dump_binary('txt', uml_helloworld_code)
+        assert time.time() - _start < 1.0
+        assert sum(stats.requests for stats in plantuml.host_stats) == 2
+
+    def test_hedge_on_another_host(self, uml_helloworld_code):
+        with StandInServer(delay=1.0) as a, StandInServer() as b:
+            plantuml = MultiRemotePlantuml([a.url, b.url], hedge=50, hedge_budget=1.0)
+            for _ in range(20):
+                plantuml.hedging.record(0.05)
+            _start = time.time()
+            assert plantuml.dump_binary('txt', uml_helloworld_code).startswith(b'/plantuml/txt/')
+            assert time.time() - _start < 0.8
+            assert (len(a.paths), len(b.paths), plantuml.hedging.hedged) == (1, 1, 1)
+            plantuml.close()
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
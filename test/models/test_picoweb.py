@@ -0,0 +1,144 @@
+import os
+import shutil
+import time
+
+import pytest
+from requests import HTTPError
+
+from plantumlcli import PicowebPlantuml, LocalPlantuml
+from plantumlcli.models.layout import PlantumlLayout
+from plantumlcli.models.local import LocalPlantumlExecuteError
+from plantumlcli.models.picoweb import LocalPicowebServer
+
+_INVALID_CODE = '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml'
+
+
+@pytest.fixture(scope='module')
+def picoweb(plantuml_jar_file):
+    with PicowebPlantuml.autoload(plantuml=plantuml_jar_file, processes=2) as plantuml:
+        yield plantuml
+
+
+@pytest.mark.unittest
+class TestModelsPicoweb:
+    def test_server(self, plantuml_jar_file):
+        with LocalPicowebServer((shutil.which('java'), '-jar', plantuml_jar_file)) as server:
+            server.wait_ready()
+            assert server.alive
+            assert server.url == f'http://127.0.0.1:{server.port}/plantuml'
+            assert f'-picoweb:{server.port}:127.0.0.1' in server.command_line
+
+        assert not server.alive
+
+    @pytest.mark.skipif(os.name != 'posix', reason='Process group is posix only')
+    def test_server_close_children(self, tmp_path):
+        _flag_file = str(tmp_path / 'flag')
+        server = LocalPicowebServer(('sh', '-c', f'(sleep 3; touch {_flag_file}) & wait', 'sh'))
+        time.sleep(0.5)
+        server.close()
+        assert not server.alive
+
+        # children of server (such as dot) are killed together
+        time.sleep(3.5)
+        assert not os.path.exists(_flag_file)
+
+    def test_server_failed(self, plantuml_jar_file):
+        with LocalPicowebServer((shutil.which('java'), '-jar', 'path_not_exist.jar'),
+                                exc=LocalPlantumlExecuteError) as server:
+            with pytest.raises(LocalPlantumlExecuteError):
+                server.wait_ready()
+
+    def test_init(self, plantuml_jar_file, picoweb):
+        assert picoweb.java == shutil.which('java')
+        assert picoweb.plantuml == plantuml_jar_file
+        assert len(picoweb.hosts) == 2
+        assert picoweb.host in picoweb.hosts
+        assert repr(picoweb) == f'<PicowebPlantuml java: {shutil.which("java")!r}, ' \
+                                f'plantuml: {plantuml_jar_file!r}, processes: 2>'
+
+        with pytest.raises(ValueError):
+            PicowebPlantuml(shutil.which('java'), plantuml_jar_file, processes=0)
+        with pytest.raises(FileNotFoundError):
+            PicowebPlantuml(shutil.which('java'), 'path_not_exist')
+
+    def test_version(self, plantuml_jar_version, picoweb):
+        assert picoweb.check() is None
+        assert picoweb.test()
+        assert plantuml_jar_version in picoweb.version
+
+    def test_dump(self, plantuml_jar_file, uml_helloworld_code, picoweb):
+        local = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        assert picoweb.dump_txt(uml_helloworld_code) == local.dump_txt(uml_helloworld_code)
+        for _ in range(4):
+            assert picoweb.dump_binary('png', uml_helloworld_code).startswith(b'\x89PNG')
+        assert picoweb.dump_binary('svg', uml_helloworld_code).lstrip().startswith(b'<')
+
+    def test_dump_error(self, picoweb):
+        with pytest.raises(HTTPError) as e:
+            picoweb.dump_txt(_INVALID_CODE)
+        assert 'line 3' in str(e.value)
+
+    def test_check_syntax(self, uml_helloworld_code, picoweb):
+        assert picoweb.check_syntax(uml_helloworld_code).types == ('SEQUENCE',)
+        _results = list(picoweb.check_syntax_batch([uml_helloworld_code, _INVALID_CODE]))
+        assert [bool(result) for result in _results] == [True, False]
+        assert _results[1].line == 3
+
+    def test_close(self, plantuml_jar_file, uml_helloworld_code):
+        with PicowebPlantuml.autoload(plantuml=plantuml_jar_file) as plantuml:
+            _host = plantuml.host
+            plantuml.close()
+            with pytest.raises(RuntimeError):
+                plantuml.dump_txt(uml_helloworld_code)
+            assert plantuml.host == _host
+
+    def test_restart(self, plantuml_jar_file, uml_helloworld_code):
+        with PicowebPlantuml.autoload(plantuml=plantuml_jar_file, processes=2) as plantuml:
+            _text = plantuml.dump_txt(uml_helloworld_code)
+            _crashed = plantuml._PicowebPlantuml__servers[0]
+            _crashed.close()
+
+            # the other server is used while the crashed one is restarting
+            _start = time.time()
+            for _ in range(4):
+                assert plantuml.dump_txt(uml_helloworld_code) == _text
+            assert time.time() - _start < 3.0
+            assert _crashed.url in plantuml.hosts
+
+            _deadline = time.time() + 30.0
+            while _crashed.url in plantuml.hosts and time.time() < _deadline:
+                time.sleep(0.2)
+            assert _crashed.url not in plantuml.hosts
+            assert len(plantuml.hosts) == 2
+            assert plantuml.dump_txt(uml_helloworld_code) == _text
+
+        with PicowebPlantuml.autoload(plantuml=plantuml_jar_file) as plantuml:
+            _text = plantuml.dump_txt(uml_helloworld_code)
+            plantuml._PicowebPlantuml__servers[0].close()
+            assert plantuml.dump_txt(uml_helloworld_code) == _text  # waits for the only server
+
+    def test_layout(self, plantuml_jar_file):
+        _code = '@startuml\nclass A\nclass B\nA <|-- B\n@enduml'
+        with PicowebPlantuml.autoload(plantuml=plantuml_jar_file, layout='auto') as plantuml:
+            assert plantuml.layout == PlantumlLayout.AUTO
+            _data = plantuml.dump_binary('svg', _code)
+            assert _data.lstrip().startswith(b'<')
+            assert b'Dot executable' not in _data
+
+    def test_config(self, plantuml_jar_file, uml_helloworld_code, picoweb, tmp_path):
+        _config = str(tmp_path / 'config.puml')
+        with open(_config, 'w') as f:
+            f.write('skinparam monochrome true\n')
+
+        with PicowebPlantuml.autoload(plantuml=plantuml_jar_file, config=_config) as plantuml:
+            assert plantuml.config == _config
+            _code = '@startuml\nclass A\n@enduml'
+            assert plantuml.dump_binary('svg', _code) == \
+                   picoweb.dump_binary('svg', '@startuml\nskinparam monochrome true\nclass A\n@enduml')
+            assert plantuml.check_syntax(_INVALID_CODE).line == 3
+            _results = list(plantuml.check_syntax_batch([uml_helloworld_code, _INVALID_CODE]))
+            assert [bool(result) for result in _results] == [True, False]
+            assert _results[1].line == 3
+
+        with pytest.raises(FileNotFoundError):
+            PicowebPlantuml.autoload(plantuml=plantuml_jar_file, config=str(tmp_path / 'not_exist.puml'))
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from plantumlcli.models.pipe import is_pipe_safe, parse_pipe_error, unpack_pipe_output, pipe_input, \
+    new_pipe_delimiter, pipe_marker, PLANTUML_ERROR_EXITCODE
+from plantumlcli.utils import CommandLineExecuteError
+
+
+@pytest.mark.unittest
+class TestModelsPipe:
+    def test_is_pipe_safe(self):
+        assert is_pipe_safe('@startuml\nBob -> Alice : hello\n@enduml')
+        assert is_pipe_safe('\' comment\n@startuml\nBob -> Alice : hello\n@enduml\n')
+        assert is_pipe_safe('@startmindmap\n* root\n@endmindmap')
+
+        assert not is_pipe_safe('Bob -> Alice : hello')
+        assert not is_pipe_safe('@startuml\nBob -> Alice : hello')
+        assert not is_pipe_safe('@enduml\nBob -> Alice : hello\n@startuml')
+        assert not is_pipe_safe('@startuml\nA -> B\n@enduml\n@startuml\nC -> D\n@enduml')
+
+    def test_new_pipe_delimiter(self):
+        d1, d2 = new_pipe_delimiter(), new_pipe_delimiter()
+        assert d1 != d2
+        assert pipe_marker(d1) == (d1 + os.linesep).encode()
+
+    def test_pipe_input(self):
+        assert pipe_input('@startuml\n@enduml') == b'@startuml\n@enduml\n'
+        assert pipe_input('@startuml\n@enduml\n') == b'@startuml\n@enduml\n'
+        assert pipe_input('@startuml\n认证中心\n@enduml\n') == '@startuml\n认证中心\n@enduml\n'.encode('utf-8')
+
+    def test_parse_pipe_error(self):
+        code = '\' comment\n@startuml\nBob->Alice\nthis ]] bad [[\n@enduml'
+        assert parse_pipe_error(code, b'\x89PNG\r\n\x1a\n') is None
+        assert parse_pipe_error(code, os.linesep.join(['ERROR', '2', 'Syntax Error?', '']).encode()) == \
+               (4, 'Syntax Error?')
+        assert parse_pipe_error(code, b'ERROR') == (0, '')
+
+    def test_unpack_pipe_output(self):
+        code = '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml'
+        assert unpack_pipe_output(('plantuml',), code, b'<svg></svg>') == b'<svg></svg>'
+
+        with pytest.raises(CommandLineExecuteError) as e:
+            unpack_pipe_output(('plantuml',), code, os.linesep.join(['ERROR', '2', 'Syntax Error?', '']).encode())
+        err = e.value
+        assert err.exitcode == PLANTUML_ERROR_EXITCODE
+        assert err.command_line == ('plantuml',)
+        assert 'line 3' in err.stderr
+        assert 'Syntax Error?' in err.stderr
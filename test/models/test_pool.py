@@ -0,0 +1,116 @@
+import shutil
+
+import pytest
+
+from plantumlcli.models.local import LocalPlantumlExecuteError, LocalPlantumlTimeoutError
+from plantumlcli.models.pool import LocalPlantumlWorker, LocalPlantumlPool
+
+_INVALID_CODE = '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml'
+
+
+@pytest.fixture()
+def command_line(plantuml_jar_file):
+    def _command_line(type_name: str):
+        return shutil.which('java'), '-jar', plantuml_jar_file, f'-t{type_name}'
+
+    return _command_line
+
+
+@pytest.mark.unittest
+class TestModelsPoolWorker:
+    def test_render(self, command_line, uml_helloworld_code):
+        with LocalPlantumlWorker(command_line('txt'), exc=LocalPlantumlExecuteError) as worker:
+            assert worker.alive
+            for i in range(3):
+                _data = worker.render(uml_helloworld_code).decode()
+                assert 'Bob' in _data
+                assert 'Alice' in _data
+                assert worker.jobs == i + 1
+            assert '-pipe' in worker.command_line
+
+        assert not worker.alive
+
+    def test_render_error(self, command_line, uml_helloworld_code):
+        with LocalPlantumlWorker(command_line('png'), exc=LocalPlantumlExecuteError) as worker:
+            with pytest.raises(LocalPlantumlExecuteError) as e:
+                worker.render(_INVALID_CODE)
+            assert e.value.exitcode == 200
+            assert 'line 3' in e.value.stderr
+
+            # worker is still usable after diagram error
+            assert worker.alive
+            assert worker.render(uml_helloworld_code).startswith(b'\x89PNG')
+
+    def test_crash(self, command_line, uml_helloworld_code):
+        worker = LocalPlantumlWorker(command_line('txt'), exc=LocalPlantumlExecuteError)
+        worker.kill()
+        assert not worker.alive
+        with pytest.raises(LocalPlantumlExecuteError):
+            worker.render(uml_helloworld_code)
+        assert not worker.ping()
+
+    def test_timeout(self, uml_helloworld_code):
+        worker = LocalPlantumlWorker(('sh', '-c', 'sleep 30'), exc=LocalPlantumlExecuteError,
+                                     timeout_exc=LocalPlantumlTimeoutError)
+        with pytest.raises(LocalPlantumlTimeoutError) as e:
+            worker.render(uml_helloworld_code, timeout=0.5)
+        assert e.value.timeout == 0.5
+        assert not worker.alive
+
+    def test_expired(self, command_line, uml_helloworld_code):
+        with LocalPlantumlWorker(command_line('txt'), max_jobs=2) as worker:
+            assert worker.ping()
+            assert not worker.expired
+            worker.render(uml_helloworld_code)
+            assert worker.expired
+
+
+@pytest.mark.unittest
+class TestModelsPool:
+    def test_render(self, command_line, uml_helloworld_code):
+        with LocalPlantumlPool(command_line, size=2, exc=LocalPlantumlExecuteError) as pool:
+            assert pool.size == 2
+            assert pool.max_jobs is None
+            assert 'Alice' in pool.render('txt', uml_helloworld_code).decode()
+            assert pool.render('png', uml_helloworld_code).startswith(b'\x89PNG')
+            assert pool.render('svg', uml_helloworld_code).lstrip().startswith(b'<')
+            assert pool.check()
+
+            with pytest.raises(LocalPlantumlExecuteError):
+                pool.render('txt', _INVALID_CODE)
+
+        with pytest.raises(RuntimeError):
+            pool.render('txt', uml_helloworld_code)
+
+    def test_recycle(self, command_line, uml_helloworld_code):
+        _workers = []
+
+        def _command_line(type_name: str):
+            _workers.append(type_name)
+            return command_line(type_name)
+
+        with LocalPlantumlPool(_command_line, size=1, max_jobs=2) as pool:
+            for _ in range(5):
+                assert 'Alice' in pool.render('txt', uml_helloworld_code).decode()
+        assert len(_workers) == 3
+
+    def test_prespawn(self, command_line, uml_helloworld_code):
+        _workers = []
+
+        def _command_line(type_name: str):
+            _workers.append(type_name)
+            return command_line(type_name)
+
+        with LocalPlantumlPool(_command_line, size=2) as pool:
+            assert pool.prespawn('txt', 5) == 2
+            assert pool.prespawn('txt') == 0  # no room left
+            assert _workers == ['txt', 'txt']
+            for _ in range(3):
+                assert 'Alice' in pool.render('txt', uml_helloworld_code).decode()
+            assert _workers == ['txt', 'txt']
+
+        assert pool.prespawn('txt') == 0
+
+    def test_size_error(self, command_line):
+        with pytest.raises(ValueError):
+            LocalPlantumlPool(command_line, size=0)
@@ -0,0 +1,91 @@
+import os
+import re
+
+import pytest
+
+from plantumlcli import LocalPlantuml
+from plantumlcli.models.base import PlantumlSyntaxResult
+from plantumlcli.models.preamble import load_preamble, preamble_args, apply_preamble, original_line, \
+    restore_syntax_result
+
+_PREAMBLE = 'skinparam monochrome true\nskinparam shadowing false'
+_CODE = '@startuml\nBob -> Alice\nthis ]] bad [[\n@enduml\n\n@startuml\nA -> B\n@enduml\n'
+
+
+@pytest.fixture()
+def preamble_file(tmp_path):
+    _path = str(tmp_path / 'preamble.puml')
+    with open(_path, 'w') as f:
+        f.write(_PREAMBLE + '\n\n')
+    return _path
+
+
+def _strip_source(svg: bytes) -> bytes:
+    # code lines and encoded source in svg are not the same as merged source with -config
+    return re.sub(rb'<!--SRC=\[.*?]-->', b'', re.sub(rb'codeLine="\d+"', b'', svg))
+
+
+@pytest.mark.unittest
+class TestModelsPreamble:
+    def test_load_preamble(self, preamble_file, tmp_path):
+        assert load_preamble(preamble_file) == _PREAMBLE
+        assert load_preamble(None) is None
+        with pytest.raises(FileNotFoundError):
+            load_preamble(str(tmp_path / 'not_exist.puml'))
+        with pytest.raises(IsADirectoryError):
+            load_preamble(str(tmp_path))
+
+    def test_preamble_args(self, preamble_file):
+        assert preamble_args(preamble_file) == ('-config', os.path.abspath(preamble_file))
+        assert preamble_args(None) == ()
+
+    def test_apply_preamble(self):
+        assert apply_preamble(_CODE, None) == _CODE
+        assert apply_preamble(_CODE, _PREAMBLE) == \
+               '@startuml\nskinparam monochrome true\nskinparam shadowing false\nBob -> Alice\nthis ]] bad [[\n' \
+               '@enduml\n\n@startuml\nskinparam monochrome true\nskinparam shadowing false\nA -> B\n@enduml\n'
+        assert apply_preamble('Bob -> Alice', _PREAMBLE) == f'{_PREAMBLE}\nBob -> Alice'
+
+    def test_original_line(self):
+        _merged = apply_preamble(_CODE, _PREAMBLE).splitlines()
+        _lines = _CODE.splitlines()
+        for i, line in enumerate(_merged, start=1):
+            _origin = original_line(_CODE, _PREAMBLE, i)
+            if line.startswith('skinparam'):
+                assert _lines[_origin - 1] == '@startuml'
+            else:
+                assert _lines[_origin - 1] == line
+
+        assert original_line(_CODE, None, 5) == 5
+        assert original_line(_CODE, _PREAMBLE, None) is None
+        assert original_line('Bob -> Alice', _PREAMBLE, 3) == 1
+
+    def test_restore_syntax_result(self):
+        _result = restore_syntax_result(_CODE, _PREAMBLE, PlantumlSyntaxResult(False, line=5, message='Syntax Error?'))
+        assert (_result.line, _result.message) == (3, 'Syntax Error?')
+        _result = PlantumlSyntaxResult(True, ('SequenceDiagram',))
+        assert restore_syntax_result(_CODE, _PREAMBLE, _result) is _result
+
+    def test_local(self, plantuml_jar_file, preamble_file, uml_helloworld_code, tmp_path):
+        _code = '@startuml\nclass A\n@enduml'
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file, config=preamble_file)
+        assert plantuml.config == preamble_file
+        _expected = LocalPlantuml.autoload(plantuml=plantuml_jar_file).dump_binary('svg',
+                                                                                   apply_preamble(_code, _PREAMBLE))
+        assert _strip_source(plantuml.dump_binary('svg', _code)) == _strip_source(_expected)
+        assert _strip_source(plantuml.dump_binary('svg', _code)) != \
+               _strip_source(LocalPlantuml.autoload(plantuml=plantuml_jar_file).dump_binary('svg', _code))
+        assert plantuml.check_syntax(_CODE).line == 3
+
+        _path = str(tmp_path / 'output.svg')
+        LocalPlantuml.autoload(plantuml=plantuml_jar_file, use_pipe=False, config=preamble_file) \
+            .dump(_path, 'svg', _code)
+        with open(_path, 'rb') as f:
+            assert _strip_source(f.read()) == _strip_source(_expected)
+
+        with pytest.raises(FileNotFoundError):
+            LocalPlantuml.autoload(plantuml=plantuml_jar_file, config=str(tmp_path / 'not_exist.puml'))
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
@@ -1,14 +1,25 @@
 import os
+import socket
+import shutil
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
 from tempfile import NamedTemporaryFile
+from threading import Thread
 from typing import Optional, List
 from unittest.mock import patch
 
 import pytest
+from requests import Timeout, HTTPError
+from requests.exceptions import RetryError
 from urlobject import URLObject
 
+from plantumlcli.models.picoweb import LocalPicowebServer
 from plantumlcli.models.remote import OFFICIAL_PLANTUML_HOST, RemotePlantuml, find_plantuml_host_from_env, \
     find_plantuml_host
+from plantumlcli.utils import load_text_file
 from .conftest import _has_cairosvg
+from plantumlcli.models.breaker import CircuitOpenError, CircuitState
+from ..testings import get_testfile, StandInServer
 
 
 @pytest.mark.unittest
@@ -204,3 +215,231 @@ class TestModelsRemoteCommon:
             assert find_plantuml_host('https://this-is-a-host') == 'https://this-is-a-host'
             assert find_plantuml_host(OFFICIAL_PLANTUML_HOST) == OFFICIAL_PLANTUML_HOST
             assert find_plantuml_host() == OFFICIAL_PLANTUML_HOST
+
+    def test_config(self, uml_helloworld_code, tmp_path):
+        _config = str(tmp_path / 'config.puml')
+        with open(_config, 'w') as f:
+            f.write('skinparam monochrome true\n')
+
+        plantuml = RemotePlantuml('https://plantuml-host/plantuml', config=_config)
+        assert plantuml.config == _config
+        assert plantuml.get_url('png', uml_helloworld_code) == \
+               RemotePlantuml('https://plantuml-host/plantuml').get_url(
+                   'png', uml_helloworld_code.replace('@startuml', '@startuml\nskinparam monochrome true', 1))
+        assert RemotePlantuml('https://plantuml-host/plantuml').config is None
+
+        with pytest.raises(FileNotFoundError):
+            RemotePlantuml('https://plantuml-host/plantuml', config=str(tmp_path / 'not_exist.puml'))
+
+    def test_timeout(self, uml_helloworld_code):
+        _server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        _server.bind(('127.0.0.1', 0))
+        _server.listen(8)
+        _connections = []
+
+        def _accept():  # accept connections but never respond
+            while True:
+                try:
+                    _connections.append(_server.accept()[0])
+                except OSError:
+                    break
+
+        Thread(target=_accept, daemon=True).start()
+        try:
+            plantuml = RemotePlantuml(f'http://127.0.0.1:{_server.getsockname()[1]}/plantuml', retries=1, timeout=0.5)
+            _start = time.time()
+            with pytest.raises(Timeout):
+                plantuml.dump_txt(uml_helloworld_code)
+            assert time.time() - _start < 5.0
+            assert len(_connections) == 2
+        finally:
+            _server.close()
+            for conn in _connections:
+                conn.close()
+
+    @pytest.mark.parametrize(['post_support'], [('text',), ('image',), ('405',)])
+    def test_post(self, uml_helloworld_code, post_support):
+        _large_code = load_text_file(get_testfile('umls', 'large.puml'))
+        _requests = []
+
+        class _PostHandler(BaseHTTPRequestHandler):
+            def __reply(self, content_type: str, body: bytes, status: int = 200):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # noqa
+                _requests.append(('GET', self.path))
+                self.__reply('text/plain', b'get:' + self.path.encode())
+
+            def do_POST(self):  # noqa
+                _body = self.rfile.read(int(self.headers['Content-Length']))
+                _requests.append(('POST', self.path))
+                if post_support == 'text':
+                    self.__reply('text/plain', b'post:' + _body)
+                elif post_support == 'image':  # such as picoweb
+                    self.__reply('image/png', b'\x89PNG error image')
+                else:
+                    self.__reply('text/html', b'Method Not Allowed', status=405)
+
+            def log_message(self, format, *args):  # noqa
+                pass
+
+        _server = HTTPServer(('127.0.0.1', 0), _PostHandler)
+        Thread(target=_server.serve_forever, daemon=True).start()
+        _host = f'http://127.0.0.1:{_server.server_port}/plantuml'
+        _supported = post_support == 'text'
+        try:
+            # small diagrams are sent by GET, without probing
+            plantuml = RemotePlantuml(_host, post_threshold=500)
+            assert plantuml.dump_txt(uml_helloworld_code).startswith('get:/plantuml/txt/')
+            assert [method for method, _ in _requests] == ['GET']
+
+            # large diagrams are sent by POST, when supported by server
+            _requests.clear()
+            _text = plantuml.dump_txt(_large_code)
+            _text_again = plantuml.dump_txt(_large_code)
+            if _supported:
+                assert _text == _text_again == f'post:{_large_code}'
+                assert _requests == [('POST', '/plantuml/txt')] * 3  # probe once
+            else:
+                assert _text.startswith('get:/plantuml/txt/')
+                assert [method for method, _ in _requests] == ['POST', 'GET', 'GET']
+
+            _requests.clear()
+            assert RemotePlantuml(_host, post=False, post_threshold=500).dump_txt(_large_code) \
+                .startswith('get:/plantuml/txt/')
+            assert RemotePlantuml(_host).dump_txt(_large_code).startswith('get:/plantuml/txt/')
+            assert [method for method, _ in _requests] == ['GET', 'GET']
+
+            _requests.clear()
+            assert RemotePlantuml(_host, post=True).dump_binary('svg', uml_helloworld_code) == \
+                   (f'post:{uml_helloworld_code}'.encode() if _supported else
+                    RemotePlantuml(_host).dump_binary('svg', uml_helloworld_code))
+            assert _requests[:2] == ([('POST', '/plantuml/txt'), ('POST', '/plantuml/svg')] if _supported else
+                                     [('POST', '/plantuml/txt'), ('GET', _requests[1][1])])
+        finally:
+            _server.shutdown()
+            _server.server_close()
+
+    def test_circuit_breaker(self, uml_helloworld_code):
+        with StandInServer(failures=100) as server:
+            plantuml = RemotePlantuml(server.url, retries=5, breaker_failures=3, breaker_time=0.5)
+            with patch('plantumlcli.models.remote.backoff_time', return_value=0.0):
+                with pytest.raises(CircuitOpenError):
+                    plantuml.dump_txt(uml_helloworld_code)
+                assert len(server.paths) == 3  # not requested after opened
+                assert plantuml.circuit_state() == CircuitState.OPEN
+                assert plantuml.circuit_state(server.url) == CircuitState.OPEN
+
+                _start = time.time()
+                with pytest.raises(CircuitOpenError):  # shared by all the renders, fail fast
+                    plantuml.dump_txt(uml_helloworld_code)
+                assert time.time() - _start < 0.2
+                assert len(server.paths) == 3
+
+                time.sleep(0.5)
+                assert plantuml.circuit_state() == CircuitState.HALF_OPEN
+                with pytest.raises(CircuitOpenError):  # trial failed, opened again
+                    plantuml.dump_txt(uml_helloworld_code)
+                assert len(server.paths) == 4
+
+        with StandInServer(failures=1) as server:
+            plantuml = RemotePlantuml(server.url, breaker_failures=1, breaker_time=0.3)
+            with pytest.raises(CircuitOpenError):
+                plantuml.dump_txt(uml_helloworld_code)
+            time.sleep(0.3)
+            assert plantuml.dump_txt(uml_helloworld_code).startswith('/plantuml/txt/')
+            assert plantuml.circuit_state() == CircuitState.CLOSED
+
+    def test_throttling_not_breaking(self, uml_helloworld_code):
+        with StandInServer(failures=4, failure_status=429) as server:
+            plantuml = RemotePlantuml(server.url, retries=5, breaker_failures=3)
+            with patch('plantumlcli.models.remote.backoff_time', return_value=0.0) as _backoff:
+                assert plantuml.dump_txt(uml_helloworld_code).startswith('/plantuml/txt/')
+                assert _backoff.call_count == 4  # retried after backoff
+            assert len(server.paths) == 5
+            assert plantuml.circuit_state() == CircuitState.CLOSED
+
+    def test_slow_diagram_not_breaking(self, uml_helloworld_code):
+        with StandInServer(delays=[1.0] * 6) as server:
+            plantuml = RemotePlantuml(server.url, retries=5, breaker_failures=3, timeout=0.3)
+            with patch('plantumlcli.models.remote.backoff_time', return_value=0.0):
+                with pytest.raises(Timeout):
+                    plantuml.dump_txt(uml_helloworld_code)
+            assert len(server.paths) == 6
+            assert plantuml.circuit_state() == CircuitState.CLOSED
+            assert plantuml.dump_txt(uml_helloworld_code).startswith('/plantuml/txt/')
+
+    def test_deadline(self, uml_helloworld_code):
+        with StandInServer(delay=1.0) as server:
+            plantuml = RemotePlantuml(server.url, deadline=1.5, timeout=0.4)
+            assert plantuml.deadline == 1.5
+            _start = time.time()
+            with pytest.raises(Timeout):
+                plantuml.dump_txt(uml_helloworld_code)
+            assert time.time() - _start < 2.0  # instead of 6 attempts of 0.4s and backoff
+            assert 2 <= len(server.paths) <= 3
+
+        with StandInServer(failures=100) as server:
+            plantuml = RemotePlantuml(server.url, deadline=1.0)
+            _start = time.time()
+            with pytest.raises(RetryError):  # no time left for the backoff of next retry
+                plantuml.dump_txt(uml_helloworld_code)
+            assert time.time() - _start < 1.0
+            assert len(server.paths) == 2
+
+    def test_not_retried_status(self, uml_helloworld_code):
+        with StandInServer(failures=100, failure_status=501) as server:
+            plantuml = RemotePlantuml(server.url)
+            with pytest.raises(HTTPError) as e:
+                plantuml.dump_txt(uml_helloworld_code)
+            assert e.value.response.status_code == 501
+            assert len(server.paths) == 1
+            assert plantuml.circuit_state() == CircuitState.CLOSED
+
+    def test_check_syntax(self, plantuml_jar_file, uml_helloworld_code):
+        _invalid_code = '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml'
+        _paths = []
+
+        class _CheckHandler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa
+                _paths.append(self.path)
+                if 'svg' in self.path:
+                    self.send_response(400)
+                    self.send_header('X-PlantUML-Diagram-Error', 'Syntax Error?')
+                    self.send_header('X-PlantUML-Diagram-Error-Line', '3')
+                    self.end_headers()
+                    return
+
+                _error = len(_paths) > 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain;charset=UTF-8')
+                self.end_headers()
+                self.wfile.write(b'(Error)' if _error else b'(2 participants)')
+
+            def log_message(self, format, *args):  # noqa
+                pass
+
+        _server = HTTPServer(('127.0.0.1', 0), _CheckHandler)
+        Thread(target=_server.serve_forever, daemon=True).start()
+        try:
+            plantuml = RemotePlantuml(f'http://127.0.0.1:{_server.server_port}/plantuml')
+            assert plantuml.check_syntax(uml_helloworld_code)
+            _result = plantuml.check_syntax(_invalid_code)
+            assert not _result
+            assert (_result.line, _result.message) == (3, 'Syntax Error?')
+            assert [path.split('/')[2] for path in _paths] == ['check', 'check', 'svg']
+        finally:
+            _server.shutdown()
+            _server.server_close()
+
+        # picoweb server has no check endpoint, rendering is used instead
+        with LocalPicowebServer((shutil.which('java'), '-jar', plantuml_jar_file)) as picoweb:
+            picoweb.wait_ready()
+            plantuml = RemotePlantuml(picoweb.url)
+            assert [bool(result) for result in plantuml.check_syntax_batch([uml_helloworld_code, _invalid_code])] == \
+                   [True, False]
+            assert plantuml.check_syntax(_invalid_code).line == 3
@@ -0,0 +1,101 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from plantumlcli import LocalPlantuml
+from plantumlcli.models import threads
+from plantumlcli.models.threads import thread_splits, jvm_processes, tuning_codes, measure_threads, tune_threads, \
+    get_tuned_threads
+from plantumlcli.utils import execute
+
+
+@pytest.fixture()
+def threads_dir(tmp_path):
+    _dir = str(tmp_path / 'threads')
+    with patch.object(threads, 'PLANTUML_THREADS_DIR', _dir):
+        yield _dir
+
+
+@pytest.fixture()
+def jar_copy(tmp_path, plantuml_jar_file):
+    _filename = str(tmp_path / 'plantuml.jar')
+    shutil.copyfile(plantuml_jar_file, _filename)
+    return _filename
+
+
+@pytest.mark.unittest
+class TestModelsThreads:
+    def test_thread_splits(self):
+        assert thread_splits(1) == [1]
+        assert thread_splits(8) == [1, 2, 4, 8]
+        assert thread_splits(6) == [1, 2, 4, 6]
+        assert thread_splits()[-1] == os.cpu_count()
+
+    def test_jvm_processes(self):
+        assert jvm_processes(8, 1) == 8
+        assert jvm_processes(8, 4) == 2
+        assert jvm_processes(8, 16) == 1
+        assert jvm_processes(3, 2) == 1
+
+    def test_tuning_codes(self):
+        _codes = tuning_codes(5)
+        assert len(_codes) == 5
+        assert len(set(_codes)) == 5
+        assert all(code.startswith('@startuml') for code in _codes)
+
+    def test_measure_threads(self, plantuml_jar_file):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        with patch('plantumlcli.models.threads.execute', side_effect=execute) as _execute:
+            assert measure_threads(plantuml._command_line, tuning_codes(4), 2, concurrency=4) > 0
+            assert _execute.call_count == 2
+            assert '-nbthread' in _execute.call_args[0]
+
+    def test_tune_threads(self, threads_dir, jar_copy):
+        plantuml = LocalPlantuml.autoload(plantuml=jar_copy)
+        assert get_tuned_threads(plantuml.java, jar_copy) is None
+        assert plantuml.threads == 1
+
+        _threads = tune_threads(plantuml.java, jar_copy, plantuml._command_line, splits=[1, 2], count=4)
+        assert _threads in (1, 2)
+        assert get_tuned_threads(plantuml.java, jar_copy) == _threads
+        assert LocalPlantuml.autoload(plantuml=jar_copy).threads == _threads
+        assert LocalPlantuml.autoload(plantuml=jar_copy, threads=3).threads == 3
+
+        with open(jar_copy, 'ab') as f:  # jar changed, tuning is stale
+            f.write(b'\0')
+        assert get_tuned_threads(plantuml.java, jar_copy) is None
+
+        with pytest.raises(ValueError):
+            LocalPlantuml.autoload(plantuml=jar_copy, threads=0)
+
+    def test_batch_with_threads(self, threads_dir, plantuml_jar_file, uml_helloworld_code):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file, threads=2)
+        assert plantuml.threads == 2
+
+        _codes = [uml_helloworld_code, '@startuml\nBob->Alice\nthis ]] bad [[\n@enduml', *tuning_codes(3)]
+        with patch('plantumlcli.models.local.execute', side_effect=execute) as _execute:
+            _results = list(plantuml.dump_binary_batch('txt', _codes))
+            assert ('-nbthread', '2') in zip(_execute.call_args_list[0][0], _execute.call_args_list[0][0][1:])
+        assert [success for success, _ in _results] == [True, False, True, True, True]
+        assert _results[0][1].decode() == plantuml.dump_txt(uml_helloworld_code)
+
+
+@pytest.mark.benchmark
+class TestModelsThreadsBenchmark:
+    _NOISE = 1.25  # costs within this ratio are not told apart
+
+    @pytest.mark.parametrize('count', [4, 16, 64])
+    def test_strategies(self, benchmark, threads_dir, plantuml_jar_file, count):
+        plantuml = LocalPlantuml.autoload(plantuml=plantuml_jar_file)
+        _codes = tuning_codes(count)
+        _costs = {threads_: measure_threads(plantuml._command_line, _codes, threads_) for threads_ in thread_splits()}
+        # jvm processes x internal threads of each strategy, reported together with the benchmark of tuned one
+        benchmark.extra_info.update({
+            f'{jvm_processes(os.cpu_count(), threads_)}x{threads_}': cost for threads_, cost in _costs.items()
+        })
+
+        _tuned = tune_threads(plantuml.java, plantuml.plantuml, plantuml._command_line, count=count)
+        benchmark.pedantic(measure_threads, args=(plantuml._command_line, _codes, _tuned), rounds=1)
+        assert _costs[_tuned] < min(_costs.values()) * self._NOISE, (_tuned, _costs)
@@ -1 +1,2 @@
 from .testfile import get_testfile
+from .server import StandInServer, HOMEPAGE
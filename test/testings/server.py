@@ -0,0 +1,64 @@
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from threading import Thread
+from typing import Sequence
+
+HOMEPAGE = b'<html><body><div id="footer">PlantUML Version 1.2024.3</div></body></html>'
+
+
+class StandInServer:
+    # stand-in of plantuml server, the homepage shows the version and each render is answered with its path,
+    # the first renders are delayed more by delays (such as a replica in garbage collection)
+    def __init__(self, delay: float = 0.0, failures: int = 0, version: bytes = HOMEPAGE, delays: Sequence[float] = (),
+                 failure_status: int = 503):
+        self.paths = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._failures = failures
+        self._delays = list(delays)
+        _server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa
+                with _server._lock:
+                    _server.paths.append(self.path)
+                    _server.in_flight += 1
+                    _server.max_in_flight = max(_server.max_in_flight, _server.in_flight)
+                    _fail = _server._failures > 0 and self.path != '/plantuml/'
+                    if _fail:
+                        _server._failures -= 1
+                    _delay = delay
+                    if _server._delays and self.path != '/plantuml/':
+                        _delay += _server._delays.pop(0)
+                time.sleep(_delay)
+                with _server._lock:  # before responding, or the next request of client may be counted first
+                    _server.in_flight -= 1
+
+                if _fail:
+                    self.send_response(failure_status)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                _body = version if self.path == '/plantuml/' else self.path.encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(_body)))
+                self.end_headers()
+                self.wfile.write(_body)
+
+            def log_message(self, format, *args):  # noqa
+                pass
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.__server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.__server.server_port}/plantuml'
+
+    def __enter__(self):
+        Thread(target=self.__server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__server.shutdown()
+        self.__server.server_close()
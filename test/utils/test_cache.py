@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from plantumlcli.utils import short_hash, file_stat, load_json_file, save_json_file
+
+
+@pytest.mark.unittest
+class TestUtilsCache:
+    def test_short_hash(self):
+        assert len(short_hash('a', 'b')) == 16
+        assert short_hash('a', 'b') == short_hash('a', 'b')
+        assert short_hash('a', 'b') != short_hash('ab')
+
+    def test_file_stat(self, tmp_path):
+        _filename = str(tmp_path / 'file.txt')
+        with open(_filename, 'wb') as f:
+            f.write(b'1234')
+        assert file_stat(_filename) == (4, os.stat(_filename).st_mtime_ns)
+
+    def test_json_file(self, tmp_path):
+        _filename = str(tmp_path / 'sub' / 'data.json')
+        assert load_json_file(_filename) is None
+
+        save_json_file(_filename, {'b': 1, 'a': [1, 2]})
+        assert load_json_file(_filename) == {'a': [1, 2], 'b': 1}
+        assert os.listdir(os.path.dirname(_filename)) == ['data.json']
+
+        with open(_filename, 'w') as f:
+            f.write('{broken')
+        assert load_json_file(_filename) is None
+
+
+if __name__ == "__main__":
+    pytest.main([os.path.abspath(__file__)])
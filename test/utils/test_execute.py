@@ -1,9 +1,13 @@
 import os
 import shutil
+import sys
+import threading
+import time
+from unittest.mock import patch
 
 import pytest
 
-from plantumlcli.utils import execute, CommandLineExecuteError
+from plantumlcli.utils import execute, execute_stream, CommandLineExecuteError, CommandLineTimeoutError
 
 
 @pytest.mark.unittest
@@ -14,6 +18,35 @@ class TestUtilsExecute:
         assert 'this_is_content' in _stdout
         assert not _stderr
 
+    def test_execute_stdin(self):
+        _stdout, _stderr = execute(shutil.which('python'), '-c',
+                                   'import sys;sys.stdout.buffer.write(sys.stdin.buffer.read()[::-1])',
+                                   stdin=b'\x00\xffabc', decode=False)
+
+        assert _stdout == b'cba\xff\x00'
+        assert not _stderr
+
+    def test_execute_cwd(self, tmp_path):
+        _stdout, _ = execute(shutil.which('python'), '-c', 'import os;print(os.getcwd())', cwd=str(tmp_path))
+        assert os.path.samefile(_stdout.strip(), str(tmp_path))
+
+    @pytest.mark.skipif(os.name != 'posix', reason='Process group is posix only')
+    def test_execute_timeout(self, tmp_path):
+        _flag_file = str(tmp_path / 'flag')
+        _start = time.time()
+        with pytest.raises(CommandLineTimeoutError) as e:
+            execute('sh', '-c', f'(sleep 3; touch {_flag_file}) & sleep 30', timeout=0.5)
+        assert time.time() - _start < 3.0
+
+        err = e.value
+        assert isinstance(err, TimeoutError)
+        assert err.timeout == 0.5
+        assert '0.5 seconds' in str(err)
+
+        # child process is killed together
+        time.sleep(3.5)
+        assert not os.path.exists(_flag_file)
+
     def test_execute_error(self):
         with pytest.raises(CommandLineExecuteError) as r:
             execute(shutil.which('python'), '-c',
@@ -30,6 +63,86 @@ class TestUtilsExecute:
                             "'import sys;print(2345678);print(2333333, file=sys.stderr);raise RuntimeError;')>" \
             .format(python=repr(shutil.which('python')))
 
+    def test_execute_stream(self):
+        _chunks = list(execute_stream(shutil.which('python'), '-c',
+                                      'import sys;sys.stdout.buffer.write(b"x" * 1000000)', chunk_size=4096))
+        assert len(_chunks) > 1
+        assert all(len(chunk) <= 4096 for chunk in _chunks)
+        assert b''.join(_chunks) == b'x' * 1000000
+
+        _data = b''.join(execute_stream(shutil.which('python'), '-c',
+                                        'import sys;sys.stdout.buffer.write(sys.stdin.buffer.read()[::-1])',
+                                        stdin=b'\x00\xffabc' * 100000))
+        assert _data == (b'\x00\xffabc' * 100000)[::-1]
+
+    def test_execute_stream_error(self):
+        _chunks = []
+        with pytest.raises(CommandLineExecuteError) as r:
+            for chunk in execute_stream(shutil.which('python'), '-c',
+                                        'import sys;print(2345678);sys.stderr.write("e" * 100000);sys.exit(3)',
+                                        stderr_limit=1000):
+                _chunks.append(chunk)
+
+        err = r.value
+        assert b''.join(_chunks).strip() == b'2345678'
+        assert err.exitcode == 3
+        assert err.stdout is None
+        assert err.stderr.startswith('e' * 1000)
+        assert '99000 bytes truncated' in err.stderr
+        assert len(err.stderr) < 1100
+
+    @pytest.mark.skipif(os.name != 'posix', reason='Process group is posix only')
+    def test_execute_stream_timeout(self, tmp_path):
+        _flag_file = str(tmp_path / 'flag')
+        _start = time.time()
+        with pytest.raises(CommandLineTimeoutError) as e:
+            list(execute_stream('sh', '-c', f'echo 1; (sleep 3; touch {_flag_file}) & sleep 30', timeout=0.5))
+        assert time.time() - _start < 3.0
+        assert e.value.timeout == 0.5
+
+        # child process is killed together
+        time.sleep(3.5)
+        assert not os.path.exists(_flag_file)
+
+    def test_execute_stream_close(self, tmp_path):
+        _stream = execute_stream('sh', '-c', 'while true; do echo 1; done')
+        assert next(_stream)
+        _start = time.time()
+        _stream.close()  # process is killed when not consumed any more
+        assert time.time() - _start < 3.0
+
+    @pytest.mark.skipif(os.name != 'posix', reason='Process group is posix only')
+    def test_execute_new_session(self):
+        # the process group killed on interruption is always its own, even without timeout
+        _stdout, _ = execute('sh', '-c', 'ps -o sid= -p $$; echo $$')
+        _sid, _pid = _stdout.split()
+        assert _sid == _pid
+        _stdout = b''.join(execute_stream('sh', '-c', 'ps -o sid= -p $$; echo $$')).decode()
+        _sid, _pid = _stdout.split()
+        assert _sid == _pid
+
+    @pytest.mark.skipif(os.name != 'posix', reason='Process group is posix only')
+    def test_execute_stream_timeout_after_stdout(self):
+        _start = time.time()
+        with pytest.raises(CommandLineTimeoutError):
+            list(execute_stream('sh', '-c', 'echo 1; exec >&-; sleep 30', timeout=0.5))
+        assert time.time() - _start < 3.0
+
+    def test_execute_stream_exit_near_deadline(self):
+        class _LateTimer(threading.Thread):  # fired after the process exited, just before cancelled
+            def __init__(self, interval, function):
+                threading.Thread.__init__(self)
+                self.function = function
+                self.cancelled = 0
+
+            def cancel(self):
+                self.cancelled += 1
+                if self.cancelled == 2:  # the process is waited before the second one
+                    self.function()
+
+        with patch.object(sys.modules['plantumlcli.utils.execute'], 'Timer', _LateTimer):
+            assert b''.join(execute_stream('sh', '-c', 'echo 1', timeout=10.0)).strip() == b'1'
+
 
 if __name__ == "__main__":
     pytest.main([os.path.abspath(__file__)])
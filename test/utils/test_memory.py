@@ -0,0 +1,70 @@
+from multiprocessing import cpu_count
+from unittest.mock import patch, mock_open
+
+import pytest
+
+from plantumlcli.utils import parse_memory_size, jvm_memory_size, get_available_memory, jvm_memory_budget, \
+    admit_jvm_processes
+from plantumlcli.utils import memory
+
+_MEMINFO = """MemTotal:       16303808 kB
+MemFree:         1025920 kB
+MemAvailable:    8151904 kB
+Buffers:          400680 kB
+"""
+
+
+@pytest.mark.unittest
+class TestUtilsMemory:
+    def test_parse_memory_size(self):
+        assert parse_memory_size('1024') == 1024
+        assert parse_memory_size('512m') == 512 << 20
+        assert parse_memory_size('2G') == 2 << 30
+        assert parse_memory_size('8151904 kB') == 8151904 << 10
+
+        with pytest.raises(ValueError):
+            parse_memory_size('')
+        with pytest.raises(ValueError):
+            parse_memory_size('512x')
+
+    def test_jvm_memory_size(self):
+        assert jvm_memory_size('512m') == '512m'
+        assert jvm_memory_size('512MB') == '512m'
+        assert jvm_memory_size(' 2 G ') == '2g'
+        assert jvm_memory_size('1024') == '1024'
+
+        with pytest.raises(ValueError):
+            jvm_memory_size('512x')
+
+    def test_get_available_memory(self, tmp_path):
+        with patch('builtins.open', mock_open(read_data=_MEMINFO)), \
+                patch.object(memory, '_cgroup_available', return_value=None):
+            assert get_available_memory() == 8151904 << 10
+
+        limit_file, usage_file = tmp_path / 'memory.max', tmp_path / 'memory.current'
+        limit_file.write_text('2147483648\n')
+        usage_file.write_text('1073741824\n')
+        with patch.object(memory, '_CGROUP_V2_LIMIT_FILE', str(limit_file)), \
+                patch.object(memory, '_CGROUP_V2_USAGE_FILE', str(usage_file)):
+            assert get_available_memory() <= 1 << 30
+
+            limit_file.write_text('max\n')
+            with patch.object(memory, '_CGROUP_V1_LIMIT_FILE', str(tmp_path / 'not_exist')):
+                assert memory._cgroup_available() is None
+
+        with patch.object(memory, '_MEMINFO_FILE', str(tmp_path / 'not_exist')), \
+                patch.object(memory, '_cgroup_available', return_value=None):
+            assert get_available_memory() is None
+
+    def test_jvm_memory_budget(self):
+        assert jvm_memory_budget() == memory.JVM_DEFAULT_MEMORY
+        assert jvm_memory_budget('1g') == (1 << 30) + memory.JVM_NON_HEAP_MEMORY
+
+    def test_admit_jvm_processes(self):
+        assert admit_jvm_processes(1, 512 << 20, 64 << 30) == 1
+        assert admit_jvm_processes(cpu_count() * 4, 512 << 20, 1 << 50) == cpu_count() * 4  # given by -n
+        assert admit_jvm_processes(cpu_count(), 512 << 20, 0) == 1
+        assert admit_jvm_processes(64, 1 << 30, 2 << 30) == 2
+
+        with patch.object(memory, 'get_available_memory', return_value=None):
+            assert admit_jvm_processes(cpu_count(), 512 << 20) == cpu_count()